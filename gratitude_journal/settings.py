@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 # Import environment variables
 try:
@@ -29,17 +30,39 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'journal.middleware.AsyncWhiteNoiseMiddleware',
+    'journal.middleware.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'journal.middleware.UserShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'gratitude_journal.urls'
 
+# Server-Timing header (db, tpl, view, total) on journal responses, and an
+# optional JSON log line per request on the journal.timing logger
+JOURNAL_SERVER_TIMING = os.environ.get('SERVER_TIMING', 'True') == 'True'
+JOURNAL_TIMING_LOG = os.environ.get('TIMING_LOG', 'False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'journal.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -56,22 +79,166 @@ TEMPLATES = [
     },
 ]
 
+# The hot journal templates (dashboard, entry list, entry card and entry
+# detail) can be rendered by Jinja2 instead. Set JOURNAL_TEMPLATE_ENGINE=
+# jinja2 and install Jinja2 to enable it; every other page keeps using
+# the Django engine.
+JOURNAL_TEMPLATE_ENGINE = os.environ.get('JOURNAL_TEMPLATE_ENGINE', 'django')
+JINJA2_TEMPLATES = {
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'NAME': 'jinja2',
+    'DIRS': [],
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'environment': 'journal.jinja2_env.environment',
+        'context_processors': TEMPLATES[0]['OPTIONS']['context_processors'],
+    },
+}
+if JOURNAL_TEMPLATE_ENGINE == 'jinja2':
+    TEMPLATES.append(JINJA2_TEMPLATES)
+
 WSGI_APPLICATION = 'gratitude_journal.wsgi.application'
 
 
 # Database configuration
+# Connections are kept open for CONN_MAX_AGE seconds and checked before
+# reuse. Under ASGI every request opens its own connections, so they are
+# closed after each request there unless CONN_MAX_AGE is set.
+ASGI = os.environ.get('ASGI', 'False') == 'True'
+CONN_MAX_AGE = int(os.environ.get('CONN_MAX_AGE', 0 if ASGI else 600))
+
 if 'DATABASE_URL' in os.environ:
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': dj_database_url.parse(
+            os.environ.get('DATABASE_URL'),
+            conn_max_age=CONN_MAX_AGE, conn_health_checks=True
+        )
     }
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 
+# Read replicas, as comma-separated URLs in DATABASE_REPLICA_URLS. The
+# dashboard, analytics, entry list and entry detail read journal data from
+# them; a session that has just saved an entry reads from the primary for
+# JOURNAL_REPLICA_PIN_SECONDS, so it never sees a replica lagging behind.
+JOURNAL_READ_REPLICAS = []
+for number, url in enumerate(
+    filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dj_database_url.parse(
+        url.strip(), conn_max_age=CONN_MAX_AGE, conn_health_checks=True
+    )
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    JOURNAL_READ_REPLICAS.append(alias)
+JOURNAL_REPLICA_PIN_SECONDS = int(
+    os.environ.get('REPLICA_PIN_SECONDS', 10)
+)
+
+# User shards, as comma-separated URLs in DATABASE_SHARD_URLS. Each user's
+# journal lives on one of the default database and the shard_1..n aliases,
+# placed by a hash of their id when they sign up; run `manage.py migrate
+# --database=<alias>` for each shard and move users with `manage.py
+# rebalance_shards`. Only append shards: a shard's place in the list fixes
+# the range of entry ids it hands out. Read replicas serve unsharded
+# deployments only.
+JOURNAL_SHARDS = ['default']
+for number, url in enumerate(
+    filter(None, os.environ.get('DATABASE_SHARD_URLS', '').split(',')), 1
+):
+    alias = f'shard_{number}'
+    DATABASES[alias] = dj_database_url.parse(
+        url.strip(), conn_max_age=CONN_MAX_AGE, conn_health_checks=True
+    )
+    JOURNAL_SHARDS.append(alias)
+
+DATABASE_ROUTERS = [
+    'journal.routers.ShardRouter',
+    'journal.routers.ReplicaRouter',
+]
+
+# Caches
+# Rendered entry-list cards are cached in the "fragments" cache, whose
+# backend is chosen with FRAGMENT_CACHE_BACKEND: locmem (default), file
+# or memcached (any memcached-protocol server at FRAGMENT_CACHE_LOCATION).
+FRAGMENT_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'locmem')
+FRAGMENT_CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'journal-fragments',
+    'file': str(BASE_DIR / '.cache' / 'fragments'),
+    'memcached': '127.0.0.1:11211',
+}
+
+# Sessions and the logged-in user can be read from the "auth" cache, with
+# sessions written through to the database. Set CACHED_AUTH=True to enable
+# it together with an AUTH_CACHE_BACKEND every worker shares (file on one
+# host, or memcached): a per-process locmem cache would keep serving a
+# session or password that another worker has already logged out or
+# changed, so it is refused.
+CACHED_AUTH = os.environ.get('CACHED_AUTH', 'False') == 'True'
+AUTH_CACHE_BACKEND = os.environ.get('AUTH_CACHE_BACKEND', 'locmem')
+if CACHED_AUTH and AUTH_CACHE_BACKEND == 'locmem':
+    raise ImproperlyConfigured(
+        'CACHED_AUTH=True needs a cache shared by every worker: set '
+        'AUTH_CACHE_BACKEND to file or memcached.'
+    )
+AUTH_CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'journal-auth',
+    'file': str(BASE_DIR / '.cache' / 'auth'),
+    'memcached': '127.0.0.1:11211',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': FRAGMENT_CACHE_BACKENDS[FRAGMENT_CACHE_BACKEND],
+        'LOCATION': os.environ.get(
+            'FRAGMENT_CACHE_LOCATION',
+            FRAGMENT_CACHE_DEFAULT_LOCATIONS[FRAGMENT_CACHE_BACKEND]
+        ),
+        'TIMEOUT': 60 * 60 * 24,
+    },
+    'auth': {
+        'BACKEND': FRAGMENT_CACHE_BACKENDS[AUTH_CACHE_BACKEND],
+        'LOCATION': os.environ.get(
+            'AUTH_CACHE_LOCATION',
+            AUTH_CACHE_DEFAULT_LOCATIONS[AUTH_CACHE_BACKEND]
+        ),
+    },
+}
+JOURNAL_FRAGMENT_CACHE = 'fragments'
+JOURNAL_AUTH_CACHE = 'auth'
+
+if CACHED_AUTH:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'auth'
+    AUTHENTICATION_BACKENDS = [
+        'journal.auth.CachedModelBackend',
+        # Still resolves sessions created before caching was enabled
+        'django.contrib.auth.backends.ModelBackend',
+    ]
+
+# Days deleted entries are remembered for offline replicas. A replica
+# that has not synced for longer is rebuilt from scratch.
+JOURNAL_SYNC_TOMBSTONE_DAYS = 30
+
+# Entries not written for this many days are moved to the compressed
+# archive by `manage.py archive_entries`, run from a scheduler
+JOURNAL_ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
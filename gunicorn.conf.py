@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration, read automatically from the project root
+
+Set ASGI=True to serve the ASGI application with uvicorn workers, so a
+worker holds many slow clients on one event loop instead of one thread
+each. Otherwise the WSGI application runs on sync workers as before.
+
+The application is imported once in the master and forked into the
+workers (PRELOAD_APP=False imports it in each worker instead). Each
+worker then warms up before taking requests: see journal.warmup.
+"""
+import os
+
+ASGI = os.environ.get('ASGI', 'False') == 'True'
+
+if ASGI:
+    wsgi_app = 'gratitude_journal.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'gratitude_journal.wsgi:application'
+    worker_class = 'sync'
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = os.environ.get('PRELOAD_APP', 'True') == 'True'
+
+
+def when_ready(server):
+    # A preloaded app is warmed in the master so every fork shares the
+    # resolved URLs and compiled templates. Connections must not be
+    # shared, so they are opened in the workers.
+    if server.cfg.preload_app:
+        from journal.warmup import warm_up
+        server.log.info('Warmed up master: %s', warm_up(open_connections=False))
+
+
+def post_worker_init(worker):
+    # Runs in each forked worker once the app is loaded. Under ASGI the ORM
+    # runs in worker threads, so connections opened here would go unused.
+    from journal.warmup import warm_up
+    worker.log.info('Warmed up worker: %s', warm_up(open_connections=not ASGI))
+
+
+def worker_exit(server, worker):
+    # Beacon samples are buffered per worker and would be lost with it
+    from journal.rum import flush_at_exit
+    worker.log.info('Flushed %s RUM samples at exit', flush_at_exit())
@@ -0,0 +1,183 @@
+from collections import Counter
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, F, Max, PositiveIntegerField, Sum, When
+)
+from django.db.models.functions import Greatest, TruncDate, TruncMonth
+from django.utils import timezone
+from .models import ArchivedEntry, DailyActivity, GratitudeEntry
+from .sharding import shard_for_user
+
+
+def local_date(value):
+    """Return the calendar day of a datetime in the site's time zone"""
+    return timezone.localtime(value, timezone.get_default_timezone()).date()
+
+
+def today():
+    """Return the current calendar day in the site's time zone"""
+    return local_date(timezone.now())
+
+
+def _renumber_streaks(user_id, start, last=None):
+    """
+    Recompute streak lengths of the days from ``start`` in one pass
+
+    Days between ``start`` and ``last`` (default ``start``) may have been
+    added or removed. Past ``last``, the first day whose streak is already
+    right means every later one is too, so the pass stops there and its
+    cost is bounded by the changed days, not by how many there were.
+    """
+    last = last or start
+    activity = DailyActivity.objects.for_user(user_id)
+    previous_date, streak = activity.filter(date__lt=start).order_by(
+        '-date'
+    ).values_list('date', 'streak').first() or (None, 0)
+
+    changed = []
+    days = activity.filter(date__gte=start).order_by('date')
+    for day in days.iterator(chunk_size=100):
+        if previous_date == day.date - timedelta(days=1):
+            streak += 1
+        else:
+            streak = 1
+        if day.streak != streak:
+            day.streak = streak
+            changed.append(day)
+        elif day.date > last:
+            break
+        previous_date = day.date
+    activity.bulk_update(changed, ['streak'])
+
+
+def _count_day(user_id, day):
+    """Add an entry to a day's activity"""
+    activity = DailyActivity.objects.for_user(user_id).filter(date=day)
+    alias = shard_for_user(user_id)
+    with transaction.atomic(using=alias):
+        if activity.update(entry_count=F('entry_count') + 1):
+            return
+        try:
+            with transaction.atomic(using=alias):
+                DailyActivity.objects.create(
+                    user_id=user_id, date=day, entry_count=1
+                )
+        except IntegrityError:
+            # A concurrent request created the day first
+            activity.update(entry_count=F('entry_count') + 1)
+        else:
+            _renumber_streaks(user_id, day)
+
+
+def _uncount_day(user_id, day):
+    """Remove an entry from a day's activity"""
+    activity = DailyActivity.objects.for_user(user_id).filter(date=day)
+    with transaction.atomic(using=shard_for_user(user_id)):
+        activity.update(entry_count=F('entry_count') - 1)
+        emptied = activity.filter(entry_count__lte=0).delete()[0]
+        if emptied:
+            _renumber_streaks(user_id, day + timedelta(days=1))
+
+
+def record_entry(entry):
+    """Count a newly created entry towards its day's activity"""
+    _count_day(entry.user_id, local_date(entry.created_at))
+
+
+def move_entry(entry, previous_created_at):
+    """Move an entry whose creation time was edited to its new day"""
+    old_day = local_date(previous_created_at)
+    new_day = local_date(entry.created_at)
+    if old_day == new_day:
+        return
+    with transaction.atomic(using=shard_for_user(entry.user_id)):
+        _uncount_day(entry.user_id, old_day)
+        _count_day(entry.user_id, new_day)
+
+
+def remove_entry(entry):
+    """Remove a deleted entry from its day's activity"""
+    _uncount_day(entry.user_id, local_date(entry.created_at))
+
+
+def remove_entries(user_id, created_ats):
+    """Remove a batch of deleted entries from their days' activity"""
+    days = Counter(local_date(created_at) for created_at in created_ats)
+    if not days:
+        return
+    activity = DailyActivity.objects.for_user(user_id).filter(date__in=days)
+    with transaction.atomic(using=shard_for_user(user_id)):
+        activity.update(entry_count=Case(
+            *[When(date=day, then=Greatest(F('entry_count') - count, 0))
+              for day, count in days.items()],
+            default=F('entry_count'),
+            output_field=PositiveIntegerField(),
+        ))
+        emptied = activity.filter(entry_count__lte=0)
+        emptied_days = sorted(emptied.values_list('date', flat=True))
+        if emptied_days:
+            emptied.delete()
+            _renumber_streaks(
+                user_id, emptied_days[0] + timedelta(days=1),
+                emptied_days[-1] + timedelta(days=1),
+            )
+
+
+def rebuild_user_activity(user_id):
+    """Rebuild a user's daily activity rows from their entries and archive"""
+    days = Counter()
+    for model in (GratitudeEntry, ArchivedEntry):
+        days.update(dict(model.objects.for_user(user_id).annotate(
+            day=TruncDate(
+                'created_at', tzinfo=timezone.get_default_timezone()
+            )
+        ).values('day').annotate(count=Count('id')).values_list(
+            'day', 'count'
+        ).order_by()))
+
+    rows = []
+    for day, count in sorted(days.items()):
+        streak = 1
+        if rows and rows[-1].date == day - timedelta(days=1):
+            streak = rows[-1].streak + 1
+        rows.append(DailyActivity(
+            user_id=user_id, date=day, entry_count=count, streak=streak
+        ))
+
+    alias = shard_for_user(user_id)
+    with transaction.atomic(using=alias):
+        DailyActivity.objects.using(alias).filter(user_id=user_id).delete()
+        DailyActivity.objects.using(alias).bulk_create(rows, batch_size=1000)
+
+
+def get_streaks(user):
+    """Return the user's (current, longest) writing streaks in days"""
+    activity = DailyActivity.objects.for_user(user)
+    current = activity.filter(
+        date__gte=today() - timedelta(days=1)
+    ).order_by('-date').values_list('streak', flat=True).first() or 0
+    longest = activity.aggregate(longest=Max('streak'))['longest'] or 0
+    return current, longest
+
+
+def entries_in_last_days(user, days):
+    """Return how many entries the user wrote in the last ``days`` days"""
+    since = today() - timedelta(days=days - 1)
+    total = DailyActivity.objects.for_user(user).filter(
+        date__gte=since
+    ).aggregate(total=Sum('entry_count'))['total']
+    return total or 0
+
+
+def get_monthly_activity(user, months=6):
+    """Return entry totals for the user's most recent active months"""
+    rows = DailyActivity.objects.for_user(user).annotate(
+        month=TruncMonth('date')
+    ).values('month').annotate(count=Sum('entry_count')).order_by(
+        '-month'
+    )[:months]
+    return [
+        {'month': row['month'].strftime('%B %Y'), 'count': row['count']}
+        for row in rows
+    ]
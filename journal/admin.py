@@ -1,5 +1,210 @@
+import json
+from datetime import timedelta
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.utils import timezone
+from django.utils.functional import cached_property
 from .models import GratitudeEntry
+from .sharding import journal_shards, sharding_enabled
+
+# Counts the planner estimates below this are made exact with COUNT(*)
+EXACT_COUNT_LIMIT = 10000
+
+
+def planner_estimate(queryset):
+    """Return the Postgres planner's row estimate for a queryset"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that estimates large counts on Postgres
+
+    An exact COUNT(*) reads every matching row, so counts the planner
+    puts above EXACT_COUNT_LIMIT are shown as estimated instead.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor == 'postgresql':
+            estimate = planner_estimate(queryset)
+            if estimate >= EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+def _period_start(value, kind):
+    """Truncate a local datetime to the start of its year, month or day"""
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if kind in ('year', 'month'):
+        value = value.replace(day=1)
+    if kind == 'year':
+        value = value.replace(month=1)
+    return value
+
+
+def _next_period(start, kind, tzinfo):
+    """Return the start of the period following a local period start"""
+    naive = timezone.make_naive(start, tzinfo)
+    if kind == 'year':
+        naive = naive.replace(year=naive.year + 1)
+    elif kind == 'month':
+        naive = (naive + timedelta(days=32)).replace(day=1)
+    else:
+        naive = naive + timedelta(days=1)
+    return timezone.make_aware(naive, tzinfo)
+
+
+class DrillDownQuerySet(models.QuerySet):
+    """
+    QuerySet whose datetimes() seeks through an index
+
+    SELECT DISTINCT over a truncated column reads every row. Here each
+    period is found by one ``ORDER BY field LIMIT 1`` seek from the start
+    of the next, so listing years, months or days costs one indexed
+    lookup per period present.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None,
+                  **kwargs):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(
+                field_name, kind, order=order, tzinfo=tzinfo, **kwargs
+            )
+        tzinfo = tzinfo or timezone.get_current_timezone()
+        queryset = self.order_by(field_name).values_list(
+            field_name, flat=True
+        )
+        periods = []
+        value = queryset.first()
+        while value is not None:
+            start = _period_start(timezone.localtime(value, tzinfo), kind)
+            periods.append(start)
+            value = queryset.filter(**{
+                f'{field_name}__gte': _next_period(start, kind, tzinfo)
+            }).first()
+        if order == 'DESC':
+            periods.reverse()
+        return periods
+
+
+class EntryChangeList(ChangeList):
+    """Changelist whose date hierarchy uses DrillDownQuerySet"""
+
+    def get_queryset(self, request):
+        # Only the class changes, keeping the admin's prefetches
+        queryset = super().get_queryset(request)._chain()
+        queryset.__class__ = DrillDownQuerySet
+        return queryset
+
+    def apply_select_related(self, qs):
+        # A shard cannot join the users table; get_queryset() prefetches
+        if sharding_enabled():
+            return qs
+        return super().apply_select_related(qs)
+
+
+class UserAutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filter by user chosen from an autocomplete box
+
+    The stock related filter lists every user in the sidebar; this one
+    only loads the selected user and searches the rest on demand.
+    """
+
+    title = 'user'
+    parameter_name = 'user__id__exact'
+    template = 'admin/journal/autocomplete_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        user_field = model._meta.get_field('user')
+        # The form field gives the widget the queryset it reads the
+        # selected user from
+        self.field = forms.ModelChoiceField(
+            user_field.remote_field.model.objects.all(), required=False,
+            widget=AutocompleteSelect(
+                user_field, model_admin.admin_site,
+                attrs={'data-filter-parameter': self.parameter_name},
+            ),
+        )
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def value(self):
+        value = super().value()
+        return value if value and value.isdigit() else None
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(user_id=self.value())
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            'display': 'All',
+        }
+
+    def render_widget(self):
+        return self.field.widget.render(self.parameter_name, self.value())
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """
+    Choose the shard whose entries the changelist shows
+
+    Each shard is its own database, so the changelist lists one at a
+    time, starting with the default database. Hidden without sharding.
+    """
+
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in journal_shards()]
+
+    def has_output(self):
+        return sharding_enabled()
+
+    def shard(self):
+        value = self.value()
+        return value if value in journal_shards() else DEFAULT_DB_ALIAS
+
+    def queryset(self, request, queryset):
+        if sharding_enabled():
+            return queryset.using(self.shard())
+        return queryset
+
+    def choices(self, changelist):
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': alias == self.shard(),
+                'query_string': changelist.get_query_string(
+                    {self.parameter_name: alias}
+                ),
+                'display': title,
+            }
 
 
 @admin.register(GratitudeEntry)
@@ -7,10 +212,17 @@ class GratitudeEntryAdmin(admin.ModelAdmin):
     """Admin interface for GratitudeEntry model"""
 
     list_display = ['title', 'user', 'mood', 'created_at', 'is_private']
-    list_filter = ['mood', 'is_private', 'created_at', 'user']
+    list_filter = [
+        ShardFilter, 'mood', 'is_private', 'created_at',
+        UserAutocompleteFilter,
+    ]
     search_fields = ['title', 'content', 'tags', 'user__username']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'created_at'
+    autocomplete_fields = ['user']
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) behind "N total"
+    show_full_result_count = False
 
     fieldsets = (
         ('Entry Information', {
@@ -25,6 +237,71 @@ class GratitudeEntryAdmin(admin.ModelAdmin):
         }),
     )
 
+    @property
+    def media(self):
+        # The filter's autocomplete box needs Select2 on the changelist too
+        widget = AutocompleteSelect(
+            GratitudeEntry._meta.get_field('user'), self.admin_site
+        )
+        return super().media + widget.media + forms.Media(
+            js=['journal/js/admin_autocomplete_filter.js']
+        )
+
+    def get_changelist(self, request, **kwargs):
+        return EntryChangeList
+
+    def save_related(self, request, form, formsets, change):
+        """Keep normalized tags in sync with the comma-separated field"""
+        super().save_related(request, form, formsets, change)
+        form.instance.set_tags(form.instance.get_tags_list())
+
     def get_queryset(self, request):
         """Optimize queries with select_related"""
-        return super().get_queryset(request).select_related('user')
+        queryset = super().get_queryset(request)
+        if sharding_enabled():
+            # Users stay on the default database, so they are fetched
+            # with one query instead of joined
+            return queryset.prefetch_related('user')
+        return queryset.select_related('user')
+
+    def get_search_fields(self, request):
+        if sharding_enabled():
+            return [
+                field for field in self.search_fields
+                if not field.startswith('user__')
+            ]
+        return self.search_fields
+
+    def get_search_results(self, request, queryset, search_term):
+        """With sharding, match usernames on the default database"""
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        if sharding_enabled() and search_term:
+            user_ids = list(get_user_model().objects.filter(
+                username__icontains=search_term
+            ).values_list('id', flat=True))
+            if user_ids:
+                results |= queryset.filter(user_id__in=user_ids)
+        return results, may_have_duplicates
+
+    def get_object(self, request, object_id, from_field=None):
+        """With sharding, find the entry on whichever shard holds it"""
+        if not sharding_enabled():
+            return super().get_object(request, object_id, from_field)
+        queryset = self.get_queryset(request)
+        field = (
+            GratitudeEntry._meta.pk if from_field is None
+            else GratitudeEntry._meta.get_field(from_field)
+        )
+        try:
+            object_id = field.to_python(object_id)
+        except ValidationError:
+            return None
+        for alias in journal_shards():
+            entry = queryset.using(alias).filter(
+                **{field.name: object_id}
+            ).first()
+            if entry is not None:
+                return entry
+        return None
@@ -0,0 +1,269 @@
+"""
+Versioned JSON API for journal entries
+
+Every response carries an ETag, and entries a Last-Modified header
+derived from ``GratitudeEntry.updated_at``. Lists have none, since a
+delete never moves their newest updated_at forward. Conditional GETs
+are answered with 304 before any entry is serialized, and writes
+honour ``If-Match`` so clients can detect concurrent edits.
+"""
+import json
+from functools import wraps
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.urls import reverse
+from django.utils.crypto import md5
+from django.utils.http import quote_etag
+from .archive import archived_entries, get_archived_entry, restore_entry
+from .conditional import conditional_response
+from .export import EXPORT_FIELDS, entry_values
+from .forms import GratitudeEntryForm
+from .models import GratitudeEntry
+from .pagination import CursorPaginator
+from .routers import pin_to_primary
+from .sharding import shard_for_user
+from . import sync
+
+API_FIELDS = EXPORT_FIELDS
+WRITABLE_FIELDS = GratitudeEntryForm.Meta.fields
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class APIError(Exception):
+    """An error reported to the client as a JSON body"""
+
+    def __init__(self, errors, status=400):
+        super().__init__(errors)
+        self.errors = errors
+        self.status = status
+
+
+def json_response(data, status=200):
+    """Return compact JSON"""
+    return JsonResponse(
+        data, status=status, json_dumps_params={'separators': (',', ':')}
+    )
+
+
+def api_view(*methods):
+    """
+    Require an authenticated user and one of the given HTTP methods
+
+    Anonymous requests get a 401 instead of a redirect to the login page
+    and APIError is turned into a JSON error response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            if not request.user.is_authenticated:
+                return json_response(
+                    {'errors': {'__all__': ['Authentication required.']}},
+                    status=401
+                )
+            try:
+                return view(request, *args, **kwargs)
+            except APIError as error:
+                return json_response({'errors': error.errors}, error.status)
+        return wrapper
+    return decorator
+
+
+def selected_fields(request):
+    """Return the fields requested with ?fields=, defaulting to all"""
+    requested = request.GET.get('fields', '')
+    if not requested:
+        return API_FIELDS
+    fields = [
+        field.strip() for field in requested.split(',') if field.strip()
+    ]
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown:
+        raise APIError({'fields': [f'Unknown field "{field}".'
+                                   for field in unknown]})
+    return fields
+
+
+def serialize(entry, fields):
+    values = entry_values(entry)
+    return {field: values[field] for field in fields}
+
+
+def entry_etag(entry):
+    return f'{entry.id}.{entry.updated_at.timestamp()}'
+
+
+def read_body(request, entry=None):
+    """
+    Return form data from a JSON body
+
+    For PATCH the entry's current values fill in the omitted fields.
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        raise APIError({'__all__': ['Request body must be valid JSON.']})
+    if not isinstance(body, dict):
+        raise APIError({'__all__': ['Request body must be a JSON object.']})
+
+    data = {}
+    if entry is not None and request.method == 'PATCH':
+        data = {field: getattr(entry, field) for field in WRITABLE_FIELDS}
+    for field in WRITABLE_FIELDS:
+        if field in body:
+            data[field] = body[field]
+    if isinstance(data.get('tags'), list):
+        data['tags'] = ', '.join(str(tag) for tag in data['tags'])
+    data['is_private'] = data.get('is_private', True)
+    return data
+
+
+def entry_querysets(request):
+    """
+    Return the user's entries and archived entries, filtered like the
+    entry list page
+    """
+    entries = GratitudeEntry.objects.for_user(request.user)
+    mood = request.GET.get('mood', '')
+    if mood:
+        entries = entries.filter(mood=mood)
+    tag = request.GET.get('tag', '').strip()
+    if tag:
+        entries = entries.filter(tag_objects__name=tag)
+    return entries, archived_entries(request.user, mood, tag)
+
+
+def page_limit(request, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise APIError({'limit': ['Enter a whole number.']})
+    return min(max(limit, 1), maximum)
+
+
+@api_view('GET', 'HEAD', 'POST')
+def entry_collection(request):
+    """List the user's entries a page at a time, or create one"""
+    fields = selected_fields(request)
+    if request.method == 'POST':
+        return create_entry(request, fields)
+
+    queryset, archived = entry_querysets(request)
+    limit = page_limit(request)
+
+    # One aggregate query versions the whole filtered list: any write
+    # moves the newest updated_at and any delete changes the count, so
+    # it is revalidated by ETag alone.
+    # Archived entries are never edited in place, so archiving or
+    # restoring one shows in the two counts.
+    state = queryset.aggregate(count=Count('id'), modified=Max('updated_at'))
+    archived_count = archived.count()
+    modified = state['modified']
+    etag = md5(
+        f'{request.user.pk}:{state["count"]}:{archived_count}:{modified}:'
+        f'{request.GET.urlencode()}'.encode(),
+        usedforsecurity=False
+    ).hexdigest()
+
+    def build():
+        page = CursorPaginator(
+            queryset, limit, archived if archived_count else None
+        ).get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        return json_response({
+            'count': state['count'] + archived_count,
+            'next': page.next_cursor if page.has_next else None,
+            'previous': (page.previous_cursor if page.has_previous
+                         else None),
+            'results': [serialize(entry, fields) for entry in page],
+        })
+
+    return conditional_response(request, etag, None, build)
+
+
+def create_entry(request, fields):
+    form = GratitudeEntryForm(read_body(request))
+    if not form.is_valid():
+        raise APIError(form.errors.get_json_data())
+    with transaction.atomic(using=shard_for_user(request.user.pk)):
+        entry = form.save(commit=False)
+        entry.user = request.user
+        entry.save()
+        form.save_m2m()
+    pin_to_primary(request)
+
+    response = json_response(serialize(entry, fields), status=201)
+    response['Location'] = reverse('journal:api_entry', args=[entry.id])
+    response['ETag'] = quote_etag(entry_etag(entry))
+    return response
+
+
+@api_view('GET', 'HEAD', 'PUT', 'PATCH', 'DELETE')
+def entry_resource(request, entry_id):
+    """Read, replace, update or delete one of the user's entries"""
+    fields = selected_fields(request)
+    entry = GratitudeEntry.objects.for_user(request.user).filter(
+        id=entry_id
+    ).first() or get_archived_entry(request.user, entry_id)
+    if entry is None:
+        raise APIError({'__all__': ['Entry not found.']}, status=404)
+
+    def build():
+        if request.method == 'DELETE':
+            with transaction.atomic(using=shard_for_user(request.user.pk)):
+                if entry.archived:
+                    restore_entry(entry)
+                entry.delete()
+            pin_to_primary(request)
+            return HttpResponse(status=204)
+        if request.method in ('PUT', 'PATCH'):
+            return update_entry(request, entry, fields)
+        return json_response(serialize(entry, fields))
+
+    return conditional_response(
+        request, entry_etag(entry), entry.updated_at, build
+    )
+
+
+def update_entry(request, entry, fields):
+    form = GratitudeEntryForm(read_body(request, entry), instance=entry)
+    if not form.is_valid():
+        raise APIError(form.errors.get_json_data())
+    with transaction.atomic(using=shard_for_user(request.user.pk)):
+        if entry.archived:
+            restore_entry(entry)
+        form.save()
+    pin_to_primary(request)
+
+    response = json_response(serialize(entry, fields))
+    response['ETag'] = quote_etag(entry_etag(entry))
+    return response
+
+
+@api_view('GET', 'HEAD')
+def entry_changes(request):
+    """
+    Return the entries written and deleted since ?since=
+
+    Without a cursor, or with one too old to catch up from, the response
+    has ``"reset": true`` and pages through a full copy. Clients repeat
+    with the returned cursor while ``has_more`` is true.
+    """
+    fields = selected_fields(request)
+    limit = page_limit(request, sync.DEFAULT_LIMIT, sync.MAX_LIMIT)
+    changes = sync.get_changes(
+        request.user, request.GET.get('since') or None, limit
+    )
+    return json_response({
+        'user': request.user.pk,
+        'cursor': changes['cursor'],
+        'has_more': changes['has_more'],
+        'reset': changes['reset'],
+        'entries': [serialize(entry, fields) for entry in changes['entries']],
+        'deleted': changes['deleted'],
+    })
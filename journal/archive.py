@@ -0,0 +1,199 @@
+"""
+Cold archive tier for old journal entries
+
+Entries not written for JOURNAL_ARCHIVE_AFTER_DAYS are moved, a batch at
+a time, from the entries table into ``ArchivedEntry`` with their content
+compressed, keeping the hot table, its indexes and the card cache sized
+to what is actually read. Counters, daily activity and tag links keep
+counting archived entries.
+
+The entry list, its filters, search, sync, the detail page and exports
+read archived entries transparently; editing or deleting one first
+restores it to the entries table.
+"""
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from .fragments import invalidate_entry_cards
+from .models import ArchivedEntry, ArchivedEntryTag, EntryTag, GratitudeEntry
+from .rebalance import delete_entries
+from .sharding import journal_shards, shard_for_user
+from .stats import (
+    record_entries_archived, record_entries_restored, record_entry_restored,
+)
+
+# Entries moved per transaction by archive_entries()
+ARCHIVE_BATCH_SIZE = 500
+
+
+def archive_cutoff(days=None):
+    """Return the time before which untouched entries are archived"""
+    if days is None:
+        days = getattr(settings, 'JOURNAL_ARCHIVE_AFTER_DAYS', 365)
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable(alias, before):
+    """Return the entries on a database last written before a time"""
+    return GratitudeEntry.objects.using(alias).filter(
+        created_at__lt=before, updated_at__lt=before
+    )
+
+
+def archive_batch(alias, before, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move one batch of old entries on a database into the archive
+
+    Entries and their archived copies swap in one transaction. Entries
+    locked by a concurrent edit are skipped until the next batch. Returns
+    how many entries were archived.
+    """
+    with transaction.atomic(using=alias):
+        entries = list(archivable(alias, before).select_for_update(
+            skip_locked=True
+        ).order_by('created_at', 'id')[:batch_size])
+        if not entries:
+            return 0
+        ArchivedEntry.objects.using(alias).bulk_create(
+            [ArchivedEntry.from_entry(entry) for entry in entries]
+        )
+        ArchivedEntryTag.objects.using(alias).bulk_create([
+            ArchivedEntryTag(entry_id=entry_id, tag_id=tag_id)
+            for entry_id, tag_id in EntryTag.objects.using(alias).filter(
+                entry_id__in=[entry.id for entry in entries]
+            ).values_list('entry_id', 'tag_id')
+        ])
+        delete_entries(alias, GratitudeEntry.objects.using(alias).filter(
+            id__in=[entry.id for entry in entries]
+        ))
+        per_user = Counter(entry.user_id for entry in entries)
+        for user_id, count in per_user.items():
+            record_entries_archived(User(pk=user_id), count)
+    invalidate_entry_cards(entries)
+    return len(entries)
+
+
+def archive_entries(before=None, batch_size=ARCHIVE_BATCH_SIZE,
+                    max_batches=None):
+    """
+    Archive old entries on every shard, batch by batch
+
+    Stops after ``max_batches`` batches per shard when given. Returns how
+    many entries were archived.
+    """
+    if before is None:
+        before = archive_cutoff()
+    archived = 0
+    for alias in journal_shards():
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = archive_batch(alias, before, batch_size)
+            archived += moved
+            batches += 1
+            if moved < batch_size:
+                break
+    return archived
+
+
+def archived_entries(user, mood='', tag=''):
+    """Return the user's archived entries, filtered like the entry list"""
+    entries = ArchivedEntry.objects.for_user(user)
+    if mood:
+        entries = entries.filter(mood=mood)
+    if tag:
+        entries = entries.filter(tag_objects__name=tag)
+    return entries
+
+
+def entry_matches(entry, terms):
+    """Return whether each term is in the entry's title, content or tags"""
+    text = '\n'.join((entry.title, entry.content, entry.tags)).casefold()
+    return all(term.casefold() in text for term in terms)
+
+
+def search_archived(archived, terms):
+    """
+    Yield the entries of an ArchivedEntry queryset matching every term
+
+    Content is stored compressed, so it cannot be matched by the database:
+    rows are read in order a batch at a time and matched as they are
+    decompressed.
+    """
+    for row in archived.iterator(chunk_size=ARCHIVE_BATCH_SIZE):
+        entry = row.to_entry()
+        if entry_matches(entry, terms):
+            yield entry
+
+
+def get_archived_entry(user, entry_id):
+    """Return the user's entry with this id from the archive, or None"""
+    archived = ArchivedEntry.objects.for_user(user).filter(
+        id=entry_id
+    ).first()
+    return archived.to_entry() if archived is not None else None
+
+
+async def aget_archived_entry(user, entry_id):
+    """get_archived_entry() for async views"""
+    archived = await ArchivedEntry.objects.for_user(user).filter(
+        id=entry_id
+    ).afirst()
+    return archived.to_entry() if archived is not None else None
+
+
+def restore_entry(entry):
+    """
+    Move an entry read from the archive back into the entries table
+
+    The entry is restored as archived, even when the caller has already
+    changed it, so a following save sees what changed. Counters and
+    activity already count it, so they are left alone. The entry is
+    stamped as updated now, so sync clients and shard moves pick it up,
+    and can then be saved or deleted like any other.
+    """
+    alias = shard_for_user(entry.user_id)
+    with transaction.atomic(using=alias):
+        archived = ArchivedEntry.objects.using(alias).get(id=entry.id)
+        stored = archived.to_entry()
+        archived.delete()
+        # bulk_create() inserts with the entry's id and sends no signals
+        GratitudeEntry.objects.using(alias).bulk_create([stored])
+        stored.set_tags(stored.get_tags_list())
+        record_entry_restored(User(pk=entry.user_id))
+    entry.archived = False
+    entry.updated_at = stored.updated_at
+    entry._state = stored._state
+    return entry
+
+
+def restore_entries(user, entry_ids):
+    """
+    Move the user's selected archived entries back into the entries table
+
+    restore_entry() for a batch, used by the bulk actions before they act
+    on the entries table. Returns how many entries were restored.
+    """
+    alias = shard_for_user(user.pk)
+    with transaction.atomic(using=alias):
+        archived = list(ArchivedEntry.objects.for_user(user).filter(
+            id__in=entry_ids
+        ).select_for_update())
+        if not archived:
+            return 0
+        ids = [row.id for row in archived]
+        links = list(ArchivedEntryTag.objects.using(alias).filter(
+            entry_id__in=ids
+        ).values_list('entry_id', 'tag_id'))
+        ArchivedEntry.objects.using(alias).filter(id__in=ids).delete()
+        GratitudeEntry.objects.using(alias).bulk_create(
+            [row.to_entry() for row in archived]
+        )
+        EntryTag.objects.using(alias).bulk_create([
+            EntryTag(entry_id=entry_id, tag_id=tag_id)
+            for entry_id, tag_id in links
+        ])
+        record_entries_restored(user, len(archived))
+    return len(archived)
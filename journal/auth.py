@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+# Seconds a resolved user is reused before being read again
+USER_CACHE_TIMEOUT = 60 * 15
+
+
+def get_auth_cache():
+    """Return the cache holding resolved users"""
+    return caches[getattr(settings, 'JOURNAL_AUTH_CACHE', 'default')]
+
+
+def user_cache_key(user_id):
+    return f'journal:auth-user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user's cached row so the next request reads it again"""
+    get_auth_cache().delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that resolves the session's user from the auth cache
+
+    The cached row is dropped whenever the user is saved (which covers
+    password changes and last_login updates) or logs out, so the session
+    auth hash is always checked against the current password.
+    """
+
+    def get_user(self, user_id):
+        cache = get_auth_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,6 @@
+"""
+Micro-benchmarks for the journal's ORM, form and template hot paths
+
+Run with ``manage.py run_benchmarks``. The synthetic dataset is created
+inside a transaction that is rolled back once timing finishes.
+"""
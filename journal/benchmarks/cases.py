@@ -0,0 +1,111 @@
+import copy
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.template import engines
+from django.test import RequestFactory
+from django.utils.safestring import mark_safe
+from journal import views
+from journal.forms import GratitudeEntryForm
+from journal.fragments import ENTRY_CARD_TEMPLATE
+from journal.models import GratitudeEntry
+from journal.pagination import CursorPaginator
+
+FORM_DATA = {
+    'title': 'Benchmark entry',
+    'content': 'I am grateful for fast pages and quiet mornings.',
+    'mood': 'good',
+    'tags': 'family, work, health',
+    'is_private': True,
+}
+
+
+def get_template_engines():
+    """
+    Return the template engines to compare, keyed by name
+
+    The Jinja2 engine is built from settings.JINJA2_TEMPLATES so it can be
+    benchmarked without being the deployment's active engine.
+    """
+    available = {'django': engines['django']}
+    try:
+        from django.template.backends.jinja2 import Jinja2
+    except ImportError:
+        return available
+    params = copy.deepcopy(settings.JINJA2_TEMPLATES)
+    params.pop('BACKEND')
+    available['jinja2'] = Jinja2(params)
+    return available
+
+
+def get_cases(user):
+    """Return the named benchmark callables for a seeded user"""
+    factory = RequestFactory()
+
+    def request(path, **params):
+        req = factory.get(path, params)
+        req.user = user
+        return req
+
+    # The views are async; each call runs them to completion
+    dashboard_view = async_to_sync(views.dashboard)
+    entry_list_view = async_to_sync(views.entry_list)
+
+    def dashboard():
+        dashboard_view(request('/dashboard/'))
+
+    def entry_list_page():
+        entry_list_view(request('/entries/'))
+
+    def form_validation():
+        form = GratitudeEntryForm(FORM_DATA)
+        form.is_valid()
+
+    entries = list(GratitudeEntry.objects.filter(user=user)[:100])
+
+    def tags_list():
+        for entry in entries:
+            entry.get_tags_list()
+
+    page = CursorPaginator(
+        GratitudeEntry.objects.filter(user=user), 10
+    ).get_page()
+
+    def list_template(engine):
+        template = engine.get_template('journal/entry_list.html')
+        card = engine.get_template(ENTRY_CARD_TEMPLATE)
+        list_request = request('/entries/')
+
+        def render():
+            # Cards are rendered uncached so the whole template cost is timed
+            template.render({
+                'page_obj': page,
+                'entry_cards': [
+                    mark_safe(card.render({'entry': e})) for e in page
+                ],
+                'total_results': 10,
+                'mood_choices': GratitudeEntry.MOOD_CHOICES,
+                'user': user,
+            }, list_request)
+        return render
+
+    def detail_template(engine):
+        template = engine.get_template('journal/entry_detail.html')
+        return lambda: template.render({'entry': entries[0], 'user': user})
+
+    # One case per engine so the Django and Jinja2 ports can be compared
+    template_cases = {}
+    for engine_name, engine in get_template_engines().items():
+        suffix = '' if engine_name == 'django' else f'_{engine_name}'
+        template_cases[f'entry_list_template{suffix}'] = list_template(engine)
+        if entries:
+            template_cases[f'entry_detail_template{suffix}'] = (
+                detail_template(engine)
+            )
+
+    return {
+        'dashboard': dashboard,
+        'entry_list': entry_list_page,
+        'form_validation': form_validation,
+        'get_tags_list': tags_list,
+        **template_cases,
+    }
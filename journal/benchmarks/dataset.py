@@ -0,0 +1,54 @@
+import random
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.utils import timezone
+from journal.activity import rebuild_user_activity
+from journal.models import EntryTag, GratitudeEntry, Tag
+from journal.stats import rebuild_user_stats
+
+WORDS = (
+    'grateful family friends morning coffee sunshine walk music health '
+    'work garden rain book dinner laughter quiet home kindness'
+).split()
+TAGS = ['family', 'friends', 'work', 'health', 'nature', 'music', 'food']
+
+
+def seed(entries=1000, seed_value=42):
+    """Create a benchmark user with a synthetic journal and return it"""
+    rng = random.Random(seed_value)
+    user = User.objects.create_user(
+        username=f'benchmark-{seed_value}', password='benchmark'
+    )
+    moods = [mood for mood, label in GratitudeEntry.MOOD_CHOICES]
+    now = timezone.now()
+
+    rows, tag_lists = [], []
+    for i in range(entries):
+        tag_list = rng.sample(TAGS, rng.randint(0, 4))
+        tag_lists.append(tag_list)
+        rows.append(GratitudeEntry(
+            user=user,
+            title=f'Entry {i}',
+            content=' '.join(rng.choice(WORDS) for _ in range(60)),
+            mood=rng.choice(moods),
+            tags=', '.join(tag_list),
+            is_private=rng.random() < 0.8,
+            created_at=now - timedelta(hours=i * 7),
+        ))
+    created = GratitudeEntry.objects.bulk_create(rows, batch_size=1000)
+
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in TAGS], ignore_conflicts=True
+    )
+    tag_ids = dict(Tag.objects.values_list('name', 'id'))
+    EntryTag.objects.bulk_create(
+        [
+            EntryTag(entry_id=entry.pk, tag_id=tag_ids[name])
+            for entry, tag_list in zip(created, tag_lists)
+            for name in tag_list
+        ],
+        batch_size=1000,
+    )
+    rebuild_user_activity(user.pk)
+    rebuild_user_stats(user)
+    return user
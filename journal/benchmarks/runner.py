@@ -0,0 +1,58 @@
+import statistics
+import time
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(samples, fraction):
+    """Return the given percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_case(func, iterations, warmup=3):
+    """Time a callable and count the queries of a single call"""
+    for _ in range(warmup):
+        func()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(samples, 0.50), 4),
+        'p95_ms': round(percentile(samples, 0.95), 4),
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'queries': len(queries),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline
+
+    Returns (name, message) pairs for cases whose p50 grew by more than
+    ``threshold`` or whose query count increased.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            regressions.append((
+                name,
+                f"queries {base['queries']} -> {result['queries']}"
+            ))
+        if base['p50_ms'] and result['p50_ms'] > base['p50_ms'] * threshold:
+            regressions.append((
+                name,
+                f"p50 {base['p50_ms']:.3f}ms -> {result['p50_ms']:.3f}ms"
+            ))
+    return regressions
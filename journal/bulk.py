@@ -0,0 +1,154 @@
+"""
+Bulk actions on a user's selected entries
+
+Each action selects and writes the entries with WHERE clauses holding
+both the selected ids and the owner, so another user's entries can never
+be touched. Counters, daily activity, tags and sync tombstones are
+kept in step inside the same transaction. Selected archived entries are
+first restored to the entries table, as editing one does.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from .activity import remove_entries
+from .archive import restore_entries
+from .forms import validate_tags
+from .fragments import invalidate_entry_cards
+from .models import EntryTag, EntryTombstone, GratitudeEntry, Tag
+from .rebalance import delete_entries
+from .sharding import shard_for_user
+from .stats import record_entries_deleted, record_privacy_changed
+
+# Most entries a single bulk action may select
+MAX_BULK_ENTRIES = 500
+
+# Limits enforced on an entry's tags by GratitudeEntryForm
+MAX_TAGS = 10
+MAX_TAGS_LENGTH = GratitudeEntry._meta.get_field('tags').max_length
+
+
+def owned_entries(user, entry_ids):
+    """Return the selected entries that belong to the user"""
+    return GratitudeEntry.objects.for_user(user).filter(id__in=entry_ids)
+
+
+def clean_tag(name):
+    """Validate a single tag name like the entry form does"""
+    tag_list = validate_tags(name)[1]
+    if len(tag_list) != 1:
+        raise ValidationError('Enter a single tag.')
+    return tag_list[0]
+
+
+def bulk_delete(user, entry_ids):
+    """Delete the user's selected entries, returning how many went"""
+    alias = shard_for_user(user.pk)
+    with transaction.atomic(using=alias):
+        restore_entries(user, entry_ids)
+        # Locked so the bookkeeping matches exactly what is deleted
+        entries = list(owned_entries(user, entry_ids).select_for_update().only(
+            'id', 'mood', 'is_private', 'created_at', 'updated_at'
+        ))
+        if not entries:
+            return 0
+        ids = [entry.id for entry in entries]
+        # Deleted without the per-object signals; their work is done for
+        # the whole batch below
+        deleted = delete_entries(alias, owned_entries(user, ids), user.pk)
+        record_entries_deleted(user, entries)
+        remove_entries(user.id, [entry.created_at for entry in entries])
+        EntryTombstone.objects.using(alias).bulk_create([
+            EntryTombstone(user=user, entry_id=entry_id) for entry_id in ids
+        ])
+    invalidate_entry_cards(entries)
+    return deleted
+
+
+def bulk_set_privacy(user, entry_ids, is_private):
+    """Make the selected entries private or public"""
+    with transaction.atomic(using=shard_for_user(user.pk)):
+        restore_entries(user, entry_ids)
+        changed = owned_entries(user, entry_ids).exclude(
+            is_private=is_private
+        ).update(is_private=is_private, updated_at=timezone.now())
+        record_privacy_changed(user, is_private, changed)
+    return changed
+
+
+def _rewrite_tags(user, entry_ids, rewrite):
+    """
+    Rewrite the tags string of the selected entries in one UPDATE
+
+    rewrite() gets an entry's tag list and returns the new list, or None
+    to leave the entry alone. Returns the ids that were rewritten.
+    """
+    restore_entries(user, entry_ids)
+    rows = owned_entries(user, entry_ids).select_for_update().values_list(
+        'id', 'tags'
+    )
+    new_tags = {}
+    for entry_id, tags in rows:
+        tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
+        tag_list = rewrite(tag_list)
+        if tag_list is not None:
+            new_tags[entry_id] = ', '.join(tag_list)
+    if new_tags:
+        owned_entries(user, new_tags).update(
+            tags=Case(
+                *[When(id=entry_id, then=Value(tags))
+                  for entry_id, tags in new_tags.items()],
+                default='tags',
+            ),
+            updated_at=timezone.now(),
+        )
+    return list(new_tags)
+
+
+def bulk_add_tag(user, entry_ids, name):
+    """
+    Add a tag to the selected entries
+
+    Entries already holding the most tags the form allows are skipped.
+    Returns the number of entries tagged.
+    """
+    name = clean_tag(name)
+
+    def rewrite(tag_list):
+        if name in tag_list:
+            return None
+        tag_list = tag_list + [name]
+        if (len(tag_list) > MAX_TAGS
+                or len(', '.join(tag_list)) > MAX_TAGS_LENGTH):
+            return None
+        return tag_list
+
+    alias = shard_for_user(user.pk)
+    with transaction.atomic(using=alias):
+        tagged = _rewrite_tags(user, entry_ids, rewrite)
+        if tagged:
+            tags = Tag.objects.using(alias)
+            tags.bulk_create([Tag(name=name)], ignore_conflicts=True)
+            tag = tags.get(name=name)
+            EntryTag.objects.using(alias).bulk_create(
+                [EntryTag(entry_id=entry_id, tag=tag) for entry_id in tagged],
+                ignore_conflicts=True,
+            )
+    return len(tagged)
+
+
+def bulk_remove_tag(user, entry_ids, name):
+    """Remove a tag from the selected entries, returning how many had it"""
+    name = clean_tag(name)
+
+    def rewrite(tag_list):
+        if name not in tag_list:
+            return None
+        return [tag for tag in tag_list if tag != name]
+
+    with transaction.atomic(using=shard_for_user(user.pk)):
+        untagged = _rewrite_tags(user, entry_ids, rewrite)
+        EntryTag.objects.for_user(user).filter(
+            entry_id__in=untagged, tag__name=name
+        ).delete()
+    return len(untagged)
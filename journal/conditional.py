@@ -0,0 +1,100 @@
+"""
+Conditional responses (ETag / Last-Modified) for journal views
+
+Unchanged resources are answered with 304 before anything is rendered.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import md5
+from django.utils.http import http_date, quote_etag
+from .fragments import ENTRY_CARD_VERSION, template_engine
+
+
+def _validators(etag, last_modified):
+    etag = quote_etag(etag)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp
+
+
+def _add_validators(request, response, etag, timestamp):
+    if request.method in ('GET', 'HEAD'):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def conditional_response(request, etag, last_modified, build):
+    """
+    Answer a conditional request, calling build() only when needed
+
+    A matching If-None-Match or If-Modified-Since gives 304 and a failed
+    If-Match gives 412, both without building the body.
+    """
+    etag, timestamp = _validators(etag, last_modified)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = build()
+    return _add_validators(request, response, etag, timestamp)
+
+
+def has_pending_messages(request):
+    """Return whether flash messages are waiting to be shown"""
+    # len() does not mark the messages as seen
+    return bool(len(get_messages(request)))
+
+
+def page_etag(request, *parts):
+    """
+    Return an ETag for an HTML page showing the given data
+
+    Besides the data, a page depends on who is viewing it, the CSRF
+    secret any form on it was rendered with and how it was rendered.
+    The secret is created here if needed, so the first response already
+    carries the cookie later visits revalidate with.
+    """
+    get_token(request)
+    key = ':'.join(str(part) for part in (
+        request.user.pk,
+        request.user.get_username(),
+        request.META.get('CSRF_COOKIE', ''),
+        template_engine(),
+        ENTRY_CARD_VERSION,
+        request.get_full_path(),
+        *parts,
+    ))
+    return md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def conditional_page(request, etag, last_modified, render):
+    """
+    Return a revalidated HTML page, or 304 if the browser's copy is current
+
+    A page with pending flash messages is always rendered and sent
+    without validators, so the one-off messages are neither swallowed by
+    a 304 nor replayed later from the browser cache.
+    """
+    if has_pending_messages(request):
+        return render()
+    response = conditional_response(request, etag, last_modified, render)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+async def aconditional_page(request, etag, last_modified, render):
+    """conditional_page() for async views, awaiting render()"""
+    if await sync_to_async(has_pending_messages)(request):
+        return await render()
+    etag, timestamp = _validators(etag, last_modified)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = await render()
+    _add_validators(request, response, etag, timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
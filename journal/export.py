@@ -0,0 +1,134 @@
+import csv
+import heapq
+import json
+import zlib
+from itertools import islice
+from asgiref.sync import sync_to_async
+from .models import ArchivedEntry, GratitudeEntry
+
+EXPORT_FIELDS = [
+    'id', 'title', 'content', 'mood', 'tags', 'is_private',
+    'created_at', 'updated_at',
+]
+EXPORT_FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+    'md': ('text/markdown', 'md'),
+}
+
+# Rows fetched per database round trip while streaming
+CHUNK_SIZE = 500
+
+
+def export_queryset(user, model=GratitudeEntry):
+    """Return the user's entries with only the exported columns loaded"""
+    return model.objects.for_user(user).only(
+        *EXPORT_FIELDS
+    ).order_by('created_at', 'id')
+
+
+def iter_entries(user):
+    """
+    Yield the user's entries one chunk at a time
+
+    Archived entries are merged in by creation time, so the export reads
+    as one journal.
+    """
+    archived = (
+        entry.to_entry() for entry in export_queryset(
+            user, ArchivedEntry
+        ).iterator(chunk_size=CHUNK_SIZE)
+    )
+    yield from heapq.merge(
+        export_queryset(user).iterator(chunk_size=CHUNK_SIZE), archived,
+        key=lambda entry: (entry.created_at, entry.id),
+    )
+
+
+def entry_values(entry):
+    return {
+        'id': entry.id,
+        'title': entry.title,
+        'content': entry.content,
+        'mood': entry.mood,
+        'tags': entry.get_tags_list(),
+        'is_private': entry.is_private,
+        'created_at': entry.created_at.isoformat(),
+        'updated_at': entry.updated_at.isoformat(),
+    }
+
+
+def render_jsonl(entries, user):
+    for entry in entries:
+        yield json.dumps(entry_values(entry), ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """File-like object whose write() returns the line for streaming"""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(entries, user):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for entry in entries:
+        values = entry_values(entry)
+        values['tags'] = entry.tags
+        yield writer.writerow([values[field] for field in EXPORT_FIELDS])
+
+
+def render_markdown(entries, user):
+    yield f'# Gratitude Journal of {user.get_username()}\n\n'
+    for entry in entries:
+        heading = entry.title or entry.created_at.strftime('%B %d, %Y')
+        details = [
+            entry.created_at.strftime('%Y-%m-%d %H:%M'),
+            entry.get_mood_display(),
+        ]
+        tags = entry.get_tags_list()
+        if tags:
+            details.append(', '.join(tags))
+        yield (f'## {heading}\n\n*{" · ".join(details)}*\n\n'
+               f'{entry.content}\n\n---\n\n')
+
+
+RENDERERS = {
+    'jsonl': render_jsonl,
+    'csv': render_csv,
+    'md': render_markdown,
+}
+
+
+def gzip_stream(chunks):
+    """Compress a stream of text chunks into a gzip stream on the fly"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(user, export_format, compress=False):
+    """Return an iterator over the encoded export of the user's journal"""
+    chunks = RENDERERS[export_format](iter_entries(user), user)
+    if compress:
+        return gzip_stream(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
+
+
+async def aexport_stream(user, export_format, compress=False):
+    """
+    export_stream() as an async iterator, for ASGI servers
+
+    Django reads a sync iterator whole into memory before serving it
+    under ASGI, so the export is pulled off the event loop a batch of
+    chunks at a time instead.
+    """
+    chunks = export_stream(user, export_format, compress)
+    next_batch = sync_to_async(lambda: list(islice(chunks, CHUNK_SIZE)))
+    while batch := await next_batch():
+        for chunk in batch:
+            yield chunk
@@ -4,6 +4,90 @@ from django.contrib.auth.models import User
 from .models import GratitudeEntry
 
 
+def validate_title(title):
+    """Validate and strip an entry title"""
+    if title:
+        title = title.strip()
+        if len(title) > 200:
+            raise forms.ValidationError(
+                'Title must be 200 characters or less.'
+            )
+        if len(title) < 3:
+            raise forms.ValidationError(
+                'Title must be at least 3 characters long.'
+            )
+    return title
+
+
+def validate_content(content):
+    """Validate and strip entry content"""
+    if not content:
+        raise forms.ValidationError('Content is required.')
+
+    content = content.strip()
+    if len(content) < 10:
+        raise forms.ValidationError(
+            'Please write at least 10 characters about what you\'re '
+            'grateful for.'
+        )
+    if len(content) > 5000:
+        raise forms.ValidationError(
+            'Content must be 5000 characters or less.'
+        )
+
+    # Check for meaningful content (not just repeated characters)
+    if len(set(content.replace(' ', '').lower())) < 3:
+        raise forms.ValidationError(
+            'Please write meaningful content about your gratitude.'
+        )
+
+    return content
+
+
+def validate_tags(tags):
+    """
+    Validate comma-separated tags
+
+    Returns the cleaned comma-separated string and the list of tags.
+    """
+    if not tags:
+        return tags, []
+
+    tags = tags.strip()
+    # Split tags and validate
+    tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
+
+    # Validate individual tags
+    for tag in tag_list:
+        if len(tag) > 30:
+            raise forms.ValidationError(
+                f'Tag "{tag}" is too long. Tags must be 30 '
+                f'characters or less.'
+            )
+        if not tag.replace(' ', '').isalnum():
+            raise forms.ValidationError(
+                f'Tag "{tag}" contains invalid characters. Use only '
+                f'letters, numbers, and spaces.'
+            )
+
+    # Limit number of tags
+    if len(tag_list) > 10:
+        raise forms.ValidationError(
+            'You can have a maximum of 10 tags per entry.'
+        )
+
+    # Return cleaned tags as comma-separated string
+    return ', '.join(tag_list), tag_list
+
+
+def title_similarity_error(title, content):
+    """Return an error when the title just repeats the content's start"""
+    # If title and content are very similar, suggest improvement
+    if title and content and title.lower() in content.lower()[:50]:
+        return 'Consider making your title more unique from your content.'
+    return None
+
+
 class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(
         required=True,
@@ -104,89 +188,34 @@ class GratitudeEntryForm(forms.ModelForm):
 
     def clean_title(self):
         """Validate title field"""
-        title = self.cleaned_data.get('title')
-        if title:
-            title = title.strip()
-            if len(title) > 200:
-                raise forms.ValidationError(
-                    'Title must be 200 characters or less.'
-                )
-            if len(title) < 3:
-                raise forms.ValidationError(
-                    'Title must be at least 3 characters long.'
-                )
-        return title
+        return validate_title(self.cleaned_data.get('title'))
 
     def clean_content(self):
         """Validate content field"""
-        content = self.cleaned_data.get('content')
-        if not content:
-            raise forms.ValidationError('Content is required.')
-
-        content = content.strip()
-        if len(content) < 10:
-            raise forms.ValidationError(
-                'Please write at least 10 characters about what you\'re '
-                'grateful for.'
-            )
-        if len(content) > 5000:
-            raise forms.ValidationError(
-                'Content must be 5000 characters or less.'
-            )
-
-        # Check for meaningful content (not just repeated characters)
-        if len(set(content.replace(' ', '').lower())) < 3:
-            raise forms.ValidationError(
-                'Please write meaningful content about your gratitude.'
-            )
-
-        return content
+        return validate_content(self.cleaned_data.get('content'))
 
     def clean_tags(self):
         """Validate and clean tags field"""
-        tags = self.cleaned_data.get('tags')
-        if tags:
-            tags = tags.strip()
-            # Split tags and validate
-            tag_list = [tag.strip() for tag in tags.split(',')
-                        if tag.strip()]
-
-            # Validate individual tags
-            for tag in tag_list:
-                if len(tag) > 30:
-                    raise forms.ValidationError(
-                        f'Tag "{tag}" is too long. Tags must be 30 '
-                        f'characters or less.'
-                    )
-                if not tag.replace(' ', '').isalnum():
-                    raise forms.ValidationError(
-                        f'Tag "{tag}" contains invalid characters. Use only '
-                        f'letters, numbers, and spaces.'
-                    )
-
-            # Limit number of tags
-            if len(tag_list) > 10:
-                raise forms.ValidationError(
-                    'You can have a maximum of 10 tags per entry.'
-                )
-
-            # Return cleaned tags as comma-separated string
-            return ', '.join(tag_list)
+        tags, self.cleaned_tag_list = validate_tags(
+            self.cleaned_data.get('tags')
+        )
+        # Normalized tags are written to the Tag model on save
         return tags
 
+    def _save_m2m(self):
+        """Save the entry's normalized tags alongside other m2m data"""
+        super()._save_m2m()
+        self.instance.set_tags(getattr(self, 'cleaned_tag_list', []))
+
     def clean(self):
         """Overall form validation"""
         cleaned_data = super().clean()
 
         # Additional validation can be added here for cross-field validation
-        content = cleaned_data.get('content')
-        title = cleaned_data.get('title')
-
-        # If title and content are very similar, suggest improvement
-        if title and content and title.lower() in content.lower()[:50]:
-            self.add_error(
-                'title',
-                'Consider making your title more unique from your content.'
-            )
+        error = title_similarity_error(
+            cleaned_data.get('title'), cleaned_data.get('content')
+        )
+        if error:
+            self.add_error('title', error)
 
         return cleaned_data
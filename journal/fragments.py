@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+ENTRY_CARD_TEMPLATE = 'journal/entry_card.html'
+
+# Bump when entry_card.html changes so stale markup is never served
+ENTRY_CARD_VERSION = 2
+
+HITS_KEY = 'journal:entry-card:hits'
+MISSES_KEY = 'journal:entry-card:misses'
+
+
+def get_fragment_cache():
+    """Return the cache configured for rendered fragments"""
+    return caches[getattr(settings, 'JOURNAL_FRAGMENT_CACHE', 'default')]
+
+
+def template_engine():
+    """Return the name of the engine that renders the hot templates"""
+    return getattr(settings, 'JOURNAL_TEMPLATE_ENGINE', 'django')
+
+
+def entry_card_key(entry_id, updated_at):
+    """Return the cache key for one rendering of an entry card"""
+    return (f'journal:entry-card:{template_engine()}:{entry_id}:'
+            f'{updated_at.timestamp()}')
+
+
+def _count(cache, key, amount):
+    if not amount:
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # First use: the counter key does not exist yet
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, amount)
+
+
+def render_entry_cards(entries):
+    """
+    Return the rendered card for each entry, reusing cached markup
+
+    The whole page is fetched with one get_many() and the misses are
+    stored with one set_many().
+    """
+    cache = get_fragment_cache()
+    keys = [entry_card_key(entry.id, entry.updated_at) for entry in entries]
+    cached = cache.get_many(keys, version=ENTRY_CARD_VERSION)
+
+    cards, missed = [], {}
+    for key, entry in zip(keys, entries):
+        card = cached.get(key)
+        if card is None:
+            card = render_to_string(
+                ENTRY_CARD_TEMPLATE, {'entry': entry}, using=template_engine()
+            )
+            missed[key] = card
+        cards.append(mark_safe(card))
+
+    if missed:
+        cache.set_many(missed, version=ENTRY_CARD_VERSION)
+    _count(cache, HITS_KEY, len(keys) - len(missed))
+    _count(cache, MISSES_KEY, len(missed))
+    return cards
+
+
+def invalidate_entry_card(entry_id, updated_at):
+    """Drop the cached card for one version of an entry"""
+    get_fragment_cache().delete(
+        entry_card_key(entry_id, updated_at), version=ENTRY_CARD_VERSION
+    )
+
+
+def invalidate_entry_cards(entries):
+    """Drop the cached cards of several entries in one call"""
+    get_fragment_cache().delete_many(
+        [entry_card_key(entry.id, entry.updated_at) for entry in entries],
+        version=ENTRY_CARD_VERSION
+    )
+
+
+def get_cache_stats():
+    """Return the entry card hit and miss counters"""
+    cache = get_fragment_cache()
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counts.get(HITS_KEY, 0)
+    misses = counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_cache_stats():
+    """Reset the entry card hit and miss counters"""
+    get_fragment_cache().delete_many([HITS_KEY, MISSES_KEY])
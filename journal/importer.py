@@ -0,0 +1,217 @@
+import csv
+import json
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .activity import rebuild_user_activity
+from .forms import (
+    title_similarity_error, validate_content, validate_tags, validate_title
+)
+from .models import EntryTag, GratitudeEntry, Tag
+from .sharding import users_by_shard
+from .stats import rebuild_user_stats
+
+MOODS = {mood_value for mood_value, mood_label in GratitudeEntry.MOOD_CHOICES}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', ''}
+
+
+def read_jsonl(stream):
+    """Yield one dict per line of a JSON Lines stream"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield ValidationError(f'Invalid JSON: {error}')
+            continue
+        if not isinstance(row, dict):
+            yield ValidationError('Each line must be a JSON object.')
+            continue
+        yield row
+
+
+def read_csv(stream):
+    """Yield one dict per row of a CSV stream with a header line"""
+    yield from csv.DictReader(stream)
+
+
+def _text(row, field):
+    value = row.get(field)
+    return '' if value is None else str(value)
+
+
+def _bool(value, default=True):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError(f'"{value}" is not a valid true/false value.')
+
+
+def validate_row(row):
+    """
+    Validate an import row with the rules of GratitudeEntryForm
+
+    Returns the cleaned field values and the entry's tag list.
+    """
+    errors = []
+    cleaned = {}
+
+    def check(field, validator, value):
+        try:
+            cleaned[field] = validator(value)
+        except ValidationError as error:
+            errors.extend(error.messages)
+
+    title = _text(row, 'title').strip()
+    tags = _text(row, 'tags').strip()
+    if len(title) > 200:
+        errors.append('Title must be 200 characters or less.')
+    if len(tags) > 200:
+        errors.append('Ensure tags have at most 200 characters.')
+    check('title', validate_title, title)
+    check('content', validate_content, _text(row, 'content'))
+    check('tags', validate_tags, tags)
+
+    mood = _text(row, 'mood').strip() or 'good'
+    if mood not in MOODS:
+        errors.append(f'"{mood}" is not a valid mood.')
+    cleaned['mood'] = mood
+
+    check('is_private', _bool, row.get('is_private'))
+
+    created_at = row.get('created_at')
+    if created_at:
+        try:
+            parsed = parse_datetime(str(created_at))
+        except ValueError:
+            # Well formatted but impossible, such as February 30th
+            parsed = None
+        if parsed is None:
+            errors.append(f'"{created_at}" is not a valid datetime.')
+        elif timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        cleaned['created_at'] = parsed
+    else:
+        cleaned['created_at'] = timezone.now()
+
+    error = title_similarity_error(cleaned.get('title'), cleaned.get('content'))
+    if error:
+        errors.append(error)
+
+    if errors:
+        raise ValidationError(errors)
+
+    cleaned['tags'], tag_list = cleaned['tags']
+    cleaned['tags'] = cleaned['tags'] or ''
+    cleaned['title'] = cleaned['title'] or ''
+    return cleaned, tag_list
+
+
+class EntryImporter:
+    """
+    Validate rows and write them with bulk_create in fixed-size batches
+
+    Only the current batch is held in memory. Counters and daily activity
+    for the affected users are rebuilt once the import finishes, because
+    bulk_create bypasses the per-entry write paths.
+    """
+
+    def __init__(self, user=None, batch_size=1000, dry_run=False):
+        self.user = user
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.imported = 0
+        self.rejected = 0
+        self.user_ids = set()
+        self._batch = []
+        self._usernames = {}
+
+    def resolve_user_id(self, row):
+        if self.user is not None:
+            return self.user.pk
+        username = _text(row, 'username').strip()
+        if not username:
+            raise ValidationError('A username is required.')
+        if username not in self._usernames:
+            self._usernames[username] = User.objects.filter(
+                username=username
+            ).values_list('id', flat=True).first()
+        if self._usernames[username] is None:
+            raise ValidationError(f'Unknown user "{username}".')
+        return self._usernames[username]
+
+    def add(self, row):
+        """Validate one row, raising ValidationError if it is rejected"""
+        try:
+            if isinstance(row, ValidationError):
+                raise row
+            user_id = self.resolve_user_id(row)
+            cleaned, tag_list = validate_row(row)
+        except ValidationError:
+            self.rejected += 1
+            raise
+        self._batch.append((GratitudeEntry(user_id=user_id, **cleaned),
+                            tag_list))
+        self.user_ids.add(user_id)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the pending batch in one transaction per shard"""
+        batch, self._batch = self._batch, []
+        if not batch or self.dry_run:
+            self.imported += len(batch)
+            return
+
+        shards = users_by_shard({entry.user_id for entry, _ in batch})
+        for alias, user_ids in shards.items():
+            user_ids = set(user_ids)
+            self.write(alias, [
+                (entry, tag_list) for entry, tag_list in batch
+                if entry.user_id in user_ids
+            ])
+        self.imported += len(batch)
+
+    def write(self, alias, batch):
+        """Write the rows of a batch that belong on one shard"""
+        with transaction.atomic(using=alias):
+            entries = GratitudeEntry.objects.using(alias).bulk_create(
+                [entry for entry, tag_list in batch]
+            )
+            names = {name for entry, tag_list in batch for name in tag_list}
+            if names:
+                tags = Tag.objects.using(alias)
+                tags.bulk_create(
+                    [Tag(name=name) for name in names], ignore_conflicts=True
+                )
+                tag_ids = dict(
+                    tags.filter(name__in=names).values_list('name', 'id')
+                )
+                EntryTag.objects.using(alias).bulk_create(
+                    [
+                        EntryTag(entry_id=entry.pk, tag_id=tag_ids[name])
+                        for entry, (_, tag_list) in zip(entries, batch)
+                        for name in dict.fromkeys(tag_list)
+                    ],
+                    ignore_conflicts=True,
+                )
+
+    def finish(self):
+        """Flush the last batch and rebuild derived per-user data"""
+        self.flush()
+        if self.dry_run:
+            return
+        for user_id in self.user_ids:
+            rebuild_user_activity(user_id)
+            rebuild_user_stats(User(pk=user_id))
@@ -0,0 +1,42 @@
+"""
+Jinja2 environment for the optional Jinja2 template backend
+
+Exposes ``static()`` and ``url()`` as globals and reuses Django's own
+filter implementations so both engines render the same markup.
+"""
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+
+
+def url(viewname, *args, **kwargs):
+    """Reverse a URL pattern name, like the {% url %} tag"""
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def date(value, arg=None):
+    """Format a datetime in the current time zone, like |date"""
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def timesince(value, arg=None):
+    return defaultfilters.timesince_filter(value, arg)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+    })
+    env.filters.update({
+        'date': date,
+        'linebreaksbr': defaultfilters.linebreaksbr,
+        'pluralize': defaultfilters.pluralize,
+        'timesince': timesince,
+        'truncatewords': defaultfilters.truncatewords,
+        'urlencode': defaultfilters.urlencode,
+    })
+    return env
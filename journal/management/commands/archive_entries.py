@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from journal.archive import (
+    ARCHIVE_BATCH_SIZE, archivable, archive_cutoff, archive_entries
+)
+from journal.sharding import journal_shards
+
+
+class Command(BaseCommand):
+    help = ('Move entries not written for a while into the compressed '
+            'archive, one batch per transaction')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Archive entries not written for this many days '
+                 '(default: JOURNAL_ARCHIVE_AFTER_DAYS, or 365)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+            help=f'Entries moved per transaction '
+                 f'(default: {ARCHIVE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--max-batches', type=int,
+            help='Stop after this many batches per shard, leaving the rest '
+                 'for the next run'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Count the entries due for archiving without moving them'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        before = archive_cutoff(options['days'])
+
+        if options['dry_run']:
+            due = sum(
+                archivable(alias, before).count() for alias in journal_shards()
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{due} entries would be archived.'
+            ))
+            return
+
+        archived = archive_entries(
+            before, options['batch_size'], options['max_batches']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} entries.'
+        ))
@@ -0,0 +1,110 @@
+import json
+import sys
+import time
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from journal.importer import EntryImporter, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = 'Import gratitude entries from a JSON Lines or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='File to import, or - to read standard input'
+        )
+        parser.add_argument(
+            '--format', choices=['jsonl', 'csv'],
+            help='Input format (default: guessed from the file extension)'
+        )
+        parser.add_argument(
+            '--user',
+            help='Import every row for this username instead of each '
+                 "row's username column"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows written per bulk insert and transaction '
+                 '(default: 1000)'
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Write rejected rows and their errors to this JSONL file'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate the input without writing any entries'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        self.verbosity = options['verbosity']
+        input_format = options['format']
+        if input_format is None:
+            input_format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'Unknown user "{options["user"]}".')
+
+        importer = EntryImporter(
+            user=user,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        reader = read_csv if input_format == 'csv' else read_jsonl
+
+        stream = sys.stdin if path == '-' else open(
+            path, newline='', encoding='utf-8'
+        )
+        rejects = open(options['rejects'], 'w', encoding='utf-8') \
+            if options['rejects'] else None
+        started = time.monotonic()
+        try:
+            for number, row in enumerate(reader(stream), start=1):
+                try:
+                    importer.add(row)
+                except ValidationError as error:
+                    self.report_reject(rejects, number, row, error)
+                if options['verbosity'] > 1 and number % 10000 == 0:
+                    self.report_progress(importer, started)
+            importer.finish()
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects:
+                rejects.close()
+
+        elapsed = time.monotonic() - started
+        rate = importer.imported / elapsed if elapsed else 0
+        action = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {importer.imported} entries, rejected '
+            f'{importer.rejected} rows in {elapsed:.1f}s '
+            f'({rate:.0f} rows/s).'
+        ))
+
+    def report_reject(self, rejects, number, row, error):
+        if rejects:
+            rejects.write(json.dumps({
+                'row_number': number,
+                'errors': error.messages,
+                'row': row if isinstance(row, dict) else None,
+            }) + '\n')
+        elif self.verbosity > 0:
+            self.stderr.write(
+                f'Row {number}: {"; ".join(error.messages)}'
+            )
+
+    def report_progress(self, importer, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{importer.imported + importer.rejected} rows processed, '
+            f'{importer.imported / elapsed:.0f} rows/s'
+        )
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imports the project the way a worker does: settings, app registry, URLs.
+# -X importtime only times the import statement, so import_module(), which
+# Django loads apps and models with, is routed through __import__().
+STARTUP_SCRIPT = '''
+import importlib, importlib.util, os, sys
+def import_module(name, package=None):
+    name = importlib.util.resolve_name(name, package)
+    __import__(name)
+    return sys.modules[name]
+importlib.import_module = import_module
+import django
+import_module(os.environ['DJANGO_SETTINGS_MODULE'])
+django.setup()
+from django.conf import settings
+import_module(settings.ROOT_URLCONF)
+'''
+
+
+def parse_importtime(output):
+    """Return (module, self_us, cumulative_us) rows from -X importtime"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The column header
+        rows.append((
+            fields[2].strip(), int(fields[0]), int(fields[1])
+        ))
+    return rows
+
+
+class Command(BaseCommand):
+    help = ('Report the import time of each project module when the '
+            'settings, the journal app and the URLs are loaded')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true', dest='all_modules',
+            help='Include third-party and standard library modules'
+        )
+        parser.add_argument(
+            '--sort', choices=['cumulative', 'self'], default='cumulative',
+            help='Order modules by cumulative or self time '
+                 '(default: cumulative)'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=0,
+            help='Only show this many modules (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        # A fresh interpreter, since this one has imported everything
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+            },
+        )
+        rows = parse_importtime(result.stderr)
+        if result.returncode or not rows:
+            raise CommandError(
+                f'Importing the project failed:\n{result.stderr[-2000:]}'
+            )
+
+        total = sum(self_us for module, self_us, cumulative_us in rows)
+        packages = {
+            settings.SETTINGS_MODULE.split('.')[0], 'gratitude_journal',
+            'journal',
+        }
+        if not options['all_modules']:
+            rows = [
+                row for row in rows if row[0].split('.')[0] in packages
+            ]
+        project = sum(self_us for module, self_us, cumulative_us in rows)
+        column = 2 if options['sort'] == 'cumulative' else 1
+        rows.sort(key=lambda row: row[column], reverse=True)
+        if options['limit'] > 0:
+            rows = rows[:options['limit']]
+
+        self.stdout.write(f'{"self ms":>9} {"cumul. ms":>10}  module')
+        for module, self_us, cumulative_us in rows:
+            self.stdout.write(
+                f'{self_us / 1000:9.1f} {cumulative_us / 1000:10.1f}  {module}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Startup imports took {total / 1000:.1f} ms, '
+            f'{project / 1000:.1f} ms of it in the listed modules.'
+        ))
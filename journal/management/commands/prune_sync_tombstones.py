@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from journal.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete entry tombstones older than the sync retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Keep this many days of tombstones (default: '
+                 'JOURNAL_SYNC_TOMBSTONE_DAYS, or 30)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} tombstones.'
+        ))
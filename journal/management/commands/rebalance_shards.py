@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from journal.rebalance import move_users
+from journal.sharding import (
+    journal_shards, pick_shard, sharding_enabled, users_by_shard
+)
+
+
+class Command(BaseCommand):
+    help = ("Move users' journals between shards while they stay in use, "
+            "by default to the shard their id hashes to")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', default=[],
+            help='Only move this username (repeatable)'
+        )
+        parser.add_argument(
+            '--to', dest='target',
+            help='Move the given users to this shard alias'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Users switched to their new shards together (default: 100)'
+        )
+        parser.add_argument(
+            '--settle', type=float, default=30,
+            help='Seconds to wait after switching a batch for requests '
+                 'still using the old shards to finish (default: 30)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='List the moves without making them'
+        )
+
+    def handle(self, *args, **options):
+        if not sharding_enabled():
+            raise CommandError(
+                'Sharding is off: set DATABASE_SHARD_URLS to add shards.'
+            )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        target = options['target']
+        if target is not None:
+            if target not in journal_shards():
+                raise CommandError(
+                    f'Unknown shard "{target}". Shards: '
+                    f'{", ".join(journal_shards())}.'
+                )
+            if not options['usernames']:
+                raise CommandError('--to needs at least one --user.')
+
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        users = {user.pk: user for user in users.only('id', 'username')}
+        missing = set(options['usernames']) - {
+            user.username for user in users.values()
+        }
+        if missing:
+            raise CommandError(f'Unknown users: {", ".join(sorted(missing))}.')
+
+        moves = []
+        for source, user_ids in users_by_shard(list(users)).items():
+            for user_id in user_ids:
+                destination = target or pick_shard(user_id)
+                if destination != source:
+                    moves.append((users[user_id], source, destination))
+        moves.sort(key=lambda move: move[0].pk)
+
+        if options['dry_run']:
+            for user, source, destination in moves:
+                self.stdout.write(
+                    f'Would move {user.username} from {source} to '
+                    f'{destination}.'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'Checked {len(users)} users, would move {len(moves)}.'
+            ))
+            return
+
+        batch_size = options['batch_size']
+        for start in range(0, len(moves), batch_size):
+            batch = moves[start:start + batch_size]
+            for move in move_users(
+                [(user, destination) for user, source, destination in batch],
+                settle=options['settle'],
+            ):
+                self.stdout.write(
+                    f'Moved {move.user.username} from {move.source} to '
+                    f'{move.target} ({move.copied} rows copied).'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(users)} users, moved {len(moves)}.'
+        ))
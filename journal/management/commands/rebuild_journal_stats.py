@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from journal.models import ArchivedEntry, GratitudeEntry, UserJournalStats
+from journal.sharding import users_by_shard
+from journal.stats import (
+    combine_counters, counter_aggregates, counter_fields, save_counters
+)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or repair the denormalized per-user journal counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', default=[],
+            help='Only rebuild counters for this username (repeatable)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of users aggregated per query (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted counters without writing them'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        user_ids = list(users.values_list('id', flat=True))
+
+        fields = counter_fields()
+        batch_size = options['batch_size']
+        repaired = 0
+        for start in range(0, len(user_ids), batch_size):
+            shards = users_by_shard(user_ids[start:start + batch_size])
+            for alias, batch in shards.items():
+                changed = self.drifted(alias, batch, fields)
+                repaired += len(changed)
+                if changed and not options['dry_run']:
+                    save_counters(changed, using=alias)
+
+        action = 'would repair' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(user_ids)} users, {action} {repaired} '
+            f'counter rows.'
+        ))
+
+    def drifted(self, alias, batch, fields):
+        """Return fresh counters for the users whose stored ones drifted"""
+        hot, archived = (
+            {
+                row.pop('user_id'): row
+                for row in model.objects.using(alias).filter(
+                    user_id__in=batch
+                ).values('user_id').annotate(**counter_aggregates())
+            }
+            for model in (GratitudeEntry, ArchivedEntry)
+        )
+        existing = {
+            row.pop('user_id'): row
+            for row in UserJournalStats.objects.using(alias).filter(
+                user_id__in=batch
+            ).values('user_id', *fields)
+        }
+
+        # A user without a counters row reads as having no entries
+        empty = combine_counters({}, {})
+        changed = []
+        for user_id in batch:
+            counts = combine_counters(
+                hot.get(user_id, {}), archived.get(user_id, {})
+            )
+            if existing.get(user_id, empty) != counts:
+                changed.append(UserJournalStats(user_id=user_id, **counts))
+        return changed
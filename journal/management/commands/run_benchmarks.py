@@ -0,0 +1,96 @@
+import json
+import platform
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from journal.benchmarks.cases import get_cases
+from journal.benchmarks.dataset import seed
+from journal.benchmarks.runner import compare, time_case
+
+
+class Command(BaseCommand):
+    help = 'Time the journal hot paths against a synthetic dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entries', type=int, default=1000,
+            help='Number of synthetic entries to seed (default: 1000)'
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=50,
+            help='Timed iterations per case (default: 50)'
+        )
+        parser.add_argument(
+            '--case', action='append', dest='cases', default=[],
+            help='Only run this case (repeatable)'
+        )
+        parser.add_argument(
+            '--output', default='benchmark_results.json',
+            help='Where to write the JSON results'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Compare against results stored in this JSON file'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=1.2,
+            help='p50 ratio over the baseline counted as a regression '
+                 '(default: 1.2)'
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Exit with an error when a regression is found'
+        )
+
+    def handle(self, *args, **options):
+        # RequestFactory requests use the "testserver" host name
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            user = seed(entries=options['entries'])
+            cases = get_cases(user)
+            unknown = set(options['cases']) - set(cases)
+            if unknown:
+                raise CommandError(
+                    f'Unknown benchmark case: {", ".join(sorted(unknown))}'
+                )
+            results = {}
+            for name, func in cases.items():
+                if options['cases'] and name not in options['cases']:
+                    continue
+                results[name] = time_case(func, options['iterations'])
+                self.stdout.write(
+                    f"{name:<22} p50 {results[name]['p50_ms']:>9.3f}ms  "
+                    f"p95 {results[name]['p95_ms']:>9.3f}ms  "
+                    f"queries {results[name]['queries']}"
+                )
+            # Leave no benchmark data behind
+            transaction.set_rollback(True)
+
+        with open(options['output'], 'w', encoding='utf-8') as handle:
+            json.dump({
+                'meta': {
+                    'created_at': timezone.now().isoformat(),
+                    'entries': options['entries'],
+                    'python': platform.python_version(),
+                },
+                'results': results,
+            }, handle, indent=2)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            self.compare_baseline(results, options)
+
+    def compare_baseline(self, results, options):
+        try:
+            with open(options['baseline'], encoding='utf-8') as handle:
+                baseline = json.load(handle)['results']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Could not read baseline: {error}')
+
+        regressions = compare(results, baseline, options['threshold'])
+        for name, message in regressions:
+            self.stdout.write(self.style.WARNING(f'REGRESSION {name}: {message}'))
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
+        elif options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} benchmark regressions.')
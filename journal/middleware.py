@@ -0,0 +1,268 @@
+import json
+import logging
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async,
+)
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+from whitenoise.middleware import WhiteNoiseMiddleware
+from .sharding import sharding_enabled, user_shard
+
+logger = logging.getLogger('journal.timing')
+
+# The timer of the request being handled in this thread or task
+current_timer = ContextVar('journal_request_timer', default=None)
+
+
+class RequestTimer:
+    """Database, template and view time spent handling one request"""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.tpl = 0.0
+        self.view_started = None
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper timing every query on the connection"""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - start
+            self.queries += 1
+
+
+def timed_render(render):
+    """Wrap a template backend's render() to add to the request's tpl time"""
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        timer = current_timer.get()
+        # Nested renders are already inside the outer one's time
+        if timer is None or timer.rendering:
+            return render(self, *args, **kwargs)
+        timer.rendering = True
+        start = perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            timer.tpl += perf_counter() - start
+            timer.rendering = False
+    wrapper.timed = True
+    return wrapper
+
+
+def install_template_timing():
+    """Time renders of both template backends, once per process"""
+    backends = [django_backend.Template]
+    try:
+        from django.template.backends import jinja2 as jinja2_backend
+    except ImportError:
+        pass
+    else:
+        backends.append(jinja2_backend.Template)
+    for template_class in backends:
+        if not getattr(template_class.render, 'timed', False):
+            template_class.render = timed_render(template_class.render)
+
+
+def timed_execute(execute, sql, params, many, context):
+    """Execute wrapper handing queries to the current request's timer"""
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timing(connection, **kwargs):
+    """Add timed_execute to a connection's execute wrappers, once"""
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_execute)
+
+
+# Connections are per thread, and under ASGI queries run in sync_to_async
+# worker threads, so the wrapper goes on each connection as it is opened
+# there. The timer reaches those threads through the copied context.
+connection_created.connect(install_query_timing)
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 2)
+
+
+class ServerTimingMiddleware:
+    """
+    Report where a journal request spent its time
+
+    Adds a Server-Timing header with db (query time and count), tpl
+    (template rendering), view (from the view being called until its
+    response is back here, including its db and tpl time) and total to
+    responses from journal views. With JOURNAL_TIMING_LOG enabled the
+    same figures are logged as one JSON line to the ``journal.timing``
+    logger.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Avoids a thread hop to call a sync process_view
+            self.process_view = self.aprocess_view
+        install_template_timing()
+        # Connections this thread opened before the middleware loaded
+        for connection in connections.all(initialized_only=True):
+            install_query_timing(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = RequestTimer()
+        token = current_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.report(request, response, timer)
+
+    async def __acall__(self, request):
+        timer = RequestTimer()
+        token = current_timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.report(request, response, timer)
+
+    def report(self, request, response, timer):
+        finished = perf_counter()
+        match = request.resolver_match
+        if match is None or match.app_name != 'journal':
+            return response
+
+        view = finished - (timer.view_started or finished)
+        metrics = [
+            ('db', timer.db, f'{timer.queries} queries'),
+            ('tpl', timer.tpl, None),
+            ('view', view, None),
+            ('total', finished - timer.started, None),
+        ]
+        if getattr(settings, 'JOURNAL_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={milliseconds(value)}'
+                + (f';desc="{desc}"' if desc else '')
+                for name, value, desc in metrics
+            )
+        if getattr(settings, 'JOURNAL_TIMING_LOG', False):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'route': match.view_name,
+                'status': response.status_code,
+                'queries': timer.queries,
+                **{f'{name}_ms': milliseconds(value)
+                   for name, value, desc in metrics},
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer = current_timer.get()
+        if timer is not None:
+            timer.view_started = perf_counter()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        ServerTimingMiddleware.process_view(
+            self, request, view_func, view_args, view_kwargs
+        )
+
+
+class UserShardMiddleware:
+    """
+    Run each request inside its user's shard scope
+
+    Journal queries not bound to a shard with ``for_user()`` then reach
+    the logged-in user's shard. With sharding on, the shard is looked up
+    before the view runs, so async views can bind querysets to it without
+    querying from the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with user_shard(request.user) as scope:
+            if sharding_enabled():
+                scope.shard()
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with user_shard(request.user) as scope:
+            if sharding_enabled():
+                await sync_to_async(scope.shard)()
+            return await self.get_response(request)
+
+
+async def aiter_file(filelike, block_size):
+    """Read a file in blocks off the event loop, closing it at the end"""
+    read = sync_to_async(filelike.read, thread_sensitive=False)
+    try:
+        while chunk := await read(block_size):
+            yield chunk
+    finally:
+        await sync_to_async(filelike.close, thread_sensitive=False)()
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that does not block the event loop under ASGI
+
+    Files are opened and read in worker threads and streamed with an
+    async iterator, which Django would otherwise read whole into memory.
+    Under WSGI it behaves exactly like WhiteNoiseMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        response = await sync_to_async(
+            self.serve, thread_sensitive=False
+        )(static_file, request)
+        filelike = getattr(response, 'file_to_stream', None)
+        if filelike is not None:
+            response.streaming_content = aiter_file(
+                filelike, response.block_size
+            )
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0002_make_title_optional'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gratitudeentry',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='journal_entry_user_created'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def populate_tags(apps, schema_editor):
+    """Create Tag and EntryTag rows from the comma-separated tags field"""
+    GratitudeEntry = apps.get_model('journal', 'GratitudeEntry')
+    Tag = apps.get_model('journal', 'Tag')
+    EntryTag = apps.get_model('journal', 'EntryTag')
+
+    entries = GratitudeEntry.objects.exclude(tags='').values_list('id', 'tags')
+    entry_names = []
+    for entry_id, tags in entries.iterator(chunk_size=2000):
+        names = {tag.strip()[:30] for tag in tags.split(',') if tag.strip()}
+        entry_names.append((entry_id, names))
+
+    all_names = set().union(*(names for _, names in entry_names))
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in all_names], ignore_conflicts=True
+    )
+    tag_ids = dict(Tag.objects.values_list('name', 'id'))
+
+    EntryTag.objects.bulk_create(
+        [
+            EntryTag(entry_id=entry_id, tag_id=tag_ids[name])
+            for entry_id, names in entry_names
+            for name in names
+        ],
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0004_tag'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_daily_activity(apps, schema_editor):
+    """Build daily activity rows and streaks from existing entries"""
+    GratitudeEntry = apps.get_model('journal', 'GratitudeEntry')
+    DailyActivity = apps.get_model('journal', 'DailyActivity')
+
+    days = GratitudeEntry.objects.annotate(
+        day=TruncDate('created_at', tzinfo=timezone.get_default_timezone())
+    ).values('user_id', 'day').annotate(count=Count('id')).order_by(
+        'user_id', 'day'
+    )
+
+    rows = []
+    for day in days.iterator(chunk_size=2000):
+        streak = 1
+        if rows:
+            last = rows[-1]
+            if (last.user_id == day['user_id'] and
+                    last.date == day['day'] - timedelta(days=1)):
+                streak = last.streak + 1
+        rows.append(DailyActivity(
+            user_id=day['user_id'], date=day['day'],
+            entry_count=day['count'], streak=streak
+        ))
+    DailyActivity.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0006_daily_activity'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            populate_daily_activity, migrations.RunPython.noop
+        ),
+    ]
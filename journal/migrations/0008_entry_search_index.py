@@ -0,0 +1,79 @@
+from django.db import migrations
+
+# Frozen copies of journal.search at the time of this migration, so later
+# changes to that module do not change what this migration does
+SEARCH_CONFIG = 'english'
+POSTGRES_INDEX_NAME = 'journal_entry_search'
+SQLITE_FTS_TABLE = 'journal_entry_fts'
+
+SQLITE_INSTALL_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5(
+        title, content, tags,
+        content='journal_gratitudeentry', content_rowid='id',
+        tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai
+    AFTER INSERT ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad
+    AFTER DELETE ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title,
+                                       content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au
+    AFTER UPDATE OF title, content, tags ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title,
+                                       content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END""",
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}",
+]
+
+
+def install(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+        schema_editor.add_index(
+            apps.get_model('journal', 'GratitudeEntry'),
+            GinIndex(
+                SearchVector('title', 'content', 'tags', config=SEARCH_CONFIG),
+                name=POSTGRES_INDEX_NAME,
+            )
+        )
+    elif vendor == 'sqlite':
+        for statement in SQLITE_INSTALL_SQL:
+            schema_editor.execute(statement)
+
+
+def uninstall(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{POSTGRES_INDEX_NAME}"')
+    elif vendor == 'sqlite':
+        for statement in SQLITE_UNINSTALL_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0007_populate_daily_activity'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
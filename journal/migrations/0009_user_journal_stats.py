@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0008_entry_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserJournalStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_entries', models.PositiveIntegerField(default=0)),
+                ('excellent_count', models.PositiveIntegerField(default=0)),
+                ('good_count', models.PositiveIntegerField(default=0)),
+                ('okay_count', models.PositiveIntegerField(default=0)),
+                ('difficult_count', models.PositiveIntegerField(default=0)),
+                ('challenging_count', models.PositiveIntegerField(default=0)),
+                ('private_count', models.PositiveIntegerField(default=0)),
+                ('public_count', models.PositiveIntegerField(default=0)),
+                ('first_entry_at', models.DateTimeField(blank=True, null=True)),
+                ('last_entry_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='journal_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User Journal Stats',
+            },
+        ),
+    ]
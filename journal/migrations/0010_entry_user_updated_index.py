@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0009_user_journal_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gratitudeentry',
+            index=models.Index(fields=['user', '-updated_at'], name='journal_entry_user_updated'),
+        ),
+    ]
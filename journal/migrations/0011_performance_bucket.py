@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0010_entry_user_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('route', models.CharField(max_length=100)),
+                ('metric', models.CharField(max_length=20)),
+                ('day', models.DateField(db_index=True)),
+                ('bucket', models.SmallIntegerField()),
+                ('count', models.PositiveIntegerField()),
+            ],
+        ),
+    ]
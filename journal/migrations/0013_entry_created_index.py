@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0012_entry_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gratitudeentry',
+            index=models.Index(fields=['-created_at', '-id'], name='journal_entry_created'),
+        ),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:32
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+import django.db.models.deletion
+
+# Frozen copies of journal.sharding and the SQLite part of 0008, so later
+# changes to those modules do not change what this migration does
+SHARD_ID_SPACE = 1 << 40
+SHARD_ID_TABLES = ['journal_gratitudeentry', 'journal_entrytombstone']
+SQLITE_FTS_TABLE = 'journal_entry_fts'
+
+SQLITE_TRIGGERS_SQL = [
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai
+    AFTER INSERT ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad
+    AFTER DELETE ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title,
+                                       content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au
+    AFTER UPDATE OF title, content, tags ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title,
+                                       content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END""",
+]
+
+SQLITE_INSTALL_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5(
+        title, content, tags,
+        content='journal_gratitudeentry', content_rowid='id',
+        tokenize='porter unicode61'
+    )""",
+    *SQLITE_TRIGGERS_SQL,
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def install_search_index(apps, schema_editor):
+    """Create the full-text index as migration 0008 does"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+        schema_editor.add_index(
+            apps.get_model('journal', 'GratitudeEntry'),
+            GinIndex(
+                SearchVector('title', 'content', 'tags', config='english'),
+                name='journal_entry_search',
+            )
+        )
+    elif vendor == 'sqlite':
+        for statement in SQLITE_INSTALL_SQL:
+            schema_editor.execute(statement)
+
+
+def seed_id_sequences(connection, index):
+    """Start a shard's entry and tombstone ids in the shard's own range"""
+    start = index * SHARD_ID_SPACE
+    if not start:
+        return
+    with connection.cursor() as cursor:
+        for table in SHARD_ID_TABLES:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    'UPDATE sqlite_sequence SET seq = MAX(seq, %s) '
+                    'WHERE name = %s', [start, table]
+                )
+                if not cursor.rowcount:
+                    cursor.execute(
+                        'INSERT INTO sqlite_sequence (name, seq) '
+                        'VALUES (%s, %s)', [table, start]
+                    )
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) "
+                    f"FROM {table})))", [table, start]
+                )
+
+
+def prepare_shard(apps, schema_editor):
+    """
+    Give a new shard the search index and its own range of ids
+
+    SQLite applies the user field changes above by rebuilding the entries
+    table, which drops its search triggers, so they are reinstalled on
+    existing databases too.
+    """
+    connection = schema_editor.connection
+    alias = connection.alias
+    shards = list(getattr(settings, 'JOURNAL_SHARDS', [DEFAULT_DB_ALIAS]))
+    if alias == DEFAULT_DB_ALIAS or alias not in shards:
+        if connection.vendor == 'sqlite':
+            for statement in SQLITE_TRIGGERS_SQL:
+                schema_editor.execute(statement)
+        return
+    install_search_index(apps, schema_editor)
+    seed_id_sequences(connection, shards.index(alias))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0013_entry_created_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyactivity',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='entrytombstone',
+            name='entry_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='entrytombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='entry_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='gratitudeentry',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='gratitude_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='userjournalstats',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='journal_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=50)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='journal_shard', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(
+            prepare_shard, migrations.RunPython.noop,
+            hints={'shards': True},
+        ),
+    ]
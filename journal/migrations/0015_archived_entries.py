@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0014_user_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userjournalstats',
+            name='archived_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ArchivedEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('content', models.BinaryField()),
+                ('mood', models.CharField(choices=[('excellent', '😄 Excellent'), ('good', '😊 Good'), ('okay', '😐 Okay'), ('difficult', '😔 Difficult'), ('challenging', '😰 Challenging')], default='good', max_length=20)),
+                ('tags', models.CharField(blank=True, max_length=200)),
+                ('is_private', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Archived Entries',
+                'indexes': [models.Index(fields=['user', 'created_at', 'id'], name='journal_archive_user_created')],
+            },
+        ),
+    ]
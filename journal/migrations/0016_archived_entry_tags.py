@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_archived_tags(apps, schema_editor):
+    """Link entries archived before their tag links were kept"""
+    ArchivedEntry = apps.get_model('journal', 'ArchivedEntry')
+    ArchivedEntryTag = apps.get_model('journal', 'ArchivedEntryTag')
+    Tag = apps.get_model('journal', 'Tag')
+    alias = schema_editor.connection.alias
+
+    entries = ArchivedEntry.objects.using(alias).exclude(
+        tags=''
+    ).values_list('id', 'tags')
+    entry_names = []
+    for entry_id, tags in entries.iterator(chunk_size=2000):
+        names = {tag.strip()[:30] for tag in tags.split(',') if tag.strip()}
+        entry_names.append((entry_id, names))
+
+    all_names = set().union(*(names for _, names in entry_names))
+    Tag.objects.using(alias).bulk_create(
+        [Tag(name=name) for name in all_names], ignore_conflicts=True
+    )
+    tag_ids = dict(Tag.objects.using(alias).values_list('name', 'id'))
+
+    ArchivedEntryTag.objects.using(alias).bulk_create(
+        [
+            ArchivedEntryTag(entry_id=entry_id, tag_id=tag_ids[name])
+            for entry_id, names in entry_names
+            for name in names
+        ],
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0015_archived_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEntryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedentry',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='journal_archive_user_updated'),
+        ),
+        migrations.AddField(
+            model_name='archivedentrytag',
+            name='entry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='journal.archivedentry'),
+        ),
+        migrations.AddField(
+            model_name='archivedentrytag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_entry_links', to='journal.tag'),
+        ),
+        migrations.AddField(
+            model_name='archivedentry',
+            name='tag_objects',
+            field=models.ManyToManyField(blank=True, related_name='archived_entries', through='journal.ArchivedEntryTag', to='journal.tag'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedentrytag',
+            unique_together={('tag', 'entry')},
+        ),
+        migrations.RunPython(
+            populate_archived_tags, migrations.RunPython.noop,
+            hints={'shards': True},
+        ),
+    ]
@@ -1,8 +1,40 @@
+import zlib
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 
+class UserQuerySet(models.QuerySet):
+    """QuerySet of journal rows that belong to one user's shard"""
+
+    user_lookup = 'user_id'
+
+    def for_user(self, user):
+        """Return the user's rows, read from the shard holding them"""
+        from .sharding import shard_for_user, sharding_enabled
+        user_id = getattr(user, 'pk', user)
+        queryset = self.filter(**{self.user_lookup: user_id})
+        if sharding_enabled():
+            queryset = queryset.using(shard_for_user(user_id))
+        return queryset
+
+
+class EntryTagQuerySet(UserQuerySet):
+    user_lookup = 'entry__user_id'
+
+
+class Tag(models.Model):
+    """A normalized tag shared by gratitude entries"""
+
+    name = models.CharField(max_length=30, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class GratitudeEntry(models.Model):
     """Model for storing user gratitude journal entries"""
 
@@ -15,8 +47,10 @@ class GratitudeEntry(models.Model):
         ('challenging', '😰 Challenging'),
     ]
 
+    # Entries can live on a shard without the users table
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='gratitude_entries'
+        User, on_delete=models.CASCADE, related_name='gratitude_entries',
+        db_constraint=False
     )
     title = models.CharField(
         max_length=200,
@@ -36,13 +70,39 @@ class GratitudeEntry(models.Model):
     is_private = models.BooleanField(
         default=True, help_text='Keep this entry private'
     )
+    tag_objects = models.ManyToManyField(
+        Tag, through='EntryTag', related_name='entries', blank=True
+    )
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserQuerySet.as_manager()
+
+    # True on entries read back from the archive
+    archived = False
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Gratitude Entry'
         verbose_name_plural = 'Gratitude Entries'
+        indexes = [
+            # Serves keyset pagination of a user's entries, newest first
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                name='journal_entry_user_created',
+            ),
+            # Serves the user's latest updated_at for conditional responses
+            models.Index(
+                fields=['user', '-updated_at'],
+                name='journal_entry_user_updated',
+            ),
+            # Serves the admin changelist's default ordering and the date
+            # drill-down's seeks across all users
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='journal_entry_created',
+            ),
+        ]
 
     def __str__(self):
         return (f"{self.user.username} - {self.title} "
@@ -51,3 +111,265 @@ class GratitudeEntry(models.Model):
     def get_tags_list(self):
         """Return tags as a list"""
         return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
+
+    def set_tags(self, names):
+        """Replace the entry's normalized tags with the given names"""
+        names = list(dict.fromkeys(names))
+        tags = Tag.objects.using(self._state.db)
+        if names:
+            tags.bulk_create(
+                [Tag(name=name) for name in names], ignore_conflicts=True
+            )
+        self.tag_objects.set(tags.filter(name__in=names))
+
+
+class EntryTag(models.Model):
+    """Through table linking entries to their normalized tags"""
+
+    entry = models.ForeignKey(
+        GratitudeEntry, on_delete=models.CASCADE, related_name='tag_links'
+    )
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name='entry_links'
+    )
+
+    objects = EntryTagQuerySet.as_manager()
+
+    class Meta:
+        # Leading on tag so ?tag= filters are served by this index
+        unique_together = [('tag', 'entry')]
+
+    def __str__(self):
+        return f"{self.entry_id} - {self.tag}"
+
+
+class EntryTombstone(models.Model):
+    """
+    Record of a deleted entry, kept so offline replicas can drop it
+
+    Pruned after JOURNAL_SYNC_TOMBSTONE_DAYS by
+    ``manage.py prune_sync_tombstones``.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='entry_tombstones',
+        db_constraint=False
+    )
+    entry_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    objects = UserQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'deleted_at', 'id'],
+                name='journal_tombstone_user_deleted',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.entry_id} ({self.deleted_at})"
+
+
+class ArchivedEntry(models.Model):
+    """
+    An old entry moved out of the entries table into cold storage
+
+    Written by ``manage.py archive_entries``. The entry keeps its id and
+    ``content`` is stored zlib-compressed. Editing the entry moves it back
+    to the entries table.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_entries',
+        db_constraint=False
+    )
+    title = models.CharField(max_length=200, blank=True)
+    content = models.BinaryField()
+    mood = models.CharField(
+        max_length=20, choices=GratitudeEntry.MOOD_CHOICES, default='good'
+    )
+    tags = models.CharField(max_length=200, blank=True)
+    is_private = models.BooleanField(default=True)
+    tag_objects = models.ManyToManyField(
+        Tag, through='ArchivedEntryTag', related_name='archived_entries',
+        blank=True
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = UserQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'Archived Entries'
+        indexes = [
+            models.Index(
+                fields=['user', 'created_at', 'id'],
+                name='journal_archive_user_created',
+            ),
+            # Serves delta sync, which pages entries by updated_at
+            models.Index(
+                fields=['user', 'updated_at', 'id'],
+                name='journal_archive_user_updated',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title} (archived)"
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Return the archived copy of an entry"""
+        return cls(
+            id=entry.id, user_id=entry.user_id, title=entry.title,
+            # Written once and rarely read, so compressed as far as it goes
+            content=zlib.compress(entry.content.encode('utf-8'), 9),
+            mood=entry.mood, tags=entry.tags, is_private=entry.is_private,
+            created_at=entry.created_at, updated_at=entry.updated_at,
+        )
+
+    def to_entry(self):
+        """Return the entry this row archives, as stored before archiving"""
+        entry = GratitudeEntry(
+            id=self.id, user_id=self.user_id, title=self.title,
+            content=zlib.decompress(self.content).decode('utf-8'),
+            mood=self.mood, tags=self.tags, is_private=self.is_private,
+            created_at=self.created_at, updated_at=self.updated_at,
+        )
+        entry.archived = True
+        return entry
+
+
+class ArchivedEntryTag(models.Model):
+    """Through table keeping an archived entry's tag links"""
+
+    entry = models.ForeignKey(
+        ArchivedEntry, on_delete=models.CASCADE, related_name='tag_links'
+    )
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name='archived_entry_links'
+    )
+
+    objects = EntryTagQuerySet.as_manager()
+
+    class Meta:
+        # Leading on tag, like EntryTag, for ?tag= filters
+        unique_together = [('tag', 'entry')]
+
+    def __str__(self):
+        return f"{self.entry_id} - {self.tag} (archived)"
+
+
+class DailyActivity(models.Model):
+    """
+    Per-user count of entries written on each local calendar day
+
+    ``streak`` holds the length of the run of consecutive active days
+    ending on this day, so current and longest streaks are single-row
+    lookups.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='daily_activity',
+        db_constraint=False
+    )
+    date = models.DateField()
+    entry_count = models.PositiveIntegerField(default=0)
+    streak = models.PositiveIntegerField(default=1)
+
+    objects = UserQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Daily Activity'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date'], name='journal_daily_activity_day'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-streak'],
+                name='journal_daily_activity_streak',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date} ({self.entry_count})"
+
+
+class UserJournalStats(models.Model):
+    """
+    Denormalized per-user counters maintained alongside entry writes
+
+    Repaired from the entries table by ``manage.py rebuild_journal_stats``.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name='journal_stats',
+        db_constraint=False
+    )
+    total_entries = models.PositiveIntegerField(default=0)
+    excellent_count = models.PositiveIntegerField(default=0)
+    good_count = models.PositiveIntegerField(default=0)
+    okay_count = models.PositiveIntegerField(default=0)
+    difficult_count = models.PositiveIntegerField(default=0)
+    challenging_count = models.PositiveIntegerField(default=0)
+    private_count = models.PositiveIntegerField(default=0)
+    public_count = models.PositiveIntegerField(default=0)
+    # How many of total_entries are in the archive
+    archived_count = models.PositiveIntegerField(default=0)
+    first_entry_at = models.DateTimeField(null=True, blank=True)
+    last_entry_at = models.DateTimeField(null=True, blank=True)
+
+    objects = UserQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'User Journal Stats'
+
+    def __str__(self):
+        return f"{self.user_id} - {self.total_entries} entries"
+
+    @staticmethod
+    def mood_field(mood):
+        """Return the counter field name for a mood value"""
+        return f'{mood}_count'
+
+
+class UserShard(models.Model):
+    """
+    The database alias holding a user's journal data
+
+    Written when a user signs up with sharding enabled and moved by
+    ``manage.py rebalance_shards``. Users without a row, such as those
+    created before sharding, live on the default database.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name='journal_shard'
+    )
+    alias = models.CharField(max_length=50)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.alias}"
+
+
+class PerformanceBucket(models.Model):
+    """
+    Count of real-user timings for a route and metric in one histogram bin
+
+    Each flush of a worker's beacon buffer appends one row per non-empty
+    bin, so percentiles are read back by summing counts per bin.
+    """
+
+    route = models.CharField(max_length=100)
+    metric = models.CharField(max_length=20)
+    day = models.DateField(db_index=True)
+    bucket = models.SmallIntegerField()
+    count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.day} {self.route} {self.metric}[{self.bucket}]"
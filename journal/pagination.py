@@ -0,0 +1,143 @@
+import base64
+import binascii
+import heapq
+from datetime import datetime
+from itertools import islice
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(entry):
+    """Encode an entry's (created_at, id) position as an opaque cursor"""
+    raw = f"{entry.created_at.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into a (created_at, id) tuple"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, entry_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise InvalidCursor(cursor)
+
+
+class CursorPage:
+    """A single page of results produced by CursorPaginator"""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over entries ordered newest first
+
+    Pages are located with a WHERE clause on (created_at, id) rather than
+    an OFFSET, so every page costs the same regardless of depth and no
+    COUNT(*) is needed.
+
+    ``archive``, an ArchivedEntry queryset, is merged into the pages by
+    the same key, optionally filtered by the ``archive_filter`` predicate
+    on each decompressed entry.
+    """
+
+    def __init__(self, queryset, per_page, archive=None, archive_filter=None):
+        self.queryset = queryset
+        self.archive = archive
+        self.archive_filter = archive_filter
+        self.per_page = per_page
+
+    def get_page(self, after=None, before=None):
+        """
+        Return the page after or before the given cursor
+
+        Invalid cursors fall back to the first page, mirroring
+        Paginator.get_page().
+        """
+        try:
+            if before:
+                return self._page_before(decode_cursor(before))
+            if after:
+                return self._page_after(decode_cursor(after))
+        except InvalidCursor:
+            pass
+        return self._page_after(None)
+
+    def _rows(self, condition, newest_first):
+        """Return up to per_page + 1 entries matching a keyset condition"""
+        ordering = (['-created_at', '-id'] if newest_first
+                    else ['created_at', 'id'])
+        limit = self.per_page + 1
+        rows = list(self.queryset.filter(condition).order_by(*ordering)[:limit])
+        if self.archive is None:
+            return rows
+        archived = self.archive.filter(condition).order_by(*ordering)
+        if self.archive_filter is None:
+            archived = [row.to_entry() for row in archived[:limit]]
+        else:
+            archived = filter(self.archive_filter, (
+                row.to_entry() for row in archived.iterator(chunk_size=limit)
+            ))
+        return list(islice(heapq.merge(
+            rows, islice(archived, limit),
+            key=lambda entry: (entry.created_at, entry.id),
+            reverse=newest_first,
+        ), limit))
+
+    def _page_after(self, position):
+        condition = Q()
+        if position is not None:
+            created_at, entry_id = position
+            condition = (
+                Q(created_at__lt=created_at) |
+                Q(created_at=created_at, id__lt=entry_id)
+            )
+        rows = self._rows(condition, newest_first=True)
+        has_next = len(rows) > self.per_page
+        return CursorPage(
+            rows[:self.per_page], has_next, position is not None
+        )
+
+    def _page_before(self, position):
+        created_at, entry_id = position
+        rows = self._rows(
+            Q(created_at__gt=created_at) |
+            Q(created_at=created_at, id__gt=entry_id),
+            newest_first=False,
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, True, has_previous)
@@ -0,0 +1,268 @@
+"""
+Online moves of a user's journal between shards
+
+A user keeps reading and writing while their rows are copied; only the
+final switch waits for requests still using the old shard.
+"""
+import time
+from itertools import islice
+from django.db import connections, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from .activity import rebuild_user_activity
+from .models import (
+    ArchivedEntry, ArchivedEntryTag, DailyActivity, EntryTag, EntryTombstone,
+    GratitudeEntry, Tag, UserJournalStats,
+)
+from .sharding import assign_shard, shard_for_user, use_shard
+from .stats import rebuild_user_stats
+from .sync import SYNC_OVERLAP
+
+# Rows copied per batch while moving a user
+MOVE_BATCH_SIZE = 500
+
+# Entries deleted per statement by delete_entries()
+DELETE_BATCH_SIZE = 500
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def delete_entries(alias, entries, user_id=None):
+    """
+    Delete entries and their tag links without per-entry signals
+
+    QuerySet.delete() would load every entry to send signals whose work
+    the callers do for the whole batch, so the ids are selected and
+    deleted with plain DELETE statements instead, limited to one owner
+    when ``user_id`` is given. Returns how many entries were deleted.
+    """
+    connection = connections[alias]
+    quote_name = connection.ops.quote_name
+    sql = f'DELETE FROM {quote_name(GratitudeEntry._meta.db_table)} WHERE '
+    owner = []
+    if user_id is not None:
+        sql += f'{quote_name("user_id")} = %s AND '
+        owner = [user_id]
+    deleted = 0
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        for ids in _batches(
+            entries.values_list('id', flat=True).iterator(), DELETE_BATCH_SIZE
+        ):
+            EntryTag.objects.using(alias).filter(entry_id__in=ids).delete()
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(
+                f'{sql}{quote_name("id")} IN ({placeholders})', owner + ids
+            )
+            deleted += cursor.rowcount
+    return deleted
+
+
+def _copy_entries(entries, source, target):
+    """Upsert a batch of entries and their tag links onto the target"""
+    ids = [entry.id for entry in entries]
+    # bulk_create stamps updated_at with the current time, so the source
+    # stamps are put back to keep sync cursors and ETags valid
+    stamps = {entry.id: entry.updated_at for entry in entries}
+    links = list(EntryTag.objects.using(source).filter(
+        entry_id__in=ids
+    ).values_list('entry_id', 'tag__name'))
+    fields = [
+        field.name for field in GratitudeEntry._meta.concrete_fields
+        if not field.primary_key
+    ]
+    target_entries = GratitudeEntry.objects.using(target)
+    target_tags = Tag.objects.using(target)
+    with transaction.atomic(using=target):
+        target_entries.bulk_create(
+            entries, update_conflicts=True, unique_fields=['id'],
+            update_fields=fields,
+        )
+        target_entries.filter(id__in=ids).update(updated_at=Case(
+            *[When(id=entry_id, then=Value(stamp))
+              for entry_id, stamp in stamps.items()],
+            default='updated_at',
+        ))
+        names = {name for entry_id, name in links}
+        target_tags.bulk_create(
+            [Tag(name=name) for name in names], ignore_conflicts=True
+        )
+        tag_ids = dict(
+            target_tags.filter(name__in=names).values_list('name', 'id')
+        )
+        EntryTag.objects.using(target).filter(entry_id__in=ids).delete()
+        EntryTag.objects.using(target).bulk_create([
+            EntryTag(entry_id=entry_id, tag_id=tag_ids[name])
+            for entry_id, name in links
+        ])
+
+
+def _copy_archived(archived, source, target):
+    """Upsert a batch of archived entries, replacing their live copies"""
+    ids = [entry.id for entry in archived]
+    links = list(ArchivedEntryTag.objects.using(source).filter(
+        entry_id__in=ids
+    ).values_list('entry_id', 'tag__name'))
+    fields = [
+        field.name for field in ArchivedEntry._meta.concrete_fields
+        if not field.primary_key
+    ]
+    target_tags = Tag.objects.using(target)
+    with transaction.atomic(using=target):
+        ArchivedEntry.objects.using(target).bulk_create(
+            archived, update_conflicts=True, unique_fields=['id'],
+            update_fields=fields,
+        )
+        names = {name for entry_id, name in links}
+        target_tags.bulk_create(
+            [Tag(name=name) for name in names], ignore_conflicts=True
+        )
+        tag_ids = dict(
+            target_tags.filter(name__in=names).values_list('name', 'id')
+        )
+        ArchivedEntryTag.objects.using(target).filter(
+            entry_id__in=ids
+        ).delete()
+        ArchivedEntryTag.objects.using(target).bulk_create([
+            ArchivedEntryTag(entry_id=entry_id, tag_id=tag_ids[name])
+            for entry_id, name in links
+        ])
+        delete_entries(
+            target, GratitudeEntry.objects.using(target).filter(id__in=ids)
+        )
+
+
+def _copy_changes(user_id, source, target, since=None):
+    """
+    Copy the user's entries, archived entries and deletions since a time
+    to the target
+
+    Returns how many rows were copied.
+    """
+    entries = GratitudeEntry.objects.using(source).filter(user_id=user_id)
+    archived = ArchivedEntry.objects.using(source).filter(user_id=user_id)
+    tombstones = EntryTombstone.objects.using(source).filter(user_id=user_id)
+    if since is not None:
+        entries = entries.filter(updated_at__gte=since)
+        archived = archived.filter(archived_at__gte=since)
+        tombstones = tombstones.filter(deleted_at__gte=since)
+
+    copied = 0
+    for batch in _batches(
+        entries.order_by('id').iterator(chunk_size=MOVE_BATCH_SIZE),
+        MOVE_BATCH_SIZE
+    ):
+        _copy_entries(batch, source, target)
+        # Entries restored from the archive since it was copied
+        ArchivedEntry.objects.using(target).filter(
+            id__in=[entry.id for entry in batch]
+        ).delete()
+        copied += len(batch)
+    for batch in _batches(
+        archived.order_by('id').iterator(chunk_size=MOVE_BATCH_SIZE),
+        MOVE_BATCH_SIZE
+    ):
+        _copy_archived(batch, source, target)
+        copied += len(batch)
+    for batch in _batches(
+        tombstones.order_by('id').iterator(chunk_size=MOVE_BATCH_SIZE),
+        MOVE_BATCH_SIZE
+    ):
+        with transaction.atomic(using=target):
+            EntryTombstone.objects.using(target).bulk_create(
+                batch, ignore_conflicts=True
+            )
+            deleted = [tombstone.entry_id for tombstone in batch]
+            delete_entries(target, GratitudeEntry.objects.using(
+                target
+            ).filter(user_id=user_id, id__in=deleted), user_id)
+            ArchivedEntry.objects.using(target).filter(
+                user_id=user_id, id__in=deleted
+            ).delete()
+        copied += len(batch)
+    return copied
+
+
+def purge_user(user_id, alias):
+    """Delete all of a user's journal rows from one database"""
+    with transaction.atomic(using=alias):
+        delete_entries(
+            alias, GratitudeEntry.objects.using(alias).filter(user_id=user_id),
+            user_id
+        )
+        for model in (
+            ArchivedEntry, EntryTombstone, DailyActivity, UserJournalStats
+        ):
+            model.objects.using(alias).filter(user_id=user_id).delete()
+
+
+class Move:
+    """One user's journal on its way from one shard to another"""
+
+    def __init__(self, user, source, target):
+        self.user = user
+        self.source = source
+        self.target = target
+        self.copied = 0
+        self.since = None
+
+    def copy(self):
+        """
+        Copy the rows while the user keeps writing to the old shard
+
+        Writes made meanwhile are copied again until a pass finds less
+        than a batch of them.
+        """
+        started = timezone.now()
+        self.copied += _copy_changes(self.user.pk, self.source, self.target)
+        while True:
+            mark = timezone.now()
+            changed = _copy_changes(
+                self.user.pk, self.source, self.target,
+                started - SYNC_OVERLAP
+            )
+            self.copied += changed
+            started = mark
+            if changed < MOVE_BATCH_SIZE:
+                break
+        self.since = started
+
+    def finish(self):
+        """Copy the last writes, rebuild derived data and purge the source"""
+        self.copied += _copy_changes(
+            self.user.pk, self.source, self.target,
+            self.since - SYNC_OVERLAP
+        )
+        with use_shard(self.target):
+            rebuild_user_stats(self.user)
+            rebuild_user_activity(self.user.pk)
+        purge_user(self.user.pk, self.source)
+
+
+def move_users(moves, settle=30):
+    """
+    Move users' journals to other shards while they stay in use
+
+    Takes (user, target alias) pairs. Each journal is copied, then all the
+    users are switched to their targets together, and after ``settle``
+    seconds, longer than any request takes so those that looked up the
+    old shards have finished, the last writes are copied and the old rows
+    purged. Returns the Move of each user that changed shard.
+    """
+    pending = []
+    for user, target in moves:
+        source = shard_for_user(user.pk)
+        if source != target:
+            move = Move(user, source, target)
+            move.copy()
+            pending.append(move)
+    for move in pending:
+        assign_shard(move.user.pk, move.target)
+    if pending:
+        time.sleep(settle)
+    for move in pending:
+        move.finish()
+    return pending
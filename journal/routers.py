@@ -0,0 +1,166 @@
+"""
+Database routing: user shards and read replicas
+
+ShardRouter sends each user's journal rows to their shard (see
+``journal.sharding``) when more than one is configured.
+
+Views decorated with ``replica_reads`` read journal data from one of the
+JOURNAL_READ_REPLICAS aliases, picked once per request so all its queries
+see the same replica; everything else, and every write, uses the
+primary. A session that has just written is pinned to the primary for
+JOURNAL_REPLICA_PIN_SECONDS, so its next pages never show data a replica
+has not caught up with yet.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+from time import time
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from .sharding import (
+    SHARDED_MODELS, current_shard, is_sharded, journal_shards, shard_for_user,
+    sharding_enabled,
+)
+
+PIN_SESSION_KEY = '_journal_primary_until'
+
+# The replica the request being handled in this thread or task reads
+# from, or None for the primary. sync_to_async copies it into the async
+# ORM's worker threads.
+reading_from_replica = ContextVar('journal_replica_reads', default=None)
+
+
+def read_replicas():
+    """Return the aliases of the configured read replicas"""
+    return list(getattr(settings, 'JOURNAL_READ_REPLICAS', []))
+
+
+def pin_to_primary(request):
+    """Keep the session's reads on the primary for the pin window"""
+    seconds = getattr(settings, 'JOURNAL_REPLICA_PIN_SECONDS', 10)
+    request.session[PIN_SESSION_KEY] = time() + seconds
+
+
+def is_pinned(request):
+    """Return whether the session has written within the pin window"""
+    return request.session.get(PIN_SESSION_KEY, 0) > time()
+
+
+def pick_replica(request):
+    """Return the replica a request reads from, or None for the primary"""
+    replicas = read_replicas()
+    if not replicas or is_pinned(request):
+        return None
+    return random.choice(replicas)
+
+
+def replica_reads(view):
+    """
+    Let a read-only view read journal data from a replica
+
+    Wraps sync and async views. Sessions pinned by pin_to_primary() keep
+    reading from the primary.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            replica = None
+            if read_replicas():
+                replica = await sync_to_async(pick_replica)(request)
+            token = reading_from_replica.set(replica)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                reading_from_replica.reset(token)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = reading_from_replica.set(pick_replica(request))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                reading_from_replica.reset(token)
+    return wrapper
+
+
+class ShardRouter:
+    """
+    Send journal rows to their user's shard and all else to the default
+
+    Does nothing with a single shard. Saves go to the shard of the
+    instance's user, related lookups from a user to theirs, and other
+    queries to the shard of the active scope.
+    """
+
+    def _db(self, model, **hints):
+        if not sharding_enabled():
+            return None
+        if not is_sharded(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None:
+            if isinstance(instance, get_user_model()):
+                return shard_for_user(instance.pk)
+            user_id = getattr(instance, 'user_id', None)
+            if user_id is not None:
+                return shard_for_user(user_id)
+            if instance._state.db:
+                return instance._state.db
+        return current_shard()
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Users and their shard's rows may sit on different databases
+        if sharding_enabled():
+            shards = journal_shards()
+            if obj1._state.db in shards and obj2._state.db in shards:
+                return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in journal_shards():
+            return None
+        # Empty users and content types tables keep the journal's early
+        # migrations, which created foreign keys to them, working
+        if app_label in ('auth', 'contenttypes'):
+            return True
+        if app_label != 'journal':
+            return False
+        if model_name is None:
+            # Data migrations only run on a shard when marked for it
+            return bool(hints.get('shards'))
+        return model_name in SHARDED_MODELS
+
+
+class ReplicaRouter:
+    """
+    Send journal reads inside replica_reads views to a replica
+
+    Sessions and users are always read from the primary, so logging in or
+    changing a password takes effect at once. Writes, including saves of
+    objects read from a replica, go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'journal':
+            return None
+        return reading_from_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *read_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in read_replicas():
+            return False
+        return None
@@ -0,0 +1,210 @@
+"""
+Real-user performance metrics sent by performance-monitor.js
+
+Beacons are buffered in memory per worker and flushed in bulk as
+log-scale histogram counts, from which per-route percentiles are read.
+What a worker still holds when it exits is flushed by the gunicorn
+``worker_exit`` hook in ``gunicorn.conf.py``.
+"""
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Sum
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+from .models import PerformanceBucket
+
+METRICS = {
+    'dom_ready': 'DOM ready',
+    'page_load': 'Page load',
+    'dns': 'DNS lookup',
+    'tcp': 'TCP connect',
+    'response': 'Response',
+    'lcp': 'LCP',
+    'fid': 'FID',
+    'cls': 'CLS',
+}
+PERCENTILES = (50, 95, 99)
+
+# Bin i holds values up to GROWTH ** i, so a reported percentile is at
+# most 10% above the true value. The range covers 0.01 to ~90,000.
+GROWTH = 1.1
+MIN_BUCKET = -48
+MAX_BUCKET = 120
+
+# Samples per beacon and largest accepted value, to bound abuse
+MAX_SAMPLES = 50
+MAX_VALUE = 10 ** 6
+
+logger = logging.getLogger('journal.rum')
+
+
+def bucket_for(value):
+    """Return the histogram bin a value falls in"""
+    if value <= 0:
+        return MIN_BUCKET
+    index = math.ceil(math.log(value, GROWTH))
+    return min(max(index, MIN_BUCKET), MAX_BUCKET)
+
+
+def bucket_value(bucket):
+    """Return the upper bound of a histogram bin"""
+    return GROWTH ** bucket
+
+
+def route_for(path):
+    """Return the URL name serving a path, or None if it is not ours"""
+    try:
+        match = resolve(path)
+    except (Resolver404, TypeError):
+        return None
+    return match.view_name
+
+
+def parse_samples(payload):
+    """
+    Yield (route, metric, value) from a beacon payload
+
+    A payload is one page report or a list of them, each shaped like
+    ``{"path": "/entries/", "metrics": {"lcp": 812.5}}``. Unknown paths,
+    metrics and out-of-range values are dropped.
+    """
+    reports = payload if isinstance(payload, list) else [payload]
+    samples = 0
+    for report in reports:
+        if not isinstance(report, dict):
+            continue
+        route = route_for(report.get('path'))
+        metrics = report.get('metrics')
+        if route is None or not isinstance(metrics, dict):
+            continue
+        for metric, value in metrics.items():
+            if metric not in METRICS or isinstance(value, bool):
+                continue
+            if not isinstance(value, (int, float)):
+                continue
+            if not 0 <= value < MAX_VALUE:
+                continue
+            yield route, metric, value
+            samples += 1
+            if samples >= MAX_SAMPLES:
+                return
+
+
+class SampleBuffer:
+    """
+    Per-worker histogram counts waiting to be written
+
+    Flushed once it holds JOURNAL_RUM_FLUSH_SIZE samples or
+    JOURNAL_RUM_FLUSH_INTERVAL seconds after the previous flush.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.size = 0
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, samples):
+        day = timezone.localdate()
+        with self.lock:
+            for route, metric, value in samples:
+                self.counts[(route, metric, day, bucket_for(value))] += 1
+                self.size += 1
+            due = (
+                self.size >= getattr(settings, 'JOURNAL_RUM_FLUSH_SIZE', 500)
+                or time.monotonic() - self.flushed_at >= getattr(
+                    settings, 'JOURNAL_RUM_FLUSH_INTERVAL', 60
+                )
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered counts in one bulk insert"""
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.size = 0
+            self.flushed_at = time.monotonic()
+        if counts:
+            PerformanceBucket.objects.bulk_create([
+                PerformanceBucket(
+                    route=route, metric=metric, day=day, bucket=bucket,
+                    count=count,
+                )
+                for (route, metric, day, bucket), count in counts.items()
+            ])
+        return sum(counts.values())
+
+
+buffer = SampleBuffer()
+
+
+def flush_at_exit():
+    """
+    Write the samples still buffered as the worker exits
+
+    Returns how many were written. A failed write is logged rather than
+    raised, so it cannot get in the way of the worker shutting down.
+    """
+    try:
+        return buffer.flush()
+    except DatabaseError:
+        logger.exception('Dropped buffered RUM samples at worker exit')
+        return 0
+
+
+def percentiles(histogram):
+    """Return the requested percentiles of a {bin: count} histogram"""
+    total = sum(histogram.values())
+    results = {}
+    seen = 0
+    targets = iter(PERCENTILES)
+    target = next(targets)
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        while target is not None and seen >= total * target / 100:
+            results[target] = bucket_value(bucket)
+            target = next(targets, None)
+    return results
+
+
+def get_rollups(days=7):
+    """
+    Return per-route, per-metric percentiles over the last days
+
+    Rows are ``{'route', 'metric', 'label', 'samples', 'p50', 'p95',
+    'p99'}`` ordered by route and metric.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = PerformanceBucket.objects.filter(
+        day__gte=since, metric__in=METRICS
+    ).values(
+        'route', 'metric', 'bucket'
+    ).annotate(total=Sum('count')).order_by()
+
+    histograms = {}
+    for row in rows:
+        key = (row['route'], row['metric'])
+        histograms.setdefault(key, {})[row['bucket']] = row['total']
+
+    metric_order = list(METRICS)
+    rollups = []
+    for (route, metric), histogram in sorted(
+        histograms.items(),
+        key=lambda item: (item[0][0], metric_order.index(item[0][1]))
+    ):
+        values = percentiles(histogram)
+        rollups.append({
+            'route': route,
+            'metric': metric,
+            'label': METRICS[metric],
+            'samples': sum(histogram.values()),
+            **{f'p{p}': values[p] for p in PERCENTILES},
+        })
+    return rollups
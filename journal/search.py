@@ -0,0 +1,252 @@
+"""
+Full-text search over a user's journal entries
+
+Postgres is searched through a GIN-indexed ``to_tsvector`` expression and
+SQLite through an FTS5 virtual table kept in sync by triggers. Both are
+installed by migration 0008, and on user shards by 0014; other databases
+fall back to ``icontains``. A user is searched on their own shard.
+
+Archived entries have their content compressed, out of reach of either
+index, so they are matched like the fallback as they are decompressed
+and ranked after every live entry.
+"""
+from itertools import islice
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.utils.html import escape
+from .archive import search_archived
+from .models import ArchivedEntry, GratitudeEntry
+from .sharding import shard_for_user
+
+SEARCH_FIELDS = ('title', 'content', 'tags')
+SEARCH_CONFIG = 'english'
+POSTGRES_INDEX_NAME = 'journal_entry_search'
+SQLITE_FTS_TABLE = 'journal_entry_fts'
+
+# Markers wrapped around matches by the database, swapped for <mark>
+# tags after the rest of the snippet has been HTML-escaped
+MATCH_START = '\x02'
+MATCH_STOP = '\x03'
+
+SQLITE_INSTALL_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5(
+        title, content, tags,
+        content='journal_gratitudeentry', content_rowid='id',
+        tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai
+    AFTER INSERT ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad
+    AFTER DELETE ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title,
+                                       content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au
+    AFTER UPDATE OF title, content, tags ON journal_gratitudeentry BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title,
+                                       content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END""",
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}",
+]
+
+
+def search_vector():
+    """Return the search vector expression used by the Postgres index"""
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector(*SEARCH_FIELDS, config=SEARCH_CONFIG)
+
+
+def install_search_index(schema_editor):
+    """Create the full-text index for the schema editor's database"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        schema_editor.add_index(
+            GratitudeEntry,
+            GinIndex(search_vector(), name=POSTGRES_INDEX_NAME)
+        )
+    elif vendor == 'sqlite':
+        for statement in SQLITE_INSTALL_SQL:
+            schema_editor.execute(statement)
+
+
+def uninstall_search_index(schema_editor):
+    """Drop the full-text index from the schema editor's database"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS "{POSTGRES_INDEX_NAME}"'
+        )
+    elif vendor == 'sqlite':
+        for statement in SQLITE_UNINSTALL_SQL:
+            schema_editor.execute(statement)
+
+
+def highlight(snippet):
+    """Escape a snippet and turn the match markers into <mark> tags"""
+    return escape(snippet).replace(MATCH_START, '<mark>').replace(
+        MATCH_STOP, '</mark>'
+    )
+
+
+class SearchResult:
+    """A matching entry with its rank and highlighted snippet"""
+
+    def __init__(self, entry, rank, snippet):
+        self.entry = entry
+        self.rank = rank
+        self.snippet = snippet
+
+
+class PostgresSearchBackend:
+    """Ranked search against the GIN-indexed tsvector expression"""
+
+    def search(self, user, query, offset, limit):
+        from django.contrib.postgres.search import (
+            SearchHeadline, SearchQuery, SearchRank
+        )
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        entries = GratitudeEntry.objects.for_user(user).annotate(
+            document=search_vector(),
+        ).filter(document=search_query).annotate(
+            rank=SearchRank(search_vector(), search_query),
+            snippet=SearchHeadline(
+                'content', search_query, config=SEARCH_CONFIG,
+                start_sel=MATCH_START, stop_sel=MATCH_STOP,
+                max_words=30, min_words=15,
+            ),
+        ).order_by('-rank', '-created_at')
+        return [
+            SearchResult(entry, entry.rank, highlight(entry.snippet))
+            for entry in entries[offset:offset + limit]
+        ]
+
+
+class SQLiteSearchBackend:
+    """Ranked search against the FTS5 virtual table using bm25()"""
+
+    # bm25() column weights for title, content and tags
+    WEIGHTS = (10.0, 1.0, 5.0)
+
+    def match_expression(self, query):
+        """Quote each term so user input cannot inject FTS5 syntax"""
+        terms = [
+            '"{}"*'.format(term.replace('"', '""'))
+            for term in query.split()
+        ]
+        return ' '.join(terms)
+
+    def search(self, user, query, offset, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        sql = f"""
+            SELECT fts.rowid,
+                   bm25({SQLITE_FTS_TABLE}, %s, %s, %s) AS rank,
+                   snippet({SQLITE_FTS_TABLE}, 1, %s, %s, '…', 30)
+            FROM {SQLITE_FTS_TABLE} AS fts
+            JOIN journal_gratitudeentry AS entry ON entry.id = fts.rowid
+            WHERE {SQLITE_FTS_TABLE} MATCH %s AND entry.user_id = %s
+            ORDER BY rank, entry.created_at DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [*self.WEIGHTS, MATCH_START, MATCH_STOP, expression,
+                  user.pk, limit, offset]
+        with connections[shard_for_user(user.pk)].cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        entries = GratitudeEntry.objects.for_user(user).in_bulk(
+            [row[0] for row in rows]
+        )
+        return [
+            SearchResult(entries[entry_id], -rank, highlight(snippet))
+            for entry_id, rank, snippet in rows
+            if entry_id in entries
+        ]
+
+
+class BasicSearchBackend:
+    """Unindexed fallback for databases without full-text support"""
+
+    def search(self, user, query, offset, limit):
+        condition = Q()
+        for term in query.split():
+            condition &= (
+                Q(title__icontains=term) |
+                Q(content__icontains=term) |
+                Q(tags__icontains=term)
+            )
+        entries = GratitudeEntry.objects.for_user(user).filter(condition)
+        return [
+            SearchResult(entry, 0, escape(entry.content[:200]))
+            for entry in entries.order_by('-created_at')[
+                offset:offset + limit
+            ]
+        ]
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    """Return the search backend for a database"""
+    vendor = connections[using].vendor
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return BasicSearchBackend()
+
+
+def search_archive(user, query, offset, limit):
+    """Return archived entries matching every term, newest first"""
+    terms = query.split()
+    if not terms:
+        return []
+    archived = ArchivedEntry.objects.for_user(user).order_by(
+        '-created_at', '-id'
+    )
+    return [
+        SearchResult(entry, 0, escape(entry.content[:200]))
+        for entry in islice(
+            search_archived(archived, terms), offset, offset + limit
+        )
+    ]
+
+
+def search_entries(user, query, page=1, per_page=10, archived=True):
+    """
+    Return one page of ranked results and whether another page follows
+
+    Pass ``archived=False`` when the user has no archived entries to
+    skip looking for them.
+    """
+    offset = (page - 1) * per_page
+    backend = get_search_backend(shard_for_user(user.pk))
+    results = backend.search(user, query, offset, per_page + 1)
+    if archived and len(results) <= per_page:
+        # The live matches ran out on this page, so archived matches
+        # follow them; past the first such page their offset needs the
+        # number of live matches
+        if results or not offset:
+            live = offset + len(results)
+        else:
+            live = len(backend.search(user, query, 0, offset))
+        results += search_archive(
+            user, query, max(offset - live, 0), per_page + 1 - len(results)
+        )
+    return results[:per_page], len(results) > per_page
@@ -0,0 +1,174 @@
+"""
+User-sharded storage of journal data
+
+With more than one alias in JOURNAL_SHARDS, each user's entries, archived
+entries, tags, tombstones, daily activity and counters live together on
+one shard, recorded in ``UserShard`` on the default database. Users,
+sessions and everything else stay on the default database, which is also
+the first shard.
+
+Queries reach the right shard three ways: ``for_user()`` on the journal
+managers binds a queryset to its user's shard, saves are routed by the
+instance's ``user_id``, and the rest of a request runs inside its user's
+shard scope, set by ``UserShardMiddleware``.
+
+Users are moved between shards by ``journal.rebalance``.
+"""
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from .models import (
+    ArchivedEntry, ArchivedEntryTag, DailyActivity, EntryTag, EntryTombstone,
+    GratitudeEntry, Tag, UserJournalStats, UserShard,
+)
+
+# Models whose rows live on their user's shard
+SHARDED_MODELS = frozenset(
+    model._meta.model_name for model in (
+        Tag, GratitudeEntry, EntryTag, EntryTombstone, DailyActivity,
+        UserJournalStats, ArchivedEntry, ArchivedEntryTag,
+    )
+)
+
+# Each shard numbers its entries and tombstones from index * SHARD_ID_SPACE,
+# so ids stay unique, and keep their meaning, when a user is moved
+SHARD_ID_SPACE = 1 << 40
+SHARD_ID_TABLES = [
+    GratitudeEntry._meta.db_table, EntryTombstone._meta.db_table
+]
+
+_scope = ContextVar('journal_shard_scope', default=None)
+
+
+def journal_shards():
+    """Return the shard aliases; the first is the default database"""
+    return list(getattr(settings, 'JOURNAL_SHARDS', [DEFAULT_DB_ALIAS]))
+
+
+def sharding_enabled():
+    return len(journal_shards()) > 1
+
+
+def is_sharded(model):
+    """Return whether a model's rows live on their user's shard"""
+    return (model._meta.app_label == 'journal'
+            and model._meta.model_name in SHARDED_MODELS)
+
+
+def pick_shard(user_id):
+    """Return the shard a user is placed on by hashing their id"""
+    shards = journal_shards()
+    return shards[zlib.crc32(str(user_id).encode()) % len(shards)]
+
+
+class ShardScope:
+    """
+    The shard of the request or job being handled, and the placements
+    looked up while handling it
+    """
+
+    def __init__(self, alias=None, user=None):
+        self.alias = alias
+        self.user = user
+        self.placements = {}
+
+    def shard(self):
+        if self.alias is None:
+            user = self.user
+            self.alias = (
+                shard_for_user(user.pk)
+                if user is not None and user.is_authenticated
+                else DEFAULT_DB_ALIAS
+            )
+        return self.alias
+
+
+@contextmanager
+def _scoped(scope):
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def user_shard(user):
+    """Route unbound journal queries to a user's shard while active"""
+    return _scoped(ShardScope(user=user))
+
+
+def use_shard(alias):
+    """Route unbound journal queries to a shard while active"""
+    return _scoped(ShardScope(alias=alias))
+
+
+def current_shard():
+    """Return the shard of the active scope, or the default database"""
+    scope = _scope.get()
+    return scope.shard() if scope is not None else DEFAULT_DB_ALIAS
+
+
+def shard_for_user(user_id):
+    """Return the alias of the database holding a user's journal"""
+    if not sharding_enabled():
+        return DEFAULT_DB_ALIAS
+    scope = _scope.get()
+    placements = scope.placements if scope is not None else {}
+    if user_id not in placements:
+        placements[user_id] = UserShard.objects.using(
+            DEFAULT_DB_ALIAS
+        ).filter(user_id=user_id).values_list('alias', flat=True).first(
+        ) or DEFAULT_DB_ALIAS
+    return placements[user_id]
+
+
+def users_by_shard(user_ids):
+    """Group user ids by the alias holding their journals"""
+    placements = {}
+    if sharding_enabled():
+        placements = dict(UserShard.objects.using(DEFAULT_DB_ALIAS).filter(
+            user_id__in=user_ids
+        ).values_list('user_id', 'alias'))
+    groups = {}
+    for user_id in user_ids:
+        groups.setdefault(
+            placements.get(user_id, DEFAULT_DB_ALIAS), []
+        ).append(user_id)
+    return groups
+
+
+def assign_shard(user_id, alias):
+    """Record the shard a user's journal is read from and written to"""
+    UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        user_id=user_id, defaults={'alias': alias}
+    )
+    scope = _scope.get()
+    if scope is not None:
+        scope.placements.pop(user_id, None)
+
+
+def seed_id_sequences(connection, index):
+    """Start a shard's entry and tombstone ids in the shard's own range"""
+    start = index * SHARD_ID_SPACE
+    if not start:
+        return
+    with connection.cursor() as cursor:
+        for table in SHARD_ID_TABLES:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    'UPDATE sqlite_sequence SET seq = MAX(seq, %s) '
+                    'WHERE name = %s', [start, table]
+                )
+                if not cursor.rowcount:
+                    cursor.execute(
+                        'INSERT INTO sqlite_sequence (name, seq) '
+                        'VALUES (%s, %s)', [table, start]
+                    )
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) "
+                    f"FROM {table})))", [table, start]
+                )
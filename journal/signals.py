@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from .activity import move_entry, record_entry, remove_entry
+from .auth import invalidate_cached_user
+from .fragments import invalidate_entry_card
+from .models import EntryTombstone, GratitudeEntry
+from .rebalance import purge_user
+from .sharding import (
+    assign_shard, pick_shard, shard_for_user, sharding_enabled
+)
+from .stats import (
+    record_entry_changed, record_entry_created, record_entry_deleted
+)
+
+
+# Fields the counters and daily activity are bucketed by
+COUNTED_FIELDS = ('created_at', 'mood', 'is_private')
+
+
+@receiver(post_save, sender=GratitudeEntry)
+def entry_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Update counters and daily activity when an entry is written or moves
+    between buckets, whether from the views, the API or the admin
+    """
+    if raw:
+        return
+    if created:
+        record_entry_created(instance)
+        record_entry(instance)
+        return
+    stored = instance.__dict__.pop('_stored_counted', None)
+    if stored is not None:
+        created_at, mood, is_private = stored
+        record_entry_changed(instance, mood, is_private, created_at)
+        move_entry(instance, created_at)
+
+
+@receiver(pre_save, sender=GratitudeEntry)
+def entry_saving(sender, instance, raw=False, using=None,
+                 update_fields=None, **kwargs):
+    """
+    Drop the cached card rendered from the entry's previous version and
+    note the stored values the counters and daily activity are bucketed by
+    """
+    if raw or not instance.pk:
+        return
+    # updated_at still holds the stored value until auto_now refreshes it
+    if instance.updated_at:
+        invalidate_entry_card(instance.pk, instance.updated_at)
+    if update_fields is None or set(update_fields) & set(COUNTED_FIELDS):
+        instance._stored_counted = GratitudeEntry.objects.using(
+            using
+        ).filter(pk=instance.pk).values_list(*COUNTED_FIELDS).first()
+
+
+@receiver(post_delete, sender=GratitudeEntry)
+def entry_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Update counters, daily activity and cached cards when an entry is
+    deleted, and leave a tombstone for offline replicas
+    """
+    remove_entry(instance)
+    if instance.updated_at:
+        invalidate_entry_card(instance.pk, instance.updated_at)
+    # Deleting the user deletes their counters, tombstones and replica
+    # with them
+    if not isinstance(origin, get_user_model()):
+        record_entry_deleted(instance)
+        EntryTombstone.objects.create(
+            user_id=instance.user_id, entry_id=instance.pk
+        )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    """Drop the cached user after a password change or any other write"""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    """Place a new user's journal on a shard"""
+    if created and not raw and sharding_enabled():
+        assign_shard(instance.pk, pick_shard(instance.pk))
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleting(sender, instance, **kwargs):
+    """Delete a user's journal from their shard"""
+    # Rows on the default database are deleted by the user's cascade
+    alias = shard_for_user(instance.pk)
+    if alias != DEFAULT_DB_ALIAS:
+        purge_user(instance.pk, alias)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    """Drop the cached user when they log out"""
+    if user is not None:
+        invalidate_cached_user(user.pk)
@@ -0,0 +1,24 @@
+// Reloads the admin changelist when a user is picked in the autocomplete
+// filter, keeping the other active filters
+/*global django, window, URLSearchParams */
+
+(function () {
+    'use strict';
+
+    django.jQuery(function ($) {
+        $('select[data-filter-parameter]').on('change', function () {
+            var params = new URLSearchParams(window.location.search),
+                name = this.getAttribute('data-filter-parameter');
+
+            if (this.value) {
+                params.set(name, this.value);
+            } else {
+                params.delete(name);
+            }
+            // The current page number may not exist in the new results
+            params.delete('p');
+            window.location.search = params.toString();
+        });
+    });
+
+}());
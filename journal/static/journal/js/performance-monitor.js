@@ -1,15 +1,41 @@
 // Performance monitoring for render blocking resource optimization
-// This script helps track Core Web Vitals and loading performance
-/*global window, document, performance, console, PerformanceObserver, setTimeout */
+// This script helps track Core Web Vitals and loading performance, and
+// beacons the timings to the server when the page is hidden
+/*global window, document, performance, console, PerformanceObserver, setTimeout, navigator, localStorage, JSON */
 
 (function () {
     'use strict';
 
+    var script = document.currentScript || document.querySelector('script[data-beacon-url]'),
+        QUEUE_KEY = 'performanceMonitorQueue',
+        MAX_QUEUED_REPORTS = 20,
+        // Server-side metric names for the collected timings
+        BEACON_METRICS = {
+            domReady: 'dom_ready',
+            pageLoad: 'page_load',
+            dns: 'dns',
+            tcp: 'tcp',
+            response: 'response',
+            lcp: 'lcp',
+            fid: 'fid',
+            cls: 'cls'
+        };
+
     function PerformanceMonitor() {
         this.metrics = {};
+        this.beaconUrl = script && script.getAttribute('data-beacon-url');
+        this.debug = Boolean(script && script.getAttribute('data-debug') === 'true');
+        this.sent = false;
         this.init();
     }
 
+    // Console output is only wanted while developing
+    PerformanceMonitor.prototype.log = function () {
+        if (this.debug) {
+            console.log.apply(console, arguments);
+        }
+    };
+
     PerformanceMonitor.prototype.init = function () {
         var self = this;
 
@@ -30,6 +56,68 @@
 
         // Monitor CSS loading
         this.monitorCSSLoading();
+
+        // Report once the user leaves or backgrounds the page
+        document.addEventListener('visibilitychange', function () {
+            if (document.visibilityState === 'hidden') {
+                self.sendBeacon();
+            }
+        });
+        window.addEventListener('pagehide', function () {
+            self.sendBeacon();
+        });
+    };
+
+    PerformanceMonitor.prototype.readQueue = function () {
+        try {
+            return JSON.parse(localStorage.getItem(QUEUE_KEY)) || [];
+        } catch (error) {
+            return [];
+        }
+    };
+
+    PerformanceMonitor.prototype.writeQueue = function (reports) {
+        try {
+            if (reports.length) {
+                localStorage.setItem(QUEUE_KEY, JSON.stringify(reports.slice(-MAX_QUEUED_REPORTS)));
+            } else {
+                localStorage.removeItem(QUEUE_KEY);
+            }
+        } catch (error) {
+            // Storage may be full or disabled; the reports are dropped
+        }
+    };
+
+    PerformanceMonitor.prototype.sendBeacon = function () {
+        var self = this,
+            metrics = {},
+            reports;
+
+        if (this.sent || !this.beaconUrl) {
+            return;
+        }
+        this.sent = true;
+
+        Object.keys(BEACON_METRICS).forEach(function (name) {
+            if (typeof self.metrics[name] === 'number' && isFinite(self.metrics[name])) {
+                metrics[BEACON_METRICS[name]] = Math.round(self.metrics[name] * 1000) / 1000;
+            }
+        });
+
+        // Reports that could not be sent earlier go out in the same batch
+        reports = this.readQueue();
+        if (Object.keys(metrics).length) {
+            reports.push({ path: window.location.pathname, metrics: metrics });
+        }
+        if (!reports.length) {
+            return;
+        }
+
+        if (navigator.sendBeacon && navigator.sendBeacon(this.beaconUrl, JSON.stringify(reports))) {
+            this.writeQueue([]);
+        } else {
+            this.writeQueue(reports);
+        }
     };
 
     PerformanceMonitor.prototype.measureDOMReady = function () {
@@ -38,7 +126,7 @@
             hasGradient;
 
         this.metrics.domReady = performance.now();
-        console.log('DOM Ready: ' + this.metrics.domReady.toFixed(2) + 'ms');
+        this.log('DOM Ready: ' + this.metrics.domReady.toFixed(2) + 'ms');
 
         // Check if critical styles are applied
         body = document.body;
@@ -46,9 +134,9 @@
         hasGradient = computedStyle.background.indexOf('gradient') !== -1;
 
         if (hasGradient) {
-            console.log('✅ Critical CSS loaded successfully');
+            this.log('✅ Critical CSS loaded successfully');
         } else {
-            console.log('⚠️ Critical CSS may not be applied');
+            this.log('⚠️ Critical CSS may not be applied');
         }
     };
 
@@ -56,15 +144,18 @@
         var navigation;
 
         this.metrics.pageLoad = performance.now();
-        console.log('Page Load: ' + this.metrics.pageLoad.toFixed(2) + 'ms');
+        this.log('Page Load: ' + this.metrics.pageLoad.toFixed(2) + 'ms');
 
         // Measure resource loading times
         navigation = performance.getEntriesByType('navigation')[0];
         if (navigation) {
-            console.log('DNS Lookup: ' + (navigation.domainLookupEnd - navigation.domainLookupStart).toFixed(2) + 'ms');
-            console.log('TCP Connect: ' + (navigation.connectEnd - navigation.connectStart).toFixed(2) + 'ms');
-            console.log('Response: ' + (navigation.responseEnd - navigation.responseStart).toFixed(2) + 'ms');
-            console.log('DOM Processing: ' + (navigation.domContentLoadedEventEnd - navigation.responseEnd).toFixed(2) + 'ms');
+            this.metrics.dns = navigation.domainLookupEnd - navigation.domainLookupStart;
+            this.metrics.tcp = navigation.connectEnd - navigation.connectStart;
+            this.metrics.response = navigation.responseEnd - navigation.responseStart;
+            this.log('DNS Lookup: ' + this.metrics.dns.toFixed(2) + 'ms');
+            this.log('TCP Connect: ' + this.metrics.tcp.toFixed(2) + 'ms');
+            this.log('Response: ' + this.metrics.response.toFixed(2) + 'ms');
+            this.log('DOM Processing: ' + (navigation.domContentLoadedEventEnd - navigation.responseEnd).toFixed(2) + 'ms');
         }
     };
 
@@ -78,14 +169,14 @@
                 lastEntry = entries[entries.length - 1];
 
             self.metrics.lcp = lastEntry.startTime;
-            console.log('LCP: ' + self.metrics.lcp.toFixed(2) + 'ms');
+            self.log('LCP: ' + self.metrics.lcp.toFixed(2) + 'ms');
 
             if (self.metrics.lcp <= 2500) {
-                console.log('✅ LCP is Good');
+                self.log('✅ LCP is Good');
             } else if (self.metrics.lcp <= 4000) {
-                console.log('⚠️ LCP needs improvement');
+                self.log('⚠️ LCP needs improvement');
             } else {
-                console.log('❌ LCP is Poor');
+                self.log('❌ LCP is Poor');
             }
         }).observe({ entryTypes: ['largest-contentful-paint'] });
 
@@ -94,14 +185,14 @@
             var entries = entryList.getEntries();
             entries.forEach(function (entry) {
                 self.metrics.fid = entry.processingStart - entry.startTime;
-                console.log('FID: ' + self.metrics.fid.toFixed(2) + 'ms');
+                self.log('FID: ' + self.metrics.fid.toFixed(2) + 'ms');
 
                 if (self.metrics.fid <= 100) {
-                    console.log('✅ FID is Good');
+                    self.log('✅ FID is Good');
                 } else if (self.metrics.fid <= 300) {
-                    console.log('⚠️ FID needs improvement');
+                    self.log('⚠️ FID needs improvement');
                 } else {
-                    console.log('❌ FID is Poor');
+                    self.log('❌ FID is Poor');
                 }
             });
         }).observe({ entryTypes: ['first-input'] });
@@ -115,20 +206,21 @@
                 }
             });
             self.metrics.cls = clsValue;
-            console.log('CLS: ' + self.metrics.cls.toFixed(3));
+            self.log('CLS: ' + self.metrics.cls.toFixed(3));
 
             if (self.metrics.cls <= 0.1) {
-                console.log('✅ CLS is Good');
+                self.log('✅ CLS is Good');
             } else if (self.metrics.cls <= 0.25) {
-                console.log('⚠️ CLS needs improvement');
+                self.log('⚠️ CLS needs improvement');
             } else {
-                console.log('❌ CLS is Poor');
+                self.log('❌ CLS is Poor');
             }
         }).observe({ entryTypes: ['layout-shift'] });
     };
 
     PerformanceMonitor.prototype.monitorCSSLoading = function () {
-        var cssLinks = document.querySelectorAll('link[rel="preload"][as="style"]'),
+        var self = this,
+            cssLinks = document.querySelectorAll('link[rel="preload"][as="style"]'),
             loadedCount = 0;
 
         cssLinks.forEach(function (link, index) {
@@ -139,10 +231,10 @@
                 if (link.sheet || link.href.indexOf('font-awesome') !== -1) {
                     loadedCount += 1;
                     loadTime = performance.now() - startTime;
-                    console.log('CSS Resource ' + (index + 1) + ' loaded: ' + loadTime.toFixed(2) + 'ms');
+                    self.log('CSS Resource ' + (index + 1) + ' loaded: ' + loadTime.toFixed(2) + 'ms');
 
                     if (loadedCount === cssLinks.length) {
-                        console.log('✅ All CSS resources loaded non-blocking');
+                        self.log('✅ All CSS resources loaded non-blocking');
                     }
                 }
             }
@@ -186,8 +278,8 @@
         // Report results after page load
         window.addEventListener('load', function () {
             setTimeout(function () {
-                console.log('\n=== Performance Report ===');
-                console.log(window.performanceMonitor.getReport());
+                window.performanceMonitor.log('\n=== Performance Report ===');
+                window.performanceMonitor.log(window.performanceMonitor.getReport());
             }, 5000);
         });
     }
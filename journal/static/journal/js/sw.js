@@ -1,11 +1,16 @@
 // Service Worker for Gratitude Journal
-// Caches critical resources to eliminate render blocking on repeat visits
-/*global self, caches, console, Promise, fetch */
+// Caches critical resources to eliminate render blocking on repeat visits,
+// revalidates the journal pages it has a copy of so unchanged ones cost a
+// 304, and keeps an IndexedDB replica of the user's journal in sync so the
+// entry list and entries render when the network is slow or offline
+/*global self, caches, console, Promise, fetch, indexedDB, URL, Response, setTimeout, clearTimeout, Date, encodeURIComponent, parseInt, String */
 
 (function () {
     'use strict';
 
-    var CACHE_NAME = 'gratitude-journal-v1',
+    var CACHE_NAME = 'gratitude-journal-v2',
+        // The last copy of each journal page, with the ETag it came with
+        PAGE_CACHE = 'gratitude-journal-pages-v1',
         CRITICAL_RESOURCES = [
             '/',
             '/static/journal/css/style.css',
@@ -13,7 +18,350 @@
             'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
             'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js',
             'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css'
-        ];
+        ],
+        SYNC_URL = '/api/v1/entries/changes/',
+        // Writes to these pull the change into the replica straight away
+        JOURNAL_WRITES = /^\/(api\/v1\/)?entries\//,
+        SYNC_PAGE_SIZE = 500,
+        // Pages are synced at most this often unless the user wrote something
+        SYNC_INTERVAL = 30000,
+        // How long a navigation waits for the network before using the replica
+        NETWORK_TIMEOUT = 4000,
+        OFFLINE_PAGE_SIZE = 100,
+        DB_NAME = 'gratitude-journal',
+        DB_VERSION = 1,
+        MOODS = {
+            excellent: '😄 Excellent',
+            good: '😊 Good',
+            okay: '😐 Okay',
+            difficult: '😔 Difficult',
+            challenging: '😰 Challenging'
+        },
+        syncing = null,
+        lastSync = 0;
+
+    // IndexedDB replica: "entries" keyed by id, "meta" holding the sync
+    // cursor and the user the replica belongs to
+
+    function openReplica() {
+        return new Promise(function (resolve, reject) {
+            var request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = function () {
+                var db = request.result,
+                    entries = db.createObjectStore('entries', { keyPath: 'id' });
+                entries.createIndex('created_at', 'created_at');
+                db.createObjectStore('meta');
+            };
+            request.onsuccess = function () {
+                resolve(request.result);
+            };
+            request.onerror = function () {
+                reject(request.error);
+            };
+        });
+    }
+
+    function withStores(mode, callback) {
+        return openReplica().then(function (db) {
+            return new Promise(function (resolve, reject) {
+                var tx = db.transaction(['entries', 'meta'], mode),
+                    result = callback(tx.objectStore('entries'), tx.objectStore('meta'));
+                tx.oncomplete = function () {
+                    db.close();
+                    resolve(result && result.value);
+                };
+                tx.onerror = tx.onabort = function () {
+                    db.close();
+                    reject(tx.error);
+                };
+            });
+        });
+    }
+
+    function readMeta() {
+        return withStores('readonly', function (entries, meta) {
+            var result = {},
+                request = meta.get('sync');
+            request.onsuccess = function () {
+                result.value = request.result || {};
+            };
+            return result;
+        });
+    }
+
+    function clearReplica() {
+        return withStores('readwrite', function (entries, meta) {
+            entries.clear();
+            meta.clear();
+        });
+    }
+
+    // Logged out: nothing may stay readable offline
+    function forgetUser() {
+        return Promise.all([clearReplica(), caches.delete(PAGE_CACHE)]);
+    }
+
+    function applyChanges(data) {
+        return withStores('readwrite', function (entries, meta) {
+            if (data.reset) {
+                entries.clear();
+            }
+            data.entries.forEach(function (entry) {
+                entries.put(entry);
+            });
+            data.deleted.forEach(function (id) {
+                entries.delete(id);
+            });
+            meta.put({ cursor: data.cursor, user: data.user }, 'sync');
+        });
+    }
+
+    function pull(state) {
+        var url = SYNC_URL + '?limit=' + SYNC_PAGE_SIZE;
+        if (state.cursor) {
+            url += '&since=' + encodeURIComponent(state.cursor);
+        }
+        return fetch(url, {
+            credentials: 'same-origin',
+            headers: { Accept: 'application/json' }
+        }).then(function (response) {
+            if (response.status === 401) {
+                return forgetUser();
+            }
+            if (!response.ok) {
+                throw new Error('Sync failed: ' + response.status);
+            }
+            return response.json().then(function (data) {
+                // A cursor only means something for the user it came from
+                if (state.cursor && data.user !== state.user) {
+                    return clearReplica().then(function () {
+                        return pull({});
+                    });
+                }
+                return applyChanges(data).then(function () {
+                    if (data.has_more) {
+                        return pull({ cursor: data.cursor, user: data.user });
+                    }
+                });
+            });
+        });
+    }
+
+    function syncReplica(force) {
+        if (syncing || (!force && Date.now() - lastSync < SYNC_INTERVAL)) {
+            return syncing || Promise.resolve();
+        }
+        lastSync = Date.now();
+        syncing = readMeta().then(pull).catch(function (error) {
+            console.log('Replica sync failed:', error);
+        }).then(function () {
+            syncing = null;
+        });
+        return syncing;
+    }
+
+    function readEntries(filter) {
+        return withStores('readonly', function (entries) {
+            var result = { value: { entries: [], total: 0 } },
+                request = entries.index('created_at').openCursor(null, 'prev');
+            request.onsuccess = function () {
+                var cursor = request.result;
+                if (!cursor) {
+                    return;
+                }
+                if (filter(cursor.value)) {
+                    result.value.total += 1;
+                    if (result.value.entries.length < OFFLINE_PAGE_SIZE) {
+                        result.value.entries.push(cursor.value);
+                    }
+                }
+                cursor.continue();
+            };
+            return result;
+        });
+    }
+
+    function readEntry(id) {
+        return withStores('readonly', function (entries) {
+            var result = {},
+                request = entries.get(id);
+            request.onsuccess = function () {
+                result.value = request.result;
+            };
+            return result;
+        });
+    }
+
+    // Offline pages rendered from the replica
+
+    function escapeHtml(value) {
+        return String(value).replace(/[&<>"']/g, function (character) {
+            return {
+                '&': '&amp;',
+                '<': '&lt;',
+                '>': '&gt;',
+                '"': '&quot;',
+                "'": '&#39;'
+            }[character];
+        });
+    }
+
+    function formatDate(value) {
+        return new Date(value).toLocaleDateString(undefined, {
+            year: 'numeric',
+            month: 'short',
+            day: 'numeric'
+        });
+    }
+
+    function renderPage(title, body) {
+        return new Response(
+            '<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8">' +
+                '<meta name="viewport" content="width=device-width, initial-scale=1.0">' +
+                '<title>' + escapeHtml(title) + ' - Gratitude Journal</title>' +
+                '<link rel="stylesheet" href="' + CRITICAL_RESOURCES[3] + '">' +
+                '<link rel="stylesheet" href="' + CRITICAL_RESOURCES[1] + '">' +
+                '</head><body><main class="container my-4">' +
+                '<div class="alert alert-warning">You are offline. This is the copy of your journal saved on this device.</div>' +
+                body + '</main></body></html>',
+            { headers: { 'Content-Type': 'text/html; charset=utf-8' } }
+        );
+    }
+
+    function renderTags(tags) {
+        return tags.map(function (tag) {
+            return '<span class="badge bg-light text-dark me-1">' + escapeHtml(tag) + '</span>';
+        }).join('');
+    }
+
+    function renderEntryList(url) {
+        var mood = url.searchParams.get('mood') || '',
+            tag = (url.searchParams.get('tag') || '').trim();
+
+        return readEntries(function (entry) {
+            return (!mood || entry.mood === mood) && (!tag || entry.tags.indexOf(tag) !== -1);
+        }).then(function (result) {
+            var cards;
+            if (!result.total && !mood && !tag) {
+                return null;
+            }
+            cards = result.entries.map(function (entry) {
+                return '<div class="col-md-6 col-lg-4 mb-4"><div class="card entry-card h-100 shadow-sm">' +
+                    '<div class="card-body"><h6 class="card-title fw-bold">' +
+                    escapeHtml(entry.title || formatDate(entry.created_at)) + '</h6>' +
+                    '<small class="text-muted">' + escapeHtml(formatDate(entry.created_at)) + ' · ' +
+                    escapeHtml(MOODS[entry.mood] || entry.mood) + '</small>' +
+                    '<p class="card-text mt-2">' + escapeHtml(entry.content.slice(0, 200)) + '</p>' +
+                    '<div>' + renderTags(entry.tags) + '</div>' +
+                    '<a href="/entries/' + entry.id + '/">Read more →</a>' +
+                    '</div></div></div>';
+            }).join('');
+            return renderPage(
+                'My Journal Entries',
+                '<h1 class="h3 mb-3">My Journal Entries</h1>' +
+                    '<p class="text-muted">' + result.total + ' entries' +
+                    (result.total > result.entries.length ? ', showing the newest ' + result.entries.length : '') +
+                    '</p><div class="row">' + cards + '</div>'
+            );
+        });
+    }
+
+    function renderEntryDetail(id) {
+        return readEntry(id).then(function (entry) {
+            if (!entry) {
+                return null;
+            }
+            return renderPage(
+                entry.title || formatDate(entry.created_at),
+                '<a href="/entries/">← Back to entries</a>' +
+                    '<h1 class="h3 mt-3">' + escapeHtml(entry.title || formatDate(entry.created_at)) + '</h1>' +
+                    '<p class="text-muted">' + escapeHtml(formatDate(entry.created_at)) + ' · ' +
+                    escapeHtml(MOODS[entry.mood] || entry.mood) + '</p>' +
+                    '<p style="white-space: pre-wrap;">' + escapeHtml(entry.content) + '</p>' +
+                    '<div>' + renderTags(entry.tags) + '</div>'
+            );
+        });
+    }
+
+    function renderFromReplica(url) {
+        var detail = url.pathname.match(/^\/entries\/(\d+)\/$/);
+        if (url.pathname === '/entries/') {
+            return renderEntryList(url);
+        }
+        if (detail) {
+            return renderEntryDetail(parseInt(detail[1], 10));
+        }
+        return Promise.resolve(null);
+    }
+
+    // Ask for a journal page with the ETag of the copy kept from last
+    // time, serving that copy when the server answers 304
+    function revalidatePage(request) {
+        return caches.open(PAGE_CACHE).then(function (cache) {
+            return cache.match(request.url).then(function (cached) {
+                var headers = { Accept: 'text/html' },
+                    etag = cached && cached.headers.get('ETag');
+                if (etag) {
+                    headers['If-None-Match'] = etag;
+                }
+                return fetch(request.url, {
+                    credentials: 'same-origin',
+                    headers: headers,
+                    redirect: 'manual',
+                    // The copy is kept here rather than in the HTTP cache
+                    cache: 'no-store'
+                }).then(function (response) {
+                    if (response.status === 304 && cached) {
+                        return cached;
+                    }
+                    // Pages showing one-off messages come without an ETag
+                    if (response.ok && response.headers.get('ETag')) {
+                        cache.put(request.url, response.clone());
+                    }
+                    return response;
+                });
+            });
+        });
+    }
+
+    // Revalidated over the network, falling back to the replica when the
+    // network fails or is too slow; successful pages also bring the
+    // replica up to date
+    function handleJournalPage(event, url) {
+        return new Promise(function (resolve) {
+            var settled = false,
+                timer,
+                network;
+
+            function fallback() {
+                if (settled) {
+                    return;
+                }
+                settled = true;
+                renderFromReplica(url).catch(function () {
+                    return null;
+                }).then(function (response) {
+                    resolve(response || network.then(null, function () {
+                        return caches.match('/');
+                    }));
+                });
+            }
+
+            network = revalidatePage(event.request).then(function (response) {
+                clearTimeout(timer);
+                if (!settled) {
+                    settled = true;
+                    resolve(response);
+                }
+                if (response.ok && !response.redirected) {
+                    event.waitUntil(syncReplica(false));
+                }
+                return response;
+            });
+            network.catch(fallback);
+            timer = setTimeout(fallback, NETWORK_TIMEOUT);
+        });
+    }
 
     // Install event - cache critical resources
     self.addEventListener('install', function (event) {
@@ -36,7 +384,7 @@
             caches.keys().then(function (cacheNames) {
                 return Promise.all(
                     cacheNames.map(function (cacheName) {
-                        if (cacheName !== CACHE_NAME) {
+                        if (cacheName !== CACHE_NAME && cacheName !== PAGE_CACHE) {
                             console.log('Deleting old cache:', cacheName);
                             return caches.delete(cacheName);
                         }
@@ -49,6 +397,29 @@
 
     // Fetch event - serve from cache first for critical resources
     self.addEventListener('fetch', function (event) {
+        var url = new URL(event.request.url);
+
+        if (url.origin === self.location.origin && event.request.method !== 'GET') {
+            if (url.pathname === '/logout/') {
+                event.waitUntil(forgetUser());
+            } else if (JOURNAL_WRITES.test(url.pathname)) {
+                // A journal write: pull it into the replica once it is done
+                event.respondWith(fetch(event.request).then(function (response) {
+                    event.waitUntil(syncReplica(true));
+                    return response;
+                }));
+            }
+            // Anything else, such as performance beacons, goes straight
+            // to the network
+            return;
+        }
+
+        if (url.origin === self.location.origin && event.request.mode === 'navigate' &&
+                /^\/entries\/(\d+\/)?$/.test(url.pathname)) {
+            event.respondWith(handleJournalPage(event, url));
+            return;
+        }
+
         // Only handle same-origin requests and critical CDN resources
         if (event.request.url.indexOf(self.location.origin) === 0 ||
                 event.request.url.indexOf('cdn.jsdelivr.net') !== -1 ||
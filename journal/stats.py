@@ -0,0 +1,265 @@
+from collections import Counter
+from django.contrib.auth.models import User
+from django.db.models import (
+    Case, Count, F, Max, Min, OuterRef, Q, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce, Greatest, Least
+from .models import ArchivedEntry, GratitudeEntry, UserJournalStats
+from .sharding import shard_for_user
+
+
+def get_mood_stats(entries):
+    """
+    Return the total and per-mood counts for a queryset of entries
+
+    All buckets are computed by one conditional-aggregation query instead
+    of one COUNT per mood.
+    """
+    aggregates = {'total': Count('id')}
+    for mood_value, mood_label in GratitudeEntry.MOOD_CHOICES:
+        aggregates[mood_value] = Count('id', filter=Q(mood=mood_value))
+    counts = entries.aggregate(**aggregates)
+
+    mood_stats = {}
+    for mood_value, mood_label in GratitudeEntry.MOOD_CHOICES:
+        mood_stats[mood_value] = {
+            'label': mood_label,
+            'count': counts[mood_value],
+        }
+    return counts['total'], mood_stats
+
+
+def counter_aggregates():
+    """Return the aggregates that rebuild a UserJournalStats row"""
+    aggregates = {
+        'total_entries': Count('id'),
+        'private_count': Count('id', filter=Q(is_private=True)),
+        'public_count': Count('id', filter=Q(is_private=False)),
+        'first_entry_at': Min('created_at'),
+        'last_entry_at': Max('created_at'),
+    }
+    for mood_value, mood_label in GratitudeEntry.MOOD_CHOICES:
+        aggregates[UserJournalStats.mood_field(mood_value)] = Count(
+            'id', filter=Q(mood=mood_value)
+        )
+    return aggregates
+
+
+def combine_counters(hot, archived):
+    """
+    Merge counters aggregated over the entries and the archived entries
+
+    Both are counter_aggregates() results; archived entries count towards
+    every total and are also counted in archived_count.
+    """
+    counts = {}
+    for field in counter_aggregates():
+        value, other = hot.get(field), archived.get(field)
+        if field in ('first_entry_at', 'last_entry_at'):
+            bounds = [bound for bound in (value, other) if bound is not None]
+            pick = min if field == 'first_entry_at' else max
+            counts[field] = pick(bounds) if bounds else None
+        else:
+            counts[field] = (value or 0) + (other or 0)
+    counts['archived_count'] = archived.get('total_entries') or 0
+    return counts
+
+
+def counter_fields():
+    """Return the stored UserJournalStats counter fields"""
+    return [*counter_aggregates(), 'archived_count']
+
+
+def save_counters(rows, using=None):
+    """Insert or overwrite UserJournalStats rows in one statement"""
+    UserJournalStats.objects.db_manager(using).bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=counter_fields(),
+    )
+
+
+def rebuild_user_stats(user):
+    """Recompute a user's counters from their entries and archive"""
+    counts = combine_counters(
+        GratitudeEntry.objects.for_user(user).aggregate(
+            **counter_aggregates()
+        ),
+        ArchivedEntry.objects.for_user(user).aggregate(
+            **counter_aggregates()
+        ),
+    )
+    stats = UserJournalStats(user=user, **counts)
+    save_counters([stats], using=shard_for_user(user.pk))
+    return stats
+
+
+def get_journal_stats(user):
+    """Return the user's counters, building them on first use"""
+    try:
+        return UserJournalStats.objects.for_user(user).get()
+    except UserJournalStats.DoesNotExist:
+        return rebuild_user_stats(user)
+
+
+def get_user_stats(user):
+    """Return the total and mood distribution of a user's entries"""
+    stats = get_journal_stats(user)
+    mood_stats = {}
+    for mood_value, mood_label in GratitudeEntry.MOOD_CHOICES:
+        mood_stats[mood_value] = {
+            'label': mood_label,
+            'count': getattr(stats, UserJournalStats.mood_field(mood_value)),
+        }
+    return stats.total_entries, mood_stats
+
+
+def _privacy_field(is_private):
+    return 'private_count' if is_private else 'public_count'
+
+
+def _increment(field, amount=1):
+    return F(field) + amount
+
+
+def _decrement(field, amount=1):
+    # Clamped so drifted counters never violate the unsigned constraint
+    return Greatest(F(field) - amount, 0)
+
+
+def _apply(user, changes):
+    """
+    Apply F() expression changes to the user's counters
+
+    Callers run this in the same transaction as the entry write. A user
+    without a counters row is rebuilt from the entries table instead,
+    which already reflects the write.
+    """
+    if not UserJournalStats.objects.for_user(user).update(**changes):
+        rebuild_user_stats(user)
+
+
+def _owner(entry):
+    # Only the user's id is needed, so the user row is not fetched
+    return User(pk=entry.user_id)
+
+
+def record_entry_created(entry):
+    """Count a newly saved entry"""
+    created_at = entry.created_at
+    _apply(_owner(entry), {
+        'total_entries': _increment('total_entries'),
+        UserJournalStats.mood_field(entry.mood): _increment(
+            UserJournalStats.mood_field(entry.mood)
+        ),
+        _privacy_field(entry.is_private): _increment(
+            _privacy_field(entry.is_private)
+        ),
+        'first_entry_at': Case(
+            When(first_entry_at__isnull=True, then=Value(created_at)),
+            When(first_entry_at__gt=created_at, then=Value(created_at)),
+            default=F('first_entry_at'),
+        ),
+        'last_entry_at': Case(
+            When(last_entry_at__isnull=True, then=Value(created_at)),
+            When(last_entry_at__lt=created_at, then=Value(created_at)),
+            default=F('last_entry_at'),
+        ),
+    })
+
+
+def record_entry_changed(entry, old_mood, old_is_private,
+                         old_created_at=None):
+    """
+    Move an edited entry between mood and privacy buckets, and re-derive
+    the first and last entry times when its creation time moved
+    """
+    changes = {}
+    if old_mood != entry.mood:
+        old_field = UserJournalStats.mood_field(old_mood)
+        new_field = UserJournalStats.mood_field(entry.mood)
+        changes[old_field] = _decrement(old_field)
+        changes[new_field] = _increment(new_field)
+    if old_is_private != entry.is_private:
+        old_field = _privacy_field(old_is_private)
+        new_field = _privacy_field(entry.is_private)
+        changes[old_field] = _decrement(old_field)
+        changes[new_field] = _increment(new_field)
+    if old_created_at is not None and old_created_at != entry.created_at:
+        changes['first_entry_at'] = _remaining_bound(Least, 'created_at')
+        changes['last_entry_at'] = _remaining_bound(Greatest, '-created_at')
+    if changes:
+        _apply(_owner(entry), changes)
+
+
+def record_entry_deleted(entry):
+    """Uncount a deleted entry"""
+    record_entries_deleted(_owner(entry), [entry])
+
+
+def record_entries_deleted(user, entries):
+    """Uncount a batch of the user's deleted entries in one update"""
+    removed = Counter()
+    for entry in entries:
+        removed['total_entries'] += 1
+        removed[UserJournalStats.mood_field(entry.mood)] += 1
+        removed[_privacy_field(entry.is_private)] += 1
+    if not removed:
+        return
+    _apply(user, {
+        field: _decrement(field, amount) for field, amount in removed.items()
+    })
+
+    # Only re-derive the bounds when a deleted entry defined them
+    created = [entry.created_at for entry in entries]
+    UserJournalStats.objects.for_user(user).filter(
+        Q(first_entry_at__in=created) | Q(last_entry_at__in=created)
+    ).update(
+        first_entry_at=_remaining_bound(Least, 'created_at'),
+        last_entry_at=_remaining_bound(Greatest, '-created_at'),
+    )
+
+
+def _remaining_bound(pick, ordering):
+    """
+    Return the user's first or last created_at across both tables
+
+    LEAST and GREATEST return NULL on SQLite if either side is NULL, so
+    a side without entries falls through to the other.
+    """
+    hot, archived = (
+        Subquery(model.objects.filter(
+            user=OuterRef('user')
+        ).order_by(ordering).values('created_at')[:1])
+        for model in (GratitudeEntry, ArchivedEntry)
+    )
+    return Coalesce(pick(hot, archived), hot, archived)
+
+
+def record_privacy_changed(user, is_private, count):
+    """Move count entries into the private or public bucket"""
+    if count:
+        old_field = _privacy_field(not is_private)
+        new_field = _privacy_field(is_private)
+        _apply(user, {
+            old_field: _decrement(old_field, count),
+            new_field: _increment(new_field, count),
+        })
+
+
+def record_entries_archived(user, count):
+    """Count entries moved into the archive"""
+    if count:
+        _apply(user, {'archived_count': _increment('archived_count', count)})
+
+
+def record_entry_restored(user):
+    """Uncount an entry moved back out of the archive"""
+    _apply(user, {'archived_count': _decrement('archived_count')})
+
+
+def record_entries_restored(user, count):
+    """Uncount entries moved back out of the archive"""
+    if count:
+        _apply(user, {'archived_count': _decrement('archived_count', count)})
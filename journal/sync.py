@@ -0,0 +1,155 @@
+"""
+Delta sync of a user's journal for offline replicas
+
+Clients hold an opaque cursor and ask only for the entries written and
+deleted since it. Writes are found through ``GratitudeEntry.updated_at``
+and deletes through ``EntryTombstone`` rows, each paged by a
+(timestamp, id) keyset so every page costs the same. Archived entries
+keep their ``updated_at`` and are paged alongside the live ones, so a
+full copy includes them.
+"""
+import base64
+import binascii
+import heapq
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import ArchivedEntry, EntryTombstone, GratitudeEntry
+from .sharding import journal_shards
+
+# A finished sync never moves its cursor past this long ago, so rows
+# written by a transaction still open during the sync are picked up
+# next time. Re-sent rows are harmless: applying a change twice is a
+# no-op.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+
+EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+
+class InvalidSyncCursor(Exception):
+    """Raised when a sync cursor cannot be decoded"""
+
+
+def tombstone_retention():
+    """Return how long deletions are kept for replicas to catch up"""
+    return timedelta(days=getattr(settings, 'JOURNAL_SYNC_TOMBSTONE_DAYS', 30))
+
+
+def encode_sync_cursor(entries_position, deleted_position):
+    """Encode the (timestamp, id) positions of both change streams"""
+    raw = '|'.join(
+        f'{timestamp.isoformat()}|{row_id}'
+        for timestamp, row_id in (entries_position, deleted_position)
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_sync_cursor(cursor):
+    """Decode a cursor into its entries and deletions positions"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        entries_at, entry_id, deleted_at, tombstone_id = raw.split('|')
+        return (
+            (datetime.fromisoformat(entries_at), int(entry_id)),
+            (datetime.fromisoformat(deleted_at), int(tombstone_id)),
+        )
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise InvalidSyncCursor(cursor)
+
+
+def _after(queryset, field, position, limit):
+    """Return up to limit rows after a (timestamp, id) position"""
+    timestamp, row_id = position
+    rows = list(queryset.filter(
+        Q(**{f'{field}__gt': timestamp}) |
+        Q(**{field: timestamp, 'id__gt': row_id})
+    ).order_by(field, 'id')[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _settled(position, now):
+    """Return the position, or the latest one no open write can precede"""
+    return min(position, (now - SYNC_OVERLAP, 0))
+
+
+def get_changes(user, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Return the user's entries and deletions since a cursor
+
+    Returns a dict with ``entries`` (changed GratitudeEntry objects),
+    ``deleted`` (ids of deleted entries), ``cursor`` to pass next time,
+    ``has_more`` when another page is waiting and ``reset`` when the
+    replica must be cleared first, which happens on a first sync, with
+    an unreadable cursor or once the cursor is older than the kept
+    tombstones.
+    """
+    now = timezone.now()
+    reset = cursor is None
+    if not reset:
+        try:
+            entries_position, deleted_position = decode_sync_cursor(cursor)
+        except InvalidSyncCursor:
+            reset = True
+        else:
+            # Deletions older than the kept tombstones would be missed
+            horizon = now - tombstone_retention()
+            reset = deleted_position[0] < horizon
+    if reset:
+        # A full copy needs no deletions, only those made while paging
+        entries_position = (EPOCH, 0)
+        deleted_position = _settled((now, 0), now)
+
+    entries, more_entries = _after(
+        GratitudeEntry.objects.for_user(user), 'updated_at',
+        entries_position, limit
+    )
+    archived, more_archived = _after(
+        ArchivedEntry.objects.for_user(user), 'updated_at',
+        entries_position, limit
+    )
+    if archived:
+        entries = list(heapq.merge(
+            entries, [row.to_entry() for row in archived],
+            key=lambda entry: (entry.updated_at, entry.id),
+        ))
+        more_entries = (
+            more_entries or more_archived or len(entries) > limit
+        )
+        entries = entries[:limit]
+    tombstones, more_deleted = _after(
+        EntryTombstone.objects.for_user(user), 'deleted_at',
+        deleted_position, limit
+    )
+    if entries:
+        entries_position = (entries[-1].updated_at, entries[-1].id)
+    if tombstones:
+        deleted_position = (tombstones[-1].deleted_at, tombstones[-1].id)
+
+    has_more = more_entries or more_deleted
+    if not has_more:
+        entries_position = _settled(entries_position, now)
+        deleted_position = _settled(deleted_position, now)
+    return {
+        'entries': entries,
+        'deleted': [tombstone.entry_id for tombstone in tombstones],
+        'cursor': encode_sync_cursor(entries_position, deleted_position),
+        'has_more': has_more,
+        'reset': reset,
+    }
+
+
+def prune_tombstones(days=None):
+    """Delete tombstones older than the retention period on every shard"""
+    retention = (timedelta(days=days) if days is not None
+                 else tombstone_retention())
+    deleted = 0
+    for alias in journal_shards():
+        deleted += EntryTombstone.objects.using(alias).filter(
+            deleted_at__lt=timezone.now() - retention
+        ).delete()[0]
+    return deleted
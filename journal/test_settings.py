@@ -11,8 +11,15 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
-    }
+    },
+    # Only holds data in tests that enable sharding
+    'shard_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
 }
+JOURNAL_SHARDS = ['default']
+JOURNAL_READ_REPLICAS = []
 
 
 # Disable migrations for faster test runs
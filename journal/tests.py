@@ -1,9 +1,98 @@
-from django.test import TestCase, Client, override_settings
+import csv
+import gzip
+import json
+import logging
+import os
+import re
+import runpy
+import tempfile
+import unittest
+import unittest.mock
+import warnings
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.test import (
+    AsyncClient, Client, RequestFactory, TestCase, override_settings,
+)
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.contrib.messages import get_messages
-from .models import GratitudeEntry
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from django.utils.http import http_date
+from .auth import user_cache_key
+from .activity import get_streaks, local_date, rebuild_user_activity
+from .models import (
+    ArchivedEntry, DailyActivity, EntryTag, EntryTombstone, GratitudeEntry,
+    PerformanceBucket, Tag, UserJournalStats, UserShard,
+)
 from .forms import GratitudeEntryForm, CustomUserCreationForm
+from .fragments import get_cache_stats, get_fragment_cache
+from .pagination import CursorPaginator, encode_cursor
+from .search import install_search_index, search_entries
+from .search import uninstall_search_index
+from .stats import get_mood_stats, get_user_stats, rebuild_user_stats
+from .benchmarks.cases import get_template_engines
+from .admin import DrillDownQuerySet, planner_estimate
+from .middleware import AsyncWhiteNoiseMiddleware
+from . import rum, sync, urls as journal_urls
+from .archive import archive_entries
+from .rebalance import move_users
+from .routers import (
+    PIN_SESSION_KEY, ReplicaRouter, ShardRouter, pin_to_primary,
+    replica_reads, reading_from_replica,
+)
+from .sharding import (
+    SHARD_ID_SPACE, assign_shard, pick_shard, seed_id_sequences,
+    shard_for_user,
+)
+from .warmup import warm_connections, warm_up
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+
+def asgi_get(client, path, query_string=b''):
+    """
+    GET a path through the ASGI handler with the client's session
+
+    Returns the ASGI messages sent, so tests see the response the way an
+    ASGI server would, including how its body was streamed.
+    """
+    cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'},
+        'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'query_string': query_string,
+        'root_path': '', 'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+        'headers': [
+            (b'host', b'testserver'),
+            (b'cookie', f'{settings.SESSION_COOKIE_NAME}={cookie}'.encode()),
+        ],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(get_asgi_application())(scope, receive, send)
+    return messages
 
 
 @override_settings(
@@ -313,6 +402,18 @@ class GratitudeEntryViewsTestCase(TestCase):
         self.assertEqual(mood_stats['good']['count'], 1)
         self.assertEqual(mood_stats['excellent']['count'], 1)
 
+    def test_dashboard_query_budget(self):
+        """Test dashboard statistics do not issue one query per mood"""
+        self.client.login(username='testuser1', password='testpass123')
+        # The first visit builds the user's counters row
+        self.client.get(reverse('journal:dashboard'))
+
+        # Session, user, counters row and recent entries
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('journal:dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+
     def test_dashboard_view_unauthenticated(self):
         """Test dashboard view when not authenticated"""
         response = self.client.get(reverse('journal:dashboard'))
@@ -468,3 +569,2717 @@ class GratitudeEntryModelTestCase(TestCase):
         entries = list(GratitudeEntry.objects.all())
         self.assertEqual(entries[0], entry2)  # Newest first
         self.assertEqual(entries[1], entry1)
+
+
+class StatsServiceTestCase(TestCase):
+    """Test cases for the aggregated statistics service"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        for mood in ['good', 'good', 'excellent', 'challenging']:
+            GratitudeEntry.objects.create(
+                user=self.user,
+                content='I am grateful for statistics.',
+                mood=mood
+            )
+
+    def test_mood_stats_single_query(self):
+        """Test total and every mood bucket come from one query"""
+        with self.assertNumQueries(1):
+            total, mood_stats = get_mood_stats(
+                GratitudeEntry.objects.filter(user=self.user)
+            )
+
+        self.assertEqual(total, 4)
+        self.assertEqual(mood_stats['good']['count'], 2)
+        self.assertEqual(mood_stats['okay']['count'], 0)
+
+    def test_user_stats_single_query(self):
+        """Test user stats are a single counters-row read once built"""
+        get_user_stats(self.user)
+        with self.assertNumQueries(1):
+            total, mood_stats = get_user_stats(self.user)
+
+        self.assertEqual(total, 4)
+        self.assertEqual(mood_stats['good']['count'], 2)
+        self.assertEqual(mood_stats['excellent']['count'], 1)
+        self.assertEqual(mood_stats['okay']['count'], 0)
+        self.assertEqual(mood_stats['challenging']['count'], 1)
+        self.assertEqual(mood_stats['good']['label'], '😊 Good')
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class CursorPaginationTestCase(TestCase):
+    """Test cases for keyset pagination of the entry list"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        now = timezone.now()
+        self.entries = [
+            GratitudeEntry.objects.create(
+                user=self.user,
+                title=f'Entry {i}',
+                content='I am grateful for pagination.',
+                created_at=now - timedelta(hours=i)
+            )
+            for i in range(25)
+        ]
+        # Two entries sharing a timestamp exercise the id tie-breaker
+        self.entries[5].created_at = self.entries[6].created_at
+        self.entries[5].save()
+
+    def test_walk_forward_and_back(self):
+        """Test next/previous cursors visit every entry exactly once"""
+        paginator = CursorPaginator(
+            GratitudeEntry.objects.filter(user=self.user), 10
+        )
+        first = paginator.get_page()
+        self.assertFalse(first.has_previous)
+        self.assertTrue(first.has_next)
+
+        second = paginator.get_page(after=first.next_cursor)
+        third = paginator.get_page(after=second.next_cursor)
+        self.assertFalse(third.has_next)
+        self.assertEqual(len(third), 5)
+
+        seen = [e.id for page in (first, second, third) for e in page]
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+        back = paginator.get_page(before=third.previous_cursor)
+        self.assertEqual([e.id for e in back], [e.id for e in second])
+        back = paginator.get_page(before=back.previous_cursor)
+        self.assertEqual([e.id for e in back], [e.id for e in first])
+        self.assertFalse(back.has_previous)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Test a malformed cursor falls back to the first page"""
+        paginator = CursorPaginator(
+            GratitudeEntry.objects.filter(user=self.user), 10
+        )
+        page = paginator.get_page(after='not-a-cursor')
+        self.assertEqual(page[0], paginator.get_page()[0])
+
+    def test_deep_page_query_count_is_flat(self):
+        """Test a deep page costs the same queries as the first page"""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('journal:entry_list')
+        response = self.client.get(url)
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(url, {'after': cursor})
+        cursor = response.context['page_obj'].next_cursor
+
+        # Session, user, entry total, newest updated_at and page rows
+        with self.assertNumQueries(5):
+            response = self.client.get(url, {'after': cursor})
+        self.assertEqual(len(response.context['page_obj']), 5)
+        self.assertContains(response, 'before=')
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class TagTestCase(TestCase):
+    """Test cases for normalized tags and tag filtering"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def create_entry(self, title, tags):
+        data = {
+            'title': title,
+            'content': 'I am grateful for tidy tags.',
+            'mood': 'good',
+            'tags': tags,
+            'is_private': True
+        }
+        self.client.post(reverse('journal:create_entry'), data)
+        return GratitudeEntry.objects.get(title=title)
+
+    def test_form_writes_tag_model(self):
+        """Test creating an entry stores normalized Tag rows"""
+        entry = self.create_entry('Tagged Entry', 'family,  work ,family')
+
+        self.assertEqual(entry.tags, 'family, work, family')
+        self.assertEqual(
+            sorted(entry.tag_objects.values_list('name', flat=True)),
+            ['family', 'work']
+        )
+
+    def test_edit_replaces_tags(self):
+        """Test editing an entry replaces its normalized tags"""
+        entry = self.create_entry('Tagged Entry', 'family, work')
+        data = {
+            'title': 'Tagged Entry',
+            'content': 'I am grateful for tidy tags.',
+            'mood': 'good',
+            'tags': 'health',
+        }
+        self.client.post(reverse('journal:edit_entry', args=[entry.id]), data)
+
+        self.assertEqual(
+            list(entry.tag_objects.values_list('name', flat=True)),
+            ['health']
+        )
+        # Tags are shared rather than deleted with their last entry
+        self.assertEqual(Tag.objects.count(), 3)
+
+    def test_entry_list_tag_filter(self):
+        """Test filtering the entry list by tag"""
+        self.create_entry('Family Entry', 'family')
+        self.create_entry('Work Entry', 'work, networking')
+
+        response = self.client.get(
+            reverse('journal:entry_list'), {'tag': 'family'}
+        )
+        self.assertContains(response, 'Family Entry')
+        self.assertNotContains(response, 'Work Entry')
+        self.assertEqual(response.context['total_results'], 1)
+
+        # Substrings of a tag must not match
+        response = self.client.get(
+            reverse('journal:entry_list'), {'tag': 'work'}
+        )
+        self.assertEqual(response.context['total_results'], 1)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class AnalyticsTestCase(TestCase):
+    """Test cases for daily activity, streaks and the analytics view"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.now = timezone.now()
+
+    def write(self, days_ago, **kwargs):
+        return GratitudeEntry.objects.create(
+            user=self.user,
+            content='I am grateful for streaks.',
+            created_at=self.now - timedelta(days=days_ago),
+            **kwargs
+        )
+
+    def test_streaks_follow_saves_and_deletes(self):
+        """Test streaks are maintained incrementally on write"""
+        for days_ago in [0, 1, 2, 2, 5, 6]:
+            self.write(days_ago)
+        self.assertEqual(get_streaks(self.user), (3, 3))
+        self.assertEqual(
+            DailyActivity.objects.get(
+                user=self.user,
+                date=local_date(self.now - timedelta(days=2))
+            ).entry_count,
+            2
+        )
+
+        # Filling the gap joins both runs
+        self.write(3)
+        gap = self.write(4)
+        self.assertEqual(get_streaks(self.user), (7, 7))
+
+        # Deleting the only entry of a day splits the run again
+        gap.delete()
+        self.assertEqual(get_streaks(self.user), (4, 4))
+
+    def test_edited_date_moves_activity(self):
+        """Test changing an entry's creation time moves it to its new day"""
+        for days_ago in [0, 1, 3]:
+            self.write(days_ago)
+        moved = self.write(5)
+        self.assertEqual(get_streaks(self.user), (2, 2))
+
+        moved.created_at = self.now - timedelta(days=2)
+        moved.save()
+        self.assertEqual(get_streaks(self.user), (4, 4))
+        self.assertFalse(DailyActivity.objects.filter(
+            date=local_date(self.now - timedelta(days=5))
+        ).exists())
+
+        # Saving without touching the date leaves the days alone
+        moved.title = 'Retitled'
+        moved.save()
+        incremental = list(DailyActivity.objects.values_list(
+            'date', 'entry_count', 'streak'
+        ))
+        rebuild_user_activity(self.user.id)
+        self.assertEqual(list(DailyActivity.objects.values_list(
+            'date', 'entry_count', 'streak'
+        )), incremental)
+
+    def test_streak_lapses_after_a_missed_day(self):
+        """Test the current streak is zero when yesterday was skipped"""
+        self.write(2)
+        self.write(3)
+        self.assertEqual(get_streaks(self.user), (0, 2))
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_day_boundaries_use_local_time(self):
+        """Test entries are bucketed by the site's local calendar day"""
+        late = self.now.replace(hour=3, minute=0)
+        entry = GratitudeEntry.objects.create(
+            user=self.user,
+            content='I am grateful for late nights.',
+            created_at=late
+        )
+        activity = DailyActivity.objects.get(user=self.user)
+        self.assertEqual(activity.date, (late - timedelta(days=1)).date())
+        self.assertEqual(activity.date, local_date(entry.created_at))
+
+    def test_rebuild_matches_incremental(self):
+        """Test rebuilding from entries reproduces the incremental rows"""
+        for days_ago in [0, 1, 1, 4, 5]:
+            self.write(days_ago)
+        incremental = list(DailyActivity.objects.values_list(
+            'date', 'entry_count', 'streak'
+        ))
+        rebuild_user_activity(self.user.id)
+        self.assertEqual(
+            list(DailyActivity.objects.values_list(
+                'date', 'entry_count', 'streak'
+            )),
+            incremental
+        )
+
+    def test_analytics_view(self):
+        """Test analytics view context and constant query count"""
+        self.write(0, mood='excellent', tags='family')
+        self.write(1, mood='good')
+        self.write(10, mood='good')
+        self.write(40, mood='good')
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(reverse('journal:analytics'))
+
+        # Session, user, counters row, two streak reads, two windowed
+        # sums, live and archived tag stats and monthly activity
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse('journal:analytics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_entries'], 4)
+        self.assertEqual(response.context['entries_last_7_days'], 2)
+        self.assertEqual(response.context['entries_last_30_days'], 3)
+        self.assertEqual(response.context['current_streak'], 2)
+        self.assertEqual(
+            response.context['mood_stats'],
+            [{'mood': 'excellent', 'count': 1}, {'mood': 'good', 'count': 3}]
+        )
+
+
+class SearchIndexMixin:
+    """Install the full-text index for test cases that search"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Migrations are disabled in tests, so install the index directly
+        with connection.schema_editor() as editor:
+            install_search_index(editor)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            uninstall_search_index(editor)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class SearchTestCase(SearchIndexMixin, TestCase):
+    """Test cases for full-text search"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.walk = GratitudeEntry.objects.create(
+            user=self.user,
+            title='Morning walk',
+            content='Grateful for a <b>sunny</b> walk in the park.',
+            tags='nature'
+        )
+        self.dinner = GratitudeEntry.objects.create(
+            user=self.user,
+            title='Family dinner',
+            content='Grateful for dinner and a walk with family.',
+            tags='family'
+        )
+        GratitudeEntry.objects.create(
+            user=self.other,
+            title='Walking',
+            content='Another user walking in the park.'
+        )
+
+    def test_results_are_ranked_and_scoped(self):
+        """Test title matches outrank content matches for one user only"""
+        results, has_next = search_entries(self.user, 'walk')
+
+        self.assertEqual(
+            [result.entry for result in results], [self.walk, self.dinner]
+        )
+        self.assertFalse(has_next)
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        """Test matches are marked and entry HTML is escaped"""
+        results, _ = search_entries(self.user, 'sunny')
+
+        self.assertEqual(len(results), 1)
+        self.assertIn('<mark>sunny</mark>', results[0].snippet)
+        self.assertIn('&lt;b&gt;', results[0].snippet)
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test triggers keep the index in sync with the entries table"""
+        self.walk.content = 'Grateful for quiet mornings.'
+        self.walk.title = 'Quiet'
+        self.walk.save()
+        self.dinner.delete()
+
+        self.assertEqual(search_entries(self.user, 'walk')[0], [])
+        self.assertEqual(len(search_entries(self.user, 'quiet')[0]), 1)
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Test FTS5 operators in user input do not raise errors"""
+        results, _ = search_entries(self.user, 'walk" OR NEAR(')
+        self.assertEqual(results, [])
+
+    def test_search_view_paginates(self):
+        """Test the search view renders highlighted, paginated results"""
+        for i in range(12):
+            GratitudeEntry.objects.create(
+                user=self.user,
+                content=f'Grateful for sunshine number {i}.'
+            )
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(reverse('journal:search'), {'q': 'sunshine'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['results']), 10)
+        self.assertTrue(response.context['has_next'])
+        self.assertContains(response, '<mark>sunshine</mark>')
+
+        response = self.client.get(
+            reverse('journal:search'), {'q': 'sunshine', 'page': 2}
+        )
+        self.assertEqual(len(response.context['results']), 2)
+        self.assertFalse(response.context['has_next'])
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class JournalCountersTestCase(TestCase):
+    """Test cases for the denormalized per-user journal counters"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def post_entry(self, mood='good', is_private=True):
+        data = {
+            'content': 'I am grateful for accurate counters.',
+            'mood': mood,
+            'tags': '',
+        }
+        if is_private:
+            data['is_private'] = True
+        self.client.post(reverse('journal:create_entry'), data)
+        return GratitudeEntry.objects.filter(user=self.user).first()
+
+    def stats(self):
+        return UserJournalStats.objects.get(user=self.user)
+
+    def test_counters_follow_create_edit_and_delete(self):
+        """Test counters track writes made through the views"""
+        first = self.post_entry('good')
+        second = self.post_entry('excellent', is_private=False)
+
+        stats = self.stats()
+        self.assertEqual(stats.total_entries, 2)
+        self.assertEqual(stats.good_count, 1)
+        self.assertEqual(stats.excellent_count, 1)
+        self.assertEqual(stats.private_count, 1)
+        self.assertEqual(stats.public_count, 1)
+        self.assertEqual(stats.first_entry_at, first.created_at)
+        self.assertEqual(stats.last_entry_at, second.created_at)
+
+        # Changing mood and privacy moves the entry between buckets
+        self.client.post(
+            reverse('journal:edit_entry', args=[first.id]),
+            {'content': 'I am grateful for accurate counters.',
+             'mood': 'okay'}
+        )
+        stats = self.stats()
+        self.assertEqual(stats.good_count, 0)
+        self.assertEqual(stats.okay_count, 1)
+        self.assertEqual(stats.private_count, 0)
+        self.assertEqual(stats.public_count, 2)
+
+        # Deleting the newest entry moves the last-entry bound back
+        self.client.post(reverse('journal:delete_entry', args=[second.id]))
+        stats = self.stats()
+        self.assertEqual(stats.total_entries, 1)
+        self.assertEqual(stats.excellent_count, 0)
+        self.assertEqual(stats.last_entry_at, first.created_at)
+
+    def test_admin_writes_update_counters(self):
+        """Test counters track edits and deletes made in the admin"""
+        entry = self.post_entry('good')
+        self.post_entry('excellent')
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='adminpass'
+        )
+        self.client.force_login(admin)
+
+        self.client.post(
+            reverse('admin:journal_gratitudeentry_change', args=[entry.id]),
+            {
+                'user': self.user.pk,
+                'title': '',
+                'content': entry.content,
+                'mood': 'okay',
+                'tags': '',
+                'created_at_0': '2024-01-15',
+                'created_at_1': '08:00:00',
+            }
+        )
+        stats = self.stats()
+        self.assertEqual((stats.good_count, stats.okay_count), (0, 1))
+        self.assertEqual((stats.private_count, stats.public_count), (1, 1))
+        entry.refresh_from_db()
+        self.assertEqual(stats.first_entry_at, entry.created_at)
+
+        self.client.post(
+            reverse('admin:journal_gratitudeentry_delete', args=[entry.id]),
+            {'post': 'yes'}
+        )
+        stats = self.stats()
+        self.assertEqual((stats.total_entries, stats.okay_count), (1, 0))
+        self.assertEqual(
+            stats.first_entry_at, GratitudeEntry.objects.get().created_at
+        )
+
+    def test_rebuild_command_repairs_drift(self):
+        """Test the management command repairs drifted counters"""
+        self.post_entry('good')
+        # Bulk inserts send no signals, so they are not counted
+        GratitudeEntry.objects.bulk_create([GratitudeEntry(
+            user=self.user, content='Imported entry.', mood='okay'
+        )])
+        self.assertEqual(self.stats().total_entries, 1)
+        # A user without entries or counters has not drifted
+        User.objects.create_user(username='newcomer', password='pass')
+
+        call_command('rebuild_journal_stats', '--dry-run', stdout=StringIO())
+        self.assertEqual(self.stats().total_entries, 1)
+
+        out = StringIO()
+        call_command('rebuild_journal_stats', stdout=out)
+        self.assertIn('repaired 1', out.getvalue())
+        stats = self.stats()
+        self.assertEqual(stats.total_entries, 2)
+        self.assertEqual(stats.okay_count, 1)
+
+
+class ImportEntriesCommandTestCase(TestCase):
+    """Test cases for the import_entries management command"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def test_import_jsonl_in_batches(self):
+        """Test valid rows are imported and invalid rows rejected"""
+        rows = [
+            {'title': 'Imported one', 'content': 'Grateful for migrations.',
+             'mood': 'excellent', 'tags': 'family, work',
+             'created_at': '2024-03-01T09:00:00'},
+            {'content': 'Grateful for batches of rows.', 'is_private': False},
+            {'content': 'short'},
+            {'content': 'Grateful for moods.', 'mood': 'ecstatic'},
+            {'content': 'Grateful for tags.', 'tags': 'bad!tag'},
+        ]
+        lines = [json.dumps(row) for row in rows] + ['{not json']
+        path = self.write_file('entries.jsonl', '\n'.join(lines))
+        rejects = os.path.join(self.tmpdir.name, 'rejects.jsonl')
+
+        out = StringIO()
+        call_command(
+            'import_entries', path, '--user', 'testuser',
+            '--batch-size', '1', '--rejects', rejects, stdout=out
+        )
+
+        self.assertIn('Imported 2 entries, rejected 4 rows', out.getvalue())
+        entry = GratitudeEntry.objects.get(title='Imported one')
+        self.assertEqual(entry.mood, 'excellent')
+        self.assertEqual(entry.created_at.year, 2024)
+        self.assertEqual(
+            sorted(entry.tag_objects.values_list('name', flat=True)),
+            ['family', 'work']
+        )
+        self.assertFalse(
+            GratitudeEntry.objects.get(title='').is_private
+        )
+
+        with open(rejects, encoding='utf-8') as handle:
+            rejected = [json.loads(line) for line in handle]
+        self.assertEqual(
+            [row['row_number'] for row in rejected], [3, 4, 5, 6]
+        )
+
+        # Derived per-user data is rebuilt after the bulk insert
+        stats = UserJournalStats.objects.get(user=self.user)
+        self.assertEqual(stats.total_entries, 2)
+        self.assertEqual(DailyActivity.objects.filter(user=self.user).count(), 2)
+
+    def test_import_csv_by_username(self):
+        """Test CSV rows are assigned using their username column"""
+        path = self.write_file(
+            'entries.csv',
+            'username,title,content,mood,is_private\n'
+            'testuser,From CSV,Grateful for spreadsheets.,good,no\n'
+            'nobody,Lost,Grateful for nothing much.,good,yes\n'
+        )
+
+        out = StringIO()
+        call_command('import_entries', path, stdout=out, stderr=StringIO())
+
+        self.assertIn('Imported 1 entries, rejected 1 rows', out.getvalue())
+        self.assertEqual(
+            GratitudeEntry.objects.get(title='From CSV').user, self.user
+        )
+
+    def test_import_rejects_impossible_dates(self):
+        """Test a well formatted but impossible date rejects only its row"""
+        rows = [
+            {'content': 'Grateful for leap years.',
+             'created_at': '2024-02-30T10:00:00'},
+            {'content': 'Grateful for calendars.',
+             'created_at': '2024-02-29T10:00:00'},
+        ]
+        path = self.write_file(
+            'entries.jsonl', '\n'.join(json.dumps(row) for row in rows)
+        )
+        rejects = os.path.join(self.tmpdir.name, 'rejects.jsonl')
+
+        out = StringIO()
+        call_command(
+            'import_entries', path, '--user', 'testuser',
+            '--rejects', rejects, stdout=out
+        )
+
+        self.assertIn('Imported 1 entries, rejected 1 rows', out.getvalue())
+        with open(rejects, encoding='utf-8') as handle:
+            rejected = [json.loads(line) for line in handle]
+        self.assertEqual(rejected[0]['row_number'], 1)
+        self.assertIn('2024-02-30T10:00:00', str(rejected[0]))
+
+    def test_dry_run_writes_nothing(self):
+        """Test --dry-run validates without inserting"""
+        path = self.write_file(
+            'entries.jsonl',
+            json.dumps({'content': 'Grateful for dry runs.'})
+        )
+        out = StringIO()
+        call_command(
+            'import_entries', path, '--user', 'testuser', '--dry-run',
+            stdout=out
+        )
+        self.assertIn('Validated 1 entries', out.getvalue())
+        self.assertFalse(GratitudeEntry.objects.exists())
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class ExportEntriesTestCase(TestCase):
+    """Test cases for the streaming journal export"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        for i in range(3):
+            GratitudeEntry.objects.create(
+                user=self.user,
+                title=f'Export {i}',
+                content=f'Grateful for backups, "number" {i}.',
+                tags='data, safety'
+            )
+        GratitudeEntry.objects.create(
+            user=other, title='Not mine', content='Someone else.'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def export(self, **params):
+        response = self.client.get(reverse('journal:export_entries'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_export_jsonl(self):
+        """Test JSON Lines export holds only the user's entries"""
+        response, body = self.export(format='jsonl')
+
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(
+            [row['title'] for row in rows], ['Export 0', 'Export 1', 'Export 2']
+        )
+        self.assertEqual(rows[0]['tags'], ['data', 'safety'])
+        self.assertIn('attachment', response['Content-Disposition'])
+
+    def test_export_csv(self):
+        """Test CSV export quotes content and keeps a header row"""
+        response, body = self.export(format='csv')
+
+        rows = list(csv.DictReader(body.decode().splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1]['content'], 'Grateful for backups, "number" 1.')
+
+    def test_export_markdown_gzip(self):
+        """Test gzip-compressed Markdown export"""
+        response, body = self.export(format='md', gzip='1')
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        text = gzip.decompress(body).decode()
+        self.assertIn('## Export 2', text)
+        self.assertNotIn('Not mine', text)
+
+    def test_export_unknown_format(self):
+        """Test an unknown export format returns 404"""
+        response = self.client.get(
+            reverse('journal:export_entries'), {'format': 'pdf'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_streams_under_asgi(self):
+        """Test ASGI serves the export from an async iterator"""
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            messages = asgi_get(
+                self.client, reverse('journal:export_entries'),
+                b'format=jsonl'
+            )
+        self.assertFalse([
+            warning for warning in caught
+            if 'synchronous iterators' in str(warning.message)
+        ])
+        self.assertEqual(messages[0]['status'], 200)
+        body = b''.join(
+            message.get('body', b'') for message in messages[1:]
+        )
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(
+            [row['title'] for row in rows], ['Export 0', 'Export 1', 'Export 2']
+        )
+
+
+class RunBenchmarksCommandTestCase(TestCase):
+    """Test cases for the run_benchmarks management command"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.output = os.path.join(self.tmpdir.name, 'results.json')
+
+    def run_benchmarks(self, *args):
+        out = StringIO()
+        call_command(
+            'run_benchmarks', '--entries', '30', '--iterations', '2',
+            '--output', self.output, *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_results_written_and_data_rolled_back(self):
+        """Test results cover every case and seeded rows are removed"""
+        self.run_benchmarks()
+
+        with open(self.output, encoding='utf-8') as handle:
+            results = json.load(handle)['results']
+        expected = {
+            'dashboard', 'entry_list', 'form_validation',
+            'get_tags_list', 'entry_list_template', 'entry_detail_template',
+        }
+        if 'jinja2' in get_template_engines():
+            expected |= {
+                'entry_list_template_jinja2', 'entry_detail_template_jinja2'
+            }
+        self.assertEqual(set(results), expected)
+        self.assertIn('p95_ms', results['dashboard'])
+        self.assertFalse(GratitudeEntry.objects.exists())
+
+    def test_baseline_regressions_reported(self):
+        """Test query count growth over the baseline fails the run"""
+        baseline = os.path.join(self.tmpdir.name, 'baseline.json')
+        with open(baseline, 'w', encoding='utf-8') as handle:
+            json.dump({'results': {'dashboard': {
+                'p50_ms': 1000.0, 'queries': 0
+            }}}, handle)
+
+        with self.assertRaises(CommandError):
+            self.run_benchmarks(
+                '--case', 'dashboard', '--baseline', baseline,
+                '--fail-on-regression'
+            )
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+@override_settings(
+    JOURNAL_RUM_FLUSH_SIZE=1000,
+    JOURNAL_RUM_FLUSH_INTERVAL=3600,
+)
+class QueryBudgetTestCase(SearchIndexMixin, TestCase):
+    """
+    Every route in journal/urls.py must issue a fixed number of queries
+
+    Each budget is asserted against journals of several sizes, so a view
+    whose query count grows with the number of entries fails here. Routes
+    are requested the way they do real work: as staff, with a bulk action
+    over as many entries as the journal holds and with a valid beacon.
+    """
+
+    DATASET_SIZES = [1, 10, 60]
+
+    # Route name -> (HTTP method, needs an entry id, query budget)
+    BUDGETS = {
+        'home': ('get', False, 2),
+        'register': ('get', False, 2),
+        'dashboard': ('get', False, 4),
+        'analytics': ('get', False, 10),
+        'profile': ('get', False, 2),
+        'change_password': ('get', False, 2),
+        'login': ('get', False, 2),
+        'logout': ('post', False, 4),
+        'entry_list': ('get', False, 5),
+        'search': ('get', False, 5),
+        'export_entries': ('get', False, 4),
+        'bulk_entries': ('post', False, 27),
+        'create_entry': ('get', False, 2),
+        'entry_detail': ('get', True, 3),
+        'edit_entry': ('get', True, 3),
+        'delete_entry': ('get', True, 3),
+        'fragment_cache_stats': ('get', False, 2),
+        'api_entries': ('get', False, 5),
+        'api_entry': ('get', True, 3),
+        'api_entry_changes': ('get', False, 5),
+        'service_worker': ('get', False, 0),
+        'rum_beacon': ('post', False, 0),
+        'performance_report': ('get', False, 3),
+    }
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        rum.buffer.flush()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123',
+            is_staff=True,
+        )
+
+    def seed(self, size):
+        GratitudeEntry.objects.filter(user=self.user).delete()
+        now = timezone.now()
+        GratitudeEntry.objects.bulk_create([
+            GratitudeEntry(
+                user=self.user,
+                title=f'Budget entry {i}',
+                content='I am grateful for predictable queries.',
+                mood=GratitudeEntry.MOOD_CHOICES[i % 5][0],
+                tags='budget, queries',
+                created_at=now - timedelta(days=i),
+            )
+            for i in range(size)
+        ])
+        rebuild_user_activity(self.user.id)
+        rebuild_user_stats(self.user)
+        return GratitudeEntry.objects.filter(user=self.user).first()
+
+    def seed_deletable(self, size):
+        """Add entries on the days after the journal's, returning ids"""
+        now = timezone.now()
+        entries = GratitudeEntry.objects.bulk_create([
+            GratitudeEntry(
+                user=self.user, content='Soon to be bulk deleted.',
+                created_at=now - timedelta(days=size + i),
+            )
+            for i in range(size)
+        ])
+        rebuild_user_activity(self.user.id)
+        rebuild_user_stats(self.user)
+        return [entry.id for entry in entries]
+
+    def request_data(self, name, size):
+        """Return the data a route is requested with"""
+        if name == 'search':
+            return {'q': 'grateful'}
+        if name == 'bulk_entries':
+            return {
+                'bulk_action': 'delete',
+                'entries': self.seed_deletable(size),
+            }
+        if name == 'rum_beacon':
+            return json.dumps({'path': '/entries/', 'metrics': {'lcp': 800}})
+        return {}
+
+    def request(self, name, method, entry, data):
+        url = reverse(f'journal:{name}', args=[entry.id] if entry else [])
+        if isinstance(data, str):
+            response = self.client.post(url, data, content_type='text/plain')
+        else:
+            response = getattr(self.client, method)(url, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def test_every_route_has_a_budget(self):
+        """Test new routes cannot be added without a query budget"""
+        names = {pattern.name for pattern in journal_urls.urlpatterns}
+        self.assertEqual(names, set(self.BUDGETS))
+
+    def test_query_counts_do_not_grow_with_data(self):
+        """Test each route stays within its budget at every dataset size"""
+        for size in self.DATASET_SIZES:
+            entry = self.seed(size)
+            for name, (method, needs_entry, budget) in self.BUDGETS.items():
+                self.client.force_login(self.user)
+                target = entry if needs_entry else None
+                # Warm per-user rows built on first use
+                self.request(
+                    name, method, target, self.request_data(name, size)
+                )
+                self.client.force_login(self.user)
+                data = self.request_data(name, size)
+                with self.subTest(route=name, entries=size):
+                    with self.assertNumQueries(budget):
+                        response = self.request(name, method, target, data)
+                    self.assertLess(response.status_code, 400)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class EntryCardCacheTestCase(TestCase):
+    """Test cases for cached entry list cards"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        get_fragment_cache().clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.entries = [
+            GratitudeEntry.objects.create(
+                user=self.user,
+                title=f'Cached {i}',
+                content='I am grateful for warm caches.',
+                mood='good'
+            )
+            for i in range(3)
+        ]
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_cards_hit_after_first_render(self):
+        """Test the second render is served entirely from the cache"""
+        self.client.get(reverse('journal:entry_list'))
+        self.assertEqual(get_cache_stats()['misses'], 3)
+
+        response = self.client.get(reverse('journal:entry_list'))
+        stats = get_cache_stats()
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertContains(response, 'Cached 2')
+
+    def test_edit_and_delete_invalidate_cards(self):
+        """Test writes drop the affected entry's cached card"""
+        self.client.get(reverse('journal:entry_list'))
+
+        entry = self.entries[0]
+        entry.title = 'Edited title'
+        entry.save()
+        self.entries[1].delete()
+
+        response = self.client.get(reverse('journal:entry_list'))
+        self.assertContains(response, 'Edited title')
+        self.assertNotContains(response, 'Cached 0')
+        self.assertNotContains(response, 'Cached 1')
+        stats = get_cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 4)
+
+    def test_stats_view_is_staff_only(self):
+        """Test the counters are exposed to staff only"""
+        url = reverse('journal:fragment_cache_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.json()['misses'], 0)
+
+
+@unittest.skipUnless(jinja2, 'Jinja2 is not installed')
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    TEMPLATES=settings.TEMPLATES + [settings.JINJA2_TEMPLATES],
+)
+class JinjaTemplateEngineTestCase(TestCase):
+    """Test the Jinja2 ports render the same pages as the Django templates"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        get_fragment_cache().clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        for i in range(12):
+            self.entry = GratitudeEntry.objects.create(
+                user=self.user,
+                title=f'Entry <{i}>',
+                content=f'Grateful for line one\nand line two & {i}.',
+                mood=['good', 'excellent', 'difficult'][i % 3],
+                tags='family, work, health, garden'
+            )
+        self.client.login(username='testuser', password='testpass123')
+
+    def render_with(self, engine, path, params=None):
+        with self.settings(JOURNAL_TEMPLATE_ENGINE=engine):
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        # CSRF tokens are masked differently on every render
+        html = re.sub(
+            r'name="csrfmiddlewaretoken" value="\w+"',
+            'name="csrfmiddlewaretoken"', response.content.decode()
+        )
+        return re.sub(r'\s+', ' ', html).strip()
+
+    def assertSameOutput(self, path, params=None):
+        django_html = self.render_with('django', path, params)
+        jinja_html = self.render_with('jinja2', path, params)
+        self.assertEqual(jinja_html, django_html)
+
+    def test_dashboard_matches(self):
+        """Test the dashboard renders identically with both engines"""
+        self.assertSameOutput(reverse('journal:dashboard'))
+
+    def test_entry_list_matches(self):
+        """Test filtered and paginated entry lists match"""
+        self.assertSameOutput(reverse('journal:entry_list'))
+        self.assertSameOutput(reverse('journal:entry_list'), {'mood': 'good'})
+
+    def test_entry_detail_matches(self):
+        """Test the entry detail page matches and escapes user content"""
+        url = reverse('journal:entry_detail', args=[self.entry.id])
+        self.assertSameOutput(url)
+        self.assertIn('Entry &lt;11&gt;', self.render_with('jinja2', url))
+
+    def test_jinja2_engine_used_when_selected(self):
+        """Test the setting switches the engine behind the hot templates"""
+        url = reverse('journal:dashboard')
+        with self.settings(JOURNAL_TEMPLATE_ENGINE='jinja2'):
+            response = self.client.get(url)
+        # The test runner only records Django engine renders
+        self.assertTemplateNotUsed(response, 'journal/dashboard.html')
+        self.assertContains(response, 'Welcome back')
+
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'journal/dashboard.html')
+
+
+class EntryAPITestCase(TestCase):
+    """Test cases for the versioned JSON entries API"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        self.entry = GratitudeEntry.objects.create(
+            user=self.user,
+            title='API entry',
+            content='I am grateful for clean interfaces.',
+            mood='good',
+            tags='api, work'
+        )
+        GratitudeEntry.objects.create(
+            user=self.other,
+            title='Hidden entry',
+            content='I am grateful for privacy.',
+        )
+        self.list_url = reverse('journal:api_entries')
+        self.detail_url = reverse('journal:api_entry', args=[self.entry.id])
+        self.client.login(username='testuser', password='testpass123')
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type='application/json'
+        )
+
+    def test_anonymous_requests_rejected(self):
+        """Test the API answers 401 instead of redirecting to login"""
+        self.client.logout()
+        self.assertEqual(self.client.get(self.list_url).status_code, 401)
+
+    def test_list_selected_fields(self):
+        """Test only the user's entries and requested fields are returned"""
+        response = self.client.get(self.list_url, {'fields': 'id,title,mood'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'], [
+            {'id': self.entry.id, 'title': 'API entry', 'mood': 'good'}
+        ])
+        self.assertNotIn(b': ', response.content)
+
+        response = self.client.get(self.list_url, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_not_modified(self):
+        """Test a matching ETag gives 304 until the entry changes"""
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.json()['tags'], ['api', 'work'])
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.entry.title = 'Changed title'
+        self.entry.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_not_modified_until_write(self):
+        """Test the list ETag changes when an entry is added"""
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.send('post', self.list_url, {
+            'content': 'I am grateful for new entries.', 'mood': 'excellent'
+        })
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_list_not_stale_by_date_after_delete(self):
+        """Test If-Modified-Since cannot keep a list from before a delete"""
+        response = self.client.get(self.list_url)
+        self.assertNotIn('Last-Modified', response)
+
+        other = GratitudeEntry.objects.create(
+            user=self.user, content='Grateful for a second entry.'
+        )
+        since = http_date(other.updated_at.timestamp() + 60)
+        other.delete()
+        response = self.client.get(
+            self.list_url, HTTP_IF_MODIFIED_SINCE=since
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_create_validates_with_entry_form(self):
+        """Test creation uses GratitudeEntryForm and updates counters"""
+        response = self.send('post', self.list_url, {'content': 'short'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('content', response.json()['errors'])
+
+        response = self.send('post', self.list_url, {
+            'title': 'Created by API',
+            'content': 'I am grateful for JSON clients.',
+            'mood': 'excellent',
+            'tags': ['mobile', 'sync'],
+        })
+        self.assertEqual(response.status_code, 201)
+        entry = GratitudeEntry.objects.get(title='Created by API')
+        self.assertTrue(entry.is_private)
+        self.assertEqual(entry.get_tags_list(), ['mobile', 'sync'])
+        self.assertEqual(response['Location'],
+                         reverse('journal:api_entry', args=[entry.id]))
+        self.assertEqual(get_user_stats(self.user)[0], 2)
+
+    def test_patch_and_if_match(self):
+        """Test partial updates and stale ETags are rejected"""
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.send('patch', self.detail_url, {'mood': 'excellent'})
+        self.assertEqual(response.status_code, 200)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.mood, 'excellent')
+        self.assertEqual(self.entry.title, 'API entry')
+
+        response = self.client.put(
+            self.detail_url,
+            json.dumps({'content': 'I am grateful for replacements.'}),
+            content_type='application/json',
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 412)
+
+    def test_delete_and_other_users(self):
+        """Test deleting an entry and hiding other users' entries"""
+        hidden = GratitudeEntry.objects.get(user=self.other)
+        url = reverse('journal:api_entry', args=[hidden.id])
+        self.assertEqual(self.client.delete(url).status_code, 404)
+
+        self.assertEqual(self.client.delete(self.detail_url).status_code, 204)
+        self.assertFalse(GratitudeEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(get_user_stats(self.user)[0], 0)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class ConditionalPageTestCase(TestCase):
+    """Test cases for ETag / Last-Modified on the entry pages"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.entry = GratitudeEntry.objects.create(
+            user=self.user,
+            title='Conditional entry',
+            content='I am grateful for cheap revalidation.',
+            mood='good'
+        )
+        self.list_url = reverse('journal:entry_list')
+        self.detail_url = reverse('journal:entry_detail', args=[self.entry.id])
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_unchanged_pages_not_modified(self):
+        """Test a repeat visit gets 304 without rendering a template"""
+        for url in (self.list_url, self.detail_url):
+            response = self.client.get(url)
+            self.assertIn('no-cache', response['Cache-Control'])
+            self.assertEqual(
+                'Last-Modified' in response, url == self.detail_url
+            )
+
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.templates, [])
+
+    def test_writes_change_the_etags(self):
+        """Test edits, new entries and deletes invalidate the pages"""
+        list_etag = self.client.get(self.list_url)['ETag']
+        detail_etag = self.client.get(self.detail_url)['ETag']
+
+        self.entry.title = 'Edited'
+        self.entry.save()
+        response = self.client.get(
+            self.detail_url, HTTP_IF_NONE_MATCH=detail_etag
+        )
+        self.assertContains(response, 'Edited')
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+
+        list_etag = response['ETag']
+        self.client.post(
+            reverse('journal:delete_entry', args=[self.entry.id])
+        )
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_not_stale_by_date_after_delete(self):
+        """Test If-Modified-Since cannot keep a list from before a delete"""
+        other = GratitudeEntry.objects.create(
+            user=self.user, content='Grateful for a second entry.'
+        )
+        since = http_date(other.updated_at.timestamp() + 60)
+        other.delete()
+        response = self.client.get(
+            self.list_url, HTTP_IF_MODIFIED_SINCE=since
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'second entry')
+
+    def test_pending_messages_always_rendered(self):
+        """Test flash messages are never hidden behind a 304"""
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.post(self.detail_url + 'edit/', {
+            'title': 'Conditional entry',
+            'content': 'I am grateful for cheap revalidation.',
+            'mood': 'good',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        self.entry.refresh_from_db()
+        response = self.client.get(
+            self.detail_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(response, 'updated successfully')
+        self.assertNotIn('ETag', response)
+
+    def test_csrf_secret_part_of_etag(self):
+        """Test a new CSRF secret invalidates pages rendered with the old"""
+        etag = self.client.get(self.list_url)['ETag']
+        self.client.cookies['csrftoken'] = 'a' * 32
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    SESSION_CACHE_ALIAS='auth',
+    AUTHENTICATION_BACKENDS=['journal.auth.CachedModelBackend'],
+)
+class CachedAuthTestCase(TestCase):
+    """Test cases for cached sessions and user resolution"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        caches['auth'].clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return [
+            query['sql'] for query in context.captured_queries
+            if 'django_session' in query['sql'] or 'auth_user' in query['sql']
+        ]
+
+    def test_warm_requests_skip_session_and_user_queries(self):
+        """Test a warm page view reads neither sessions nor users"""
+        url = reverse('journal:dashboard')
+        self.client.get(url)
+        self.assertEqual(self.auth_queries(url), [])
+
+    def test_password_change_invalidates_cached_user(self):
+        """Test other sessions are logged out after a password change"""
+        other = Client()
+        other.login(username='testuser', password='testpass123')
+        url = reverse('journal:dashboard')
+        self.assertEqual(other.get(url).status_code, 200)
+
+        response = self.client.post(reverse('journal:change_password'), {
+            'old_password': 'testpass123',
+            'new_password1': 'N3w-secret-pass',
+            'new_password2': 'N3w-secret-pass',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(other.get(url).status_code, 302)
+
+    def test_logout_drops_cached_user(self):
+        """Test logging out removes the cached user"""
+        self.client.get(reverse('journal:dashboard'))
+        key = user_cache_key(self.user.pk)
+        self.assertIsNotNone(caches['auth'].get(key))
+
+        self.client.post(reverse('journal:logout'))
+        self.assertIsNone(caches['auth'].get(key))
+        response = self.client.get(reverse('journal:dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_cached_auth_needs_a_shared_cache(self):
+        """Test cached auth is refused on a per-process cache"""
+        path = os.path.join(
+            settings.BASE_DIR, 'gratitude_journal', 'settings.py'
+        )
+        with unittest.mock.patch.dict(os.environ, {'CACHED_AUTH': 'True'}):
+            os.environ.pop('AUTH_CACHE_BACKEND', None)
+            with self.assertRaises(ImproperlyConfigured):
+                runpy.run_path(path)
+
+            os.environ['AUTH_CACHE_BACKEND'] = 'file'
+            config = runpy.run_path(path)
+        self.assertEqual(config['SESSION_CACHE_ALIAS'], 'auth')
+        self.assertEqual(
+            config['CACHES']['auth']['BACKEND'],
+            'django.core.cache.backends.filebased.FileBasedCache'
+        )
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    JOURNAL_RUM_FLUSH_SIZE=1000,
+    JOURNAL_RUM_FLUSH_INTERVAL=3600,
+)
+class RealUserMetricsTestCase(TestCase):
+    """Test cases for performance beacons and their rollups"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        rum.buffer.flush()
+        PerformanceBucket.objects.all().delete()
+        self.url = reverse('journal:rum_beacon')
+
+    def beacon(self, payload):
+        return self.client.post(
+            self.url, json.dumps(payload), content_type='text/plain'
+        )
+
+    def test_beacons_buffered_then_flushed_in_bulk(self):
+        """Test beacons stay in memory until one bulk flush"""
+        with self.assertNumQueries(0):
+            for value in range(1, 101):
+                response = self.beacon([
+                    {'path': '/entries/', 'metrics': {'lcp': value * 10}},
+                ])
+                self.assertEqual(response.status_code, 204)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(rum.buffer.flush(), 100)
+
+        rollup, = rum.get_rollups()
+        self.assertEqual(rollup['route'], 'journal:entry_list')
+        self.assertEqual(rollup['samples'], 100)
+        # Bins are at most 10% above the exact percentiles
+        for key, exact in (('p50', 500), ('p95', 950), ('p99', 990)):
+            self.assertGreaterEqual(rollup[key], exact)
+            self.assertLessEqual(rollup[key], exact * 1.1)
+
+    def test_invalid_samples_dropped(self):
+        """Test unknown paths, metrics and bad values are ignored"""
+        self.beacon([
+            {'path': '/not-a-page/', 'metrics': {'lcp': 100}},
+            {'path': '/dashboard/', 'metrics': {
+                'lcp': -5, 'ttfb': 10, 'fid': 'fast', 'dns': 3,
+            }},
+            'garbage',
+        ])
+        self.assertEqual(rum.buffer.flush(), 1)
+        self.assertEqual(self.client.post(
+            self.url, 'not json', content_type='text/plain'
+        ).status_code, 400)
+
+    def test_flush_when_buffer_full(self):
+        """Test a full buffer is written without waiting for the interval"""
+        with self.settings(JOURNAL_RUM_FLUSH_SIZE=2):
+            self.beacon({'path': '/', 'metrics': {'page_load': 800}})
+            self.assertFalse(PerformanceBucket.objects.exists())
+            self.beacon({'path': '/', 'metrics': {'page_load': 900}})
+        self.assertEqual(
+            PerformanceBucket.objects.aggregate(total=Sum('count'))['total'],
+            2
+        )
+
+    def test_worker_exit_flushes_buffer(self):
+        """Test the gunicorn worker_exit hook writes the buffered samples"""
+        config = runpy.run_path(
+            os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        )
+        self.beacon({'path': '/', 'metrics': {'page_load': 800}})
+        self.assertFalse(PerformanceBucket.objects.exists())
+
+        worker = SimpleNamespace(log=logging.getLogger('gunicorn.error'))
+        with self.assertLogs('gunicorn.error', 'INFO') as logs:
+            config['worker_exit'](None, worker)
+        self.assertEqual(logs.output, [
+            'INFO:gunicorn.error:Flushed 1 RUM samples at exit'
+        ])
+        self.assertEqual(PerformanceBucket.objects.get().count, 1)
+
+    def test_report_is_staff_only(self):
+        """Test the rollup page is shown to staff only"""
+        user = User.objects.create_user(username='staff', password='pass')
+        self.client.force_login(user)
+        report = reverse('journal:performance_report')
+        self.assertEqual(self.client.get(report).status_code, 302)
+
+        user.is_staff = True
+        user.save()
+        self.beacon({'path': '/dashboard/', 'metrics': {'lcp': 1200}})
+        response = self.client.get(report)
+        self.assertContains(response, 'journal:dashboard')
+        self.assertEqual(len(response.context['rollups']), 1)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class ServerTimingTestCase(TestCase):
+    """Test cases for the Server-Timing middleware"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+
+    def timings(self, response):
+        timings = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            timings[name] = dict(param.split('=', 1) for param in params)
+        return timings
+
+    def test_header_reports_queries_and_template_time(self):
+        """Test the header counts the queries and times the render"""
+        url = reverse('journal:dashboard')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'tpl', 'view', 'total'})
+        self.assertEqual(
+            timings['db']['desc'], f'"{len(context.captured_queries)} queries"'
+        )
+        self.assertGreater(float(timings['tpl']['dur']), 0)
+        self.assertGreaterEqual(
+            float(timings['total']['dur']), float(timings['view']['dur'])
+        )
+
+    def test_only_journal_views_timed(self):
+        """Test responses outside the journal app get no header"""
+        response = self.client.get('/admin/login/')
+        self.assertNotIn('Server-Timing', response)
+
+        response = self.client.get(reverse('journal:api_entries'))
+        self.assertEqual(self.timings(response)['tpl']['dur'], '0.0')
+
+    def test_queries_counted_under_asgi(self):
+        """Test queries run in sync_to_async threads are counted"""
+        messages = asgi_get(self.client, reverse('journal:dashboard'))
+        start = messages[0]
+        self.assertEqual(start['status'], 200)
+        header = dict(start['headers'])[b'Server-Timing'].decode()
+        timing = dict(
+            metric.split(';', 1) for metric in header.split(', ')
+        )
+        queries = int(re.search(r'(\d+) queries', timing['db']).group(1))
+        self.assertGreater(queries, 0)
+
+    @override_settings(JOURNAL_TIMING_LOG=True)
+    def test_structured_log_line(self):
+        """Test one JSON line is logged per request when enabled"""
+        with self.assertLogs('journal.timing', 'INFO') as logs:
+            self.client.get(reverse('journal:entry_list'))
+        line, = logs.records
+        data = json.loads(line.getMessage())
+        self.assertEqual(data['route'], 'journal:entry_list')
+        self.assertEqual(data['status'], 200)
+        self.assertIn('db_ms', data)
+
+
+class AsyncViewsTestCase(TestCase):
+    """Test cases for the async views served over ASGI"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.entry = GratitudeEntry.objects.create(
+            user=self.user,
+            title='Async entry',
+            content='Grateful for a free event loop',
+            mood='good'
+        )
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.user)
+
+    async def test_async_views_render(self):
+        """Test the async views render their pages under ASGI"""
+        response = await self.async_client.get(reverse('journal:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_entries'], 1)
+        self.assertContains(response, 'Grateful for a free event loop')
+
+        response = await self.async_client.get(reverse('journal:entry_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Async entry')
+        self.assertIn('ETag', response)
+
+        response = await self.async_client.get(
+            reverse('journal:entry_detail', args=[self.entry.id])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Grateful for a free event loop')
+        self.assertIn('Server-Timing', response)
+
+    async def test_async_conditional_get(self):
+        """Test an unchanged entry is answered with 304"""
+        url = reverse('journal:entry_detail', args=[self.entry.id])
+        response = await self.async_client.get(url)
+        response = await self.async_client.get(
+            url, headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_async_views_require_login(self):
+        """Test anonymous users are redirected to log in"""
+        url = reverse('journal:entry_list')
+        response = await AsyncClient().get(url)
+        self.assertRedirects(
+            response, f"{reverse('journal:login')}?next={url}",
+            fetch_redirect_response=False
+        )
+
+    async def test_missing_entry_404(self):
+        """Test another user's or a missing entry gives 404"""
+        response = await self.async_client.get(
+            reverse('journal:entry_detail', args=[self.entry.id + 1])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(WHITENOISE_AUTOREFRESH=True)
+    async def test_static_files_streamed_asynchronously(self):
+        """Test static files are read with an async iterator"""
+        async def get_response(request):
+            return None
+
+        middleware = AsyncWhiteNoiseMiddleware(get_response)
+        request = RequestFactory().get('/static/journal/js/performance-monitor.js')
+        response = await middleware(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response])
+        self.assertIn(b'PerformanceMonitor', content)
+
+
+class DeltaSyncTestCase(TestCase):
+    """Test cases for the delta-sync endpoint behind the offline replica"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        self.entries = [
+            GratitudeEntry.objects.create(
+                user=self.user,
+                title=f'Synced entry {i}',
+                content='I am grateful for working offline.',
+            )
+            for i in range(3)
+        ]
+        GratitudeEntry.objects.create(
+            user=self.other, content='Not in my replica.'
+        )
+        self.url = reverse('journal:api_entry_changes')
+        self.client.login(username='testuser', password='testpass123')
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['since'] = cursor
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def settle(self):
+        """Age every change past the sync overlap window"""
+        past = timezone.now() - sync.SYNC_OVERLAP * 2
+        GratitudeEntry.objects.update(updated_at=past)
+        EntryTombstone.objects.update(deleted_at=past)
+
+    def test_first_sync_is_a_full_copy(self):
+        """Test a sync without a cursor resets and pages the whole journal"""
+        data = self.sync(limit=2)
+        self.assertTrue(data['reset'])
+        self.assertTrue(data['has_more'])
+        self.assertEqual(data['user'], self.user.pk)
+        ids = [entry['id'] for entry in data['entries']]
+
+        data = self.sync(data['cursor'], limit=2)
+        self.assertFalse(data['reset'])
+        self.assertFalse(data['has_more'])
+        ids += [entry['id'] for entry in data['entries']]
+        self.assertEqual(ids, [entry.id for entry in self.entries])
+
+    def test_only_changes_since_cursor_returned(self):
+        """Test updates and deletions after the cursor are all that is sent"""
+        self.settle()
+        cursor = self.sync()['cursor']
+        data = self.sync(cursor)
+        self.assertEqual((data['entries'], data['deleted']), ([], []))
+
+        edited, deleted = self.entries[0], self.entries[1]
+        deleted_id = deleted.id
+        edited.title = 'Edited offline'
+        edited.save()
+        deleted.delete()
+
+        data = self.sync(data['cursor'])
+        self.assertEqual(
+            [entry['title'] for entry in data['entries']], ['Edited offline']
+        )
+        self.assertEqual(data['deleted'], [deleted_id])
+
+    def test_recent_changes_resent_until_settled(self):
+        """Test changes inside the overlap window are sent again"""
+        cursor = self.sync()['cursor']
+        data = self.sync(cursor)
+        self.assertEqual(len(data['entries']), 3)
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        """Test tombstones are only kept for users who still exist"""
+        self.user.delete()
+        self.assertFalse(EntryTombstone.objects.exists())
+
+    def test_stale_cursor_resets(self):
+        """Test a cursor older than the kept tombstones forces a full copy"""
+        cursor = self.sync()['cursor']
+        EntryTombstone.objects.create(
+            user=self.user, entry_id=999,
+            deleted_at=timezone.now() - timedelta(days=31)
+        )
+        with override_settings(JOURNAL_SYNC_TOMBSTONE_DAYS=0):
+            self.assertTrue(self.sync(cursor)['reset'])
+        self.assertTrue(self.sync('not-a-cursor')['reset'])
+
+        out = StringIO()
+        call_command('prune_sync_tombstones', stdout=out)
+        self.assertIn('Deleted 1 tombstones', out.getvalue())
+
+    def test_requires_login(self):
+        """Test anonymous clients get 401 so the replica is cleared"""
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_service_worker_served_from_root(self):
+        """Test sw.js is served at the root so it can control all pages"""
+        response = self.client.get(reverse('journal:service_worker'))
+        self.assertEqual(reverse('journal:service_worker'), '/sw.js')
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+        self.assertIn(b'SYNC_URL', response.content)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+
+class BulkActionsTestCase(SearchIndexMixin, TestCase):
+    """Test cases for the set-based bulk actions of the entry list"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='testpass123'
+        )
+        now = timezone.now()
+        self.entries = []
+        for i in range(4):
+            entry = GratitudeEntry.objects.create(
+                user=self.user,
+                content='I am grateful for tidy journals.',
+                mood=['good', 'excellent'][i % 2],
+                tags='home, work',
+                is_private=i < 2,
+                created_at=now - timedelta(days=i),
+            )
+            entry.set_tags(['home', 'work'])
+            self.entries.append(entry)
+        self.foreign = GratitudeEntry.objects.create(
+            user=self.other, content='Not yours to change.', tags='home'
+        )
+        self.foreign.set_tags(['home'])
+        rebuild_user_stats(self.user)
+        rebuild_user_activity(self.user.id)
+        self.url = reverse('journal:bulk_entries')
+        self.client.login(username='testuser', password='testpass123')
+
+    def post(self, action, entries, **data):
+        return self.client.post(self.url, {
+            'bulk_action': action,
+            'entries': [entry.id for entry in entries],
+            **data,
+        })
+
+    def assert_counters_accurate(self):
+        stored = UserJournalStats.objects.get(user=self.user)
+        fresh = rebuild_user_stats(self.user)
+        for field in ['total_entries', 'good_count', 'excellent_count',
+                      'private_count', 'public_count', 'first_entry_at',
+                      'last_entry_at']:
+            self.assertEqual(getattr(stored, field), getattr(fresh, field))
+
+    def entry_statements(self, queries, verb):
+        return [
+            query['sql'] for query in queries
+            if query['sql'].startswith(verb)
+            and '"journal_gratitudeentry"' in query['sql'].split('WHERE')[0]
+        ]
+
+    def test_bulk_delete_queries_flat(self):
+        """Test deleting more days' entries costs no more queries"""
+        def delete_queries(count, base):
+            # A run of days, every other one emptied by the delete
+            entries = [
+                GratitudeEntry.objects.create(
+                    user=self.user, content='One more day.',
+                    created_at=timezone.now() - timedelta(days=base + day),
+                )
+                for day in range(count * 2)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                self.post('delete', entries[::2])
+            activity = list(DailyActivity.objects.filter(
+                user=self.user
+            ).order_by('date').values_list('date', 'entry_count', 'streak'))
+            rebuild_user_activity(self.user.id)
+            self.assertEqual(activity, list(DailyActivity.objects.filter(
+                user=self.user
+            ).order_by('date').values_list('date', 'entry_count', 'streak')))
+            return len(context)
+
+        self.assertEqual(delete_queries(2, 10), delete_queries(40, 100))
+
+    def test_bulk_delete(self):
+        """Test one DELETE removes the selection and keeps side tables"""
+        deleted = self.entries[:3]
+        deleted_ids = [entry.id for entry in deleted]
+        with CaptureQueriesContext(connection) as context:
+            response = self.post('delete', deleted + [self.foreign])
+
+        self.assertRedirects(response, reverse('journal:entry_list'),
+                             fetch_redirect_response=False)
+        statements = self.entry_statements(context.captured_queries, 'DELETE')
+        self.assertEqual(len(statements), 1)
+        self.assertIn('"user_id" =', statements[0])
+
+        self.assertEqual(
+            list(GratitudeEntry.objects.filter(user=self.user)),
+            [self.entries[3]]
+        )
+        self.assertTrue(GratitudeEntry.objects.filter(
+            id=self.foreign.id
+        ).exists())
+        self.assertFalse(EntryTag.objects.filter(entry_id__in=deleted_ids))
+        self.assertEqual(
+            sorted(EntryTombstone.objects.filter(
+                user=self.user
+            ).values_list('entry_id', flat=True)),
+            sorted(deleted_ids)
+        )
+        self.assert_counters_accurate()
+        self.assertEqual(
+            list(DailyActivity.objects.filter(
+                user=self.user
+            ).values_list('entry_count', 'streak')),
+            [(1, 1)]
+        )
+        messages = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(messages, ['Deleted 3 entries.'])
+
+    def test_bulk_privacy(self):
+        """Test one UPDATE flips privacy and moves the counters"""
+        before = self.entries[0].updated_at
+        with CaptureQueriesContext(connection) as context:
+            self.post('make_public', self.entries + [self.foreign])
+
+        statements = self.entry_statements(context.captured_queries, 'UPDATE')
+        self.assertEqual(len(statements), 1)
+        self.assertFalse(GratitudeEntry.objects.filter(
+            user=self.user, is_private=True
+        ).exists())
+        self.foreign.refresh_from_db()
+        self.assertTrue(self.foreign.is_private)
+        self.entries[0].refresh_from_db()
+        self.assertGreater(self.entries[0].updated_at, before)
+        self.assert_counters_accurate()
+
+    def test_bulk_add_and_remove_tag(self):
+        """Test tags are added and removed in both tag representations"""
+        self.post('add_tag', self.entries[:2] + [self.foreign], tag='family')
+        tagged = GratitudeEntry.objects.filter(tag_objects__name='family')
+        self.assertEqual(
+            sorted(tagged.values_list('id', flat=True)),
+            [self.entries[0].id, self.entries[1].id]
+        )
+        self.entries[0].refresh_from_db()
+        self.assertEqual(self.entries[0].tags, 'home, work, family')
+
+        self.post('remove_tag', self.entries + [self.foreign], tag='home')
+        for entry in self.entries:
+            entry.refresh_from_db()
+            self.assertNotIn('home', entry.get_tags_list())
+        self.assertEqual(self.entries[0].tags, 'work, family')
+        self.assertEqual(
+            list(self.foreign.tag_objects.values_list('name', flat=True)),
+            ['home']
+        )
+        # The full-text index follows the set-based update
+        self.assertEqual(search_entries(self.user, 'home')[0], [])
+        self.assertEqual(len(search_entries(self.user, 'family')[0]), 2)
+
+    def test_invalid_requests(self):
+        """Test bad actions, selections and tags are reported"""
+        cases = [
+            ('', self.entries, {}, 'Choose an action to apply.'),
+            ('delete', [], {}, 'Select at least one entry.'),
+            ('add_tag', self.entries, {'tag': 'a, b'}, 'Enter a single tag.'),
+        ]
+        for action, entries, data, message in cases:
+            with self.subTest(action=action):
+                response = self.post(action, entries, **data)
+                # Earlier messages are still queued as no page showed them
+                self.assertEqual(
+                    str(list(get_messages(response.wsgi_request))[-1]),
+                    message
+                )
+        self.assertEqual(
+            GratitudeEntry.objects.filter(user=self.user).count(), 4
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 405)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class EntryAdminTestCase(TestCase):
+    """Test cases for the GratitudeEntry admin changelist"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='adminpass'
+        )
+        self.users = [
+            User.objects.create_user(username=f'writer{i}', password='pass')
+            for i in range(3)
+        ]
+        days = [
+            timezone.datetime(2023, 12, 31, 23, 30),
+            timezone.datetime(2024, 1, 15, 8),
+            timezone.datetime(2024, 1, 15, 20),
+            timezone.datetime(2024, 3, 2, 12),
+        ]
+        for i, day in enumerate(days):
+            GratitudeEntry.objects.create(
+                user=self.users[i % 3],
+                content='I am grateful for fast admin pages.',
+                created_at=timezone.make_aware(day),
+            )
+        self.url = reverse('admin:journal_gratitudeentry_changelist')
+        self.client.force_login(self.admin)
+
+    def test_drill_down_matches_distinct_dates(self):
+        """Test index seeks find the same periods as SELECT DISTINCT"""
+        entries = GratitudeEntry.objects.all()
+        seeks = DrillDownQuerySet(GratitudeEntry)
+        for kind in ['year', 'month', 'day']:
+            with self.subTest(kind=kind):
+                self.assertEqual(
+                    seeks.datetimes('created_at', kind),
+                    list(entries.datetimes('created_at', kind))
+                )
+        self.assertEqual(
+            seeks.filter(user=self.users[1]).datetimes(
+                'created_at', 'day', order='DESC'
+            ),
+            list(entries.filter(user=self.users[1]).datetimes(
+                'created_at', 'day', order='DESC'
+            ))
+        )
+
+    def test_changelist_drill_down(self):
+        """Test the changelist renders every level of the date hierarchy"""
+        for params, link in [
+            ({}, 'created_at__year=2024'),
+            ({'created_at__year': 2024}, 'created_at__month=3'),
+            ({'created_at__year': 2024, 'created_at__month': 1},
+             'created_at__day=15'),
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, link)
+
+    def test_user_filter_is_autocomplete(self):
+        """Test the user filter loads only the selected user"""
+        response = self.client.get(self.url)
+        self.assertContains(response, 'data-filter-parameter')
+        self.assertContains(response, 'admin/js/autocomplete.js')
+        self.assertNotContains(response, 'writer2</a>')
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'journal', 'model_name': 'gratitudeentry',
+            'field_name': 'user', 'term': 'writer2',
+        })
+        self.assertEqual(
+            [result['text'] for result in response.json()['results']],
+            ['writer2']
+        )
+
+        user = self.users[0]
+        response = self.client.get(self.url, {'user__id__exact': user.id})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertContains(
+            response, f'<option value="{user.id}" selected>writer0</option>',
+            html=True
+        )
+
+    def test_no_full_count(self):
+        """Test the changelist runs a single COUNT query"""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url, {'mood': 'good'})
+        counts = [
+            query['sql'] for query in context.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(len(counts), 1)
+
+    @unittest.skipUnless(
+        connection.vendor == 'postgresql', 'Planner estimates need Postgres'
+    )
+    def test_planner_estimate(self):
+        """Test the planner returns a row estimate for a queryset"""
+        self.assertGreaterEqual(planner_estimate(GratitudeEntry.objects.all()), 0)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    JOURNAL_READ_REPLICAS=['replica_1'],
+)
+class ReadReplicaTestCase(TestCase):
+    """Test cases for read-replica routing and primary pinning"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123'
+        )
+        self.client.force_login(self.user)
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def routed_request(self, view):
+        """Return the alias entries are read from inside a decorated view"""
+        request = self.factory.get('/')
+        request.session = self.client.session
+        return view(request).content.decode()
+
+    def read_alias(self, request):
+        return HttpResponse(
+            self.router.db_for_read(GratitudeEntry) or 'default'
+        )
+
+    def test_router(self):
+        """Test only journal reads in replica views go to a replica"""
+        self.assertIsNone(self.router.db_for_read(GratitudeEntry))
+        token = reading_from_replica.set('replica_1')
+        try:
+            self.assertEqual(
+                self.router.db_for_read(GratitudeEntry), 'replica_1'
+            )
+            self.assertIsNone(self.router.db_for_read(User))
+            self.assertEqual(
+                self.router.db_for_write(GratitudeEntry), 'default'
+            )
+        finally:
+            reading_from_replica.reset(token)
+        self.assertFalse(self.router.allow_migrate('replica_1', 'journal'))
+        self.assertIsNone(self.router.allow_migrate('default', 'journal'))
+
+    def test_pinned_session_reads_primary(self):
+        """Test a session that has just written reads from the primary"""
+        view = replica_reads(self.read_alias)
+        self.assertEqual(self.routed_request(view), 'replica_1')
+
+        request = self.factory.post('/')
+        request.session = self.client.session
+        pin_to_primary(request)
+        request.session.save()
+        self.assertEqual(self.routed_request(view), 'default')
+
+        with override_settings(JOURNAL_REPLICA_PIN_SECONDS=-1):
+            pin_to_primary(request)
+            request.session.save()
+        self.assertEqual(self.routed_request(view), 'replica_1')
+
+    @override_settings(JOURNAL_READ_REPLICAS=['replica_1', 'replica_2'])
+    def test_request_reads_one_replica(self):
+        """Test every read in a request goes to the same replica"""
+        def view(request):
+            return HttpResponse(' '.join(
+                self.router.db_for_read(GratitudeEntry) for _ in range(20)
+            ))
+
+        view = replica_reads(view)
+        seen = set()
+        for _ in range(20):
+            aliases = set(self.routed_request(view).split())
+            self.assertEqual(len(aliases), 1)
+            seen |= aliases
+        self.assertLessEqual(seen, {'replica_1', 'replica_2'})
+
+    def test_async_view(self):
+        """Test async views are routed the same way"""
+        async def view(request):
+            return self.read_alias(request)
+
+        view = async_to_sync(replica_reads(view))
+        self.assertEqual(self.routed_request(view), 'replica_1')
+
+    def test_writes_pin_session(self):
+        """Test saving, editing and deleting entries pins the session"""
+        self.client.post(reverse('journal:create_entry'), {
+            'title': 'Pinned',
+            'content': 'Grateful to read my own writes',
+            'mood': 'good',
+        })
+        self.assertIn(PIN_SESSION_KEY, self.client.session)
+        entry = GratitudeEntry.objects.get(title='Pinned')
+
+        for url, data in (
+            (reverse('journal:edit_entry', args=[entry.id]), {
+                'title': 'Pinned',
+                'content': 'Still grateful to read my own writes',
+                'mood': 'good',
+            }),
+            (reverse('journal:delete_entry', args=[entry.id]), {}),
+        ):
+            session = self.client.session
+            del session[PIN_SESSION_KEY]
+            session.save()
+            self.client.post(url, data)
+            self.assertIn(PIN_SESSION_KEY, self.client.session)
+
+    def test_reads_do_not_pin_session(self):
+        """Test read-only pages leave the session unpinned"""
+        with override_settings(JOURNAL_READ_REPLICAS=['default']):
+            for name in ('journal:dashboard', 'journal:entry_list',
+                         'journal:analytics'):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+        self.assertNotIn(PIN_SESSION_KEY, self.client.session)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    JOURNAL_SHARDS=['default', 'shard_1'],
+)
+class ShardingTestCase(TestCase):
+    """Test cases for user-sharded journal storage"""
+
+    databases = {'default', 'shard_1'}
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        seed_id_sequences(connections['shard_1'], 1)
+        self.user = User.objects.create_user(
+            username='sharded', password='testpass123'
+        )
+        assign_shard(self.user.pk, 'shard_1')
+        self.client.force_login(self.user)
+
+    def create_entry(self, title):
+        self.client.post(reverse('journal:create_entry'), {
+            'title': title,
+            'content': 'Thankful for quiet mornings and good coffee.',
+            'mood': 'good',
+            'tags': 'family, work',
+        })
+        return GratitudeEntry.objects.for_user(self.user).get(title=title)
+
+    def test_entries_stored_on_user_shard(self):
+        """Test a user's entries, tags and counters live on their shard"""
+        entry = self.create_entry('Sharded entry')
+        self.assertEqual(entry._state.db, 'shard_1')
+        self.assertGreater(entry.id, SHARD_ID_SPACE)
+        self.assertFalse(GratitudeEntry.objects.using('default').exists())
+        self.assertEqual(
+            sorted(entry.tag_objects.values_list('name', flat=True)),
+            ['family', 'work']
+        )
+        self.assertEqual(
+            UserJournalStats.objects.using('shard_1').get(
+                user=self.user
+            ).total_entries, 1
+        )
+
+        for url in (
+            reverse('journal:dashboard'),
+            reverse('journal:entry_list'),
+            reverse('journal:entry_detail', args=[entry.id]),
+            reverse('journal:analytics'),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'family')
+
+        response = self.client.post(
+            reverse('journal:delete_entry', args=[entry.id])
+        )
+        self.assertFalse(GratitudeEntry.objects.using('shard_1').exists())
+        self.assertTrue(
+            EntryTombstone.objects.using('shard_1').filter(
+                entry_id=entry.id
+            ).exists()
+        )
+
+    async def test_async_views(self):
+        """Test the async views read from the user's shard under ASGI"""
+        entry = await sync_to_async(self.create_entry)('Async shard')
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.user)
+        response = await client.get(reverse('journal:entry_list'))
+        self.assertContains(response, 'Async shard')
+        response = await client.get(
+            reverse('journal:entry_detail', args=[entry.id])
+        )
+        self.assertContains(response, 'quiet mornings')
+
+    def test_new_user_placed_by_hash(self):
+        """Test new users are placed on the shard their id hashes to"""
+        user = User.objects.create_user(username='newcomer', password='x')
+        self.assertEqual(
+            UserShard.objects.get(user=user).alias, pick_shard(user.pk)
+        )
+
+    def test_admin_reads_every_shard(self):
+        """Test the admin lists, searches and edits entries per shard"""
+        entry = self.create_entry('Admin shard')
+        admin_user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='adminpass'
+        )
+        assign_shard(admin_user.pk, 'default')
+        self.client.force_login(admin_user)
+        url = reverse('admin:journal_gratitudeentry_changelist')
+
+        response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 0)
+        response = self.client.get(url, {'shard': 'shard_1'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [entry]
+        )
+        self.assertContains(response, 'sharded')
+        response = self.client.get(url, {'shard': 'shard_1', 'q': 'sharded'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+        change_url = reverse(
+            'admin:journal_gratitudeentry_change', args=[entry.id]
+        )
+        response = self.client.get(change_url)
+        self.assertContains(response, 'Admin shard')
+        self.client.post(change_url, {
+            'user': self.user.pk,
+            'title': 'Admin shard edited',
+            'content': entry.content,
+            'mood': entry.mood,
+            'tags': entry.tags,
+            'is_private': 'on',
+            'created_at_0': '2024-01-15',
+            'created_at_1': '08:00:00',
+        })
+        self.assertEqual(
+            GratitudeEntry.objects.using('shard_1').get(id=entry.id).title,
+            'Admin shard edited'
+        )
+
+    def test_admin_changelist_queries_flat(self):
+        """Test a shard's changelist fetches its rows' users at once"""
+        admin_user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='adminpass'
+        )
+        assign_shard(admin_user.pk, 'default')
+        self.client.force_login(admin_user)
+        url = reverse('admin:journal_gratitudeentry_changelist')
+
+        def changelist_queries(writers):
+            for number in range(writers):
+                user = User.objects.create_user(
+                    username=f'writer{writers}-{number}', password='x'
+                )
+                assign_shard(user.pk, 'shard_1')
+                GratitudeEntry.objects.for_user(user).create(
+                    user=user, title='Row', content='Thankful', mood='good'
+                )
+            with CaptureQueriesContext(connections['default']) as default, \
+                    CaptureQueriesContext(connections['shard_1']) as shard:
+                response = self.client.get(url, {'shard': 'shard_1'})
+            self.assertEqual(response.status_code, 200)
+            return len(default) + len(shard)
+
+        self.assertEqual(changelist_queries(2), changelist_queries(8))
+
+    def test_archive_on_shard_and_move(self):
+        """Test entries archive on their shard and move with the user"""
+        entry = self.create_entry('Archived')
+        self.assertEqual(
+            archive_entries(before=timezone.now() + timedelta(seconds=1)), 1
+        )
+        self.assertTrue(
+            ArchivedEntry.objects.using('shard_1').filter(id=entry.id).exists()
+        )
+
+        move_users([(self.user, 'default')], settle=0)
+        self.assertFalse(ArchivedEntry.objects.using('shard_1').exists())
+        self.assertEqual(list(ArchivedEntry.objects.get(
+            id=entry.id
+        ).tag_objects.values_list('name', flat=True)), ['family', 'work'])
+        response = self.client.get(
+            reverse('journal:entry_detail', args=[entry.id])
+        )
+        self.assertContains(response, 'quiet mornings')
+        self.assertEqual(
+            UserJournalStats.objects.get(user=self.user).archived_count, 1
+        )
+
+    def test_move_user(self):
+        """Test moving a user copies their journal and purges the source"""
+        kept = self.create_entry('Kept')
+        gone = self.create_entry('Gone')
+        self.client.post(reverse('journal:delete_entry', args=[gone.id]))
+
+        moves = move_users([(self.user, 'default')], settle=0)
+        self.assertEqual([move.source for move in moves], ['shard_1'])
+        self.assertEqual(shard_for_user(self.user.pk), 'default')
+
+        moved = GratitudeEntry.objects.using('default').get(user=self.user)
+        self.assertEqual(moved.id, kept.id)
+        self.assertEqual(moved.updated_at, kept.updated_at)
+        self.assertEqual(
+            sorted(moved.tag_objects.values_list('name', flat=True)),
+            ['family', 'work']
+        )
+        self.assertEqual(
+            list(EntryTombstone.objects.using('default').values_list(
+                'entry_id', flat=True
+            )), [gone.id]
+        )
+        self.assertEqual(get_user_stats(self.user)[0], 1)
+        self.assertEqual(
+            DailyActivity.objects.using('default').get(
+                user=self.user
+            ).entry_count, 1
+        )
+        for model in (GratitudeEntry, EntryTombstone, UserJournalStats,
+                      DailyActivity):
+            self.assertFalse(model.objects.using('shard_1').exists())
+
+        response = self.client.get(reverse('journal:entry_list'))
+        self.assertContains(response, 'Kept')
+
+    def test_rebalance_command(self):
+        """Test the command moves users and validates its options"""
+        self.create_entry('Rebalanced')
+        out = StringIO()
+        call_command(
+            'rebalance_shards', '--user', 'sharded', '--to', 'default',
+            '--settle', '0', stdout=out
+        )
+        self.assertIn('Moved sharded from shard_1 to default', out.getvalue())
+        self.assertTrue(
+            GratitudeEntry.objects.using('default').filter(
+                title='Rebalanced'
+            ).exists()
+        )
+        with self.assertRaises(CommandError):
+            call_command('rebalance_shards', '--user', 'sharded',
+                         '--to', 'nowhere', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('rebalance_shards', '--to', 'default',
+                         stdout=StringIO())
+
+    def test_user_delete_purges_shard(self):
+        """Test deleting a user deletes their journal from their shard"""
+        self.create_entry('Doomed')
+        self.user.delete()
+        for model in (GratitudeEntry, EntryTag, UserJournalStats,
+                      DailyActivity):
+            self.assertFalse(model.objects.using('shard_1').exists())
+
+    def test_router_migrations(self):
+        """Test shards only get the sharded journal tables"""
+        router = ShardRouter()
+        self.assertTrue(
+            router.allow_migrate('shard_1', 'journal', 'gratitudeentry')
+        )
+        self.assertFalse(
+            router.allow_migrate('shard_1', 'journal', 'usershard')
+        )
+        self.assertFalse(router.allow_migrate('shard_1', 'sessions'))
+        self.assertFalse(router.allow_migrate('shard_1', 'journal'))
+        self.assertTrue(
+            router.allow_migrate('shard_1', 'journal', shards=True)
+        )
+        self.assertIsNone(
+            router.allow_migrate('default', 'journal', 'usershard')
+        )
+
+
+class ArchiveTestCase(SearchIndexMixin, TestCase):
+    """Test cases for the cold archive of old entries"""
+
+    def setUp(self):
+        """Set up test data before each test method"""
+        self.user = User.objects.create_user(
+            username='archivist', password='testpass123'
+        )
+        old = timezone.now() - timedelta(days=400)
+        for i in range(2):
+            entry = GratitudeEntry.objects.create(
+                user=self.user, title=f'Old memory {i}',
+                content=f'The first snow of that winter, day {i}.',
+                mood='okay', tags='winter, family',
+                created_at=old + timedelta(days=i),
+            )
+            entry.set_tags(entry.get_tags_list())
+        GratitudeEntry.objects.update(updated_at=old + timedelta(days=2))
+        self.recent = GratitudeEntry.objects.create(
+            user=self.user, title='Fresh start',
+            content='A sunny walk this morning.',
+        )
+        rebuild_user_stats(self.user)
+        self.client.force_login(self.user)
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_entries', *args, stdout=out)
+        return out.getvalue()
+
+    def test_old_entries_moved_compressed(self):
+        """Test old entries move to the archive and totals stay whole"""
+        activity = list(DailyActivity.objects.values_list(
+            'date', 'entry_count', 'streak'
+        ))
+        self.assertIn('2 entries would be archived', self.archive('--dry-run'))
+        self.assertIn('Archived 2 entries', self.archive('--batch-size', '1'))
+
+        self.assertEqual(list(GratitudeEntry.objects.all()), [self.recent])
+        self.assertFalse(EntryTag.objects.exclude(entry=self.recent).exists())
+        archived = ArchivedEntry.objects.get(title='Old memory 0')
+        self.assertEqual(
+            list(archived.tag_objects.values_list('name', flat=True)),
+            ['family', 'winter']
+        )
+        self.assertNotIn(b'snow', bytes(archived.content))
+        self.assertEqual(
+            archived.to_entry().content,
+            'The first snow of that winter, day 0.'
+        )
+
+        stats = UserJournalStats.objects.get(user=self.user)
+        self.assertEqual(
+            (stats.total_entries, stats.okay_count, stats.archived_count),
+            (3, 2, 2)
+        )
+        rebuilt = rebuild_user_stats(self.user)
+        self.assertEqual(
+            (rebuilt.total_entries, rebuilt.archived_count), (3, 2)
+        )
+        self.assertEqual(rebuilt.first_entry_at, stats.first_entry_at)
+        rebuild_user_activity(self.user.pk)
+        self.assertEqual(list(DailyActivity.objects.values_list(
+            'date', 'entry_count', 'streak'
+        )), activity)
+        self.assertIn('Archived 0 entries', self.archive())
+
+    def test_archived_entries_read_transparently(self):
+        """Test detail pages and exports include archived entries"""
+        self.archive()
+        archived = ArchivedEntry.objects.get(title='Old memory 1')
+        response = self.client.get(
+            reverse('journal:entry_detail', args=[archived.id])
+        )
+        self.assertContains(response, 'The first snow of that winter, day 1.')
+
+        response = self.client.get(
+            reverse('journal:export_entries'), {'format': 'jsonl'}
+        )
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [row['title'] for row in rows],
+            ['Old memory 0', 'Old memory 1', 'Fresh start']
+        )
+        self.assertEqual(rows[0]['tags'], ['winter', 'family'])
+
+    def test_archived_entries_listed_searched_and_synced(self):
+        """Test the list, its filters, search and sync reach the archive"""
+        self.archive()
+        url = reverse('journal:entry_list')
+
+        response = self.client.get(url)
+        self.assertContains(
+            response, 'You have 3 gratitude entries, 2 of them archived'
+        )
+        self.assertEqual(
+            [entry.title for entry in response.context['page_obj']],
+            ['Fresh start', 'Old memory 1', 'Old memory 0']
+        )
+
+        # Pages continue from the live entries into the archive
+        response = self.client.get(url, {'after': encode_cursor(self.recent)})
+        self.assertEqual(
+            [entry.title for entry in response.context['page_obj']],
+            ['Old memory 1', 'Old memory 0']
+        )
+
+        response = self.client.get(url, {'tag': 'winter'})
+        self.assertEqual(response.context['total_results'], 2)
+        response = self.client.get(url, {'search': 'day 1'})
+        self.assertEqual(
+            [entry.title for entry in response.context['page_obj']],
+            ['Old memory 1']
+        )
+        self.assertEqual(response.context['total_results'], 1)
+
+        response = self.client.get(reverse('journal:search'), {'q': 'snow'})
+        self.assertEqual(
+            [result.entry.title for result in response.context['results']],
+            ['Old memory 1', 'Old memory 0']
+        )
+
+        response = self.client.get(reverse('journal:analytics'))
+        self.assertEqual(response.context['tag_stats'][0], {
+            'tag': 'family', 'count': 2
+        })
+
+        # A full sync copies archived entries too, a page at a time
+        cursor, titles = None, []
+        while True:
+            changes = sync.get_changes(self.user, cursor, limit=2)
+            titles += [entry.title for entry in changes['entries']]
+            cursor = changes['cursor']
+            if not changes['has_more']:
+                break
+        self.assertEqual(
+            titles, ['Old memory 0', 'Old memory 1', 'Fresh start']
+        )
+
+    def test_edit_restores_entry(self):
+        """Test saving an archived entry moves it back to the hot table"""
+        self.archive()
+        archived = ArchivedEntry.objects.get(title='Old memory 0')
+        response = self.client.post(
+            reverse('journal:edit_entry', args=[archived.id]), {
+                'title': 'Older memory',
+                'content': 'Snow, still remembered.',
+                'mood': 'excellent',
+                'tags': 'winter',
+            }
+        )
+        self.assertRedirects(
+            response, reverse('journal:entry_detail', args=[archived.id])
+        )
+
+        entry = GratitudeEntry.objects.get(id=archived.id)
+        self.assertEqual(entry.content, 'Snow, still remembered.')
+        self.assertEqual(list(entry.tag_objects.values_list(
+            'name', flat=True
+        )), ['winter'])
+        self.assertFalse(ArchivedEntry.objects.filter(id=archived.id).exists())
+        stats = UserJournalStats.objects.get(user=self.user)
+        self.assertEqual(
+            (stats.total_entries, stats.archived_count, stats.okay_count,
+             stats.excellent_count),
+            (3, 1, 1, 1)
+        )
+        self.assertEqual(DailyActivity.objects.aggregate(
+            total=Sum('entry_count')
+        )['total'], 3)
+
+    def test_delete_archived_entry(self):
+        """Test deleting an archived entry removes it everywhere"""
+        self.archive()
+        archived = ArchivedEntry.objects.get(title='Old memory 0')
+        self.client.post(reverse('journal:delete_entry', args=[archived.id]))
+
+        self.assertFalse(ArchivedEntry.objects.filter(id=archived.id).exists())
+        self.assertFalse(GratitudeEntry.objects.filter(id=archived.id).exists())
+        self.assertTrue(
+            EntryTombstone.objects.filter(entry_id=archived.id).exists()
+        )
+        stats = UserJournalStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_entries, stats.archived_count), (2, 1))
+        self.assertEqual(stats.first_entry_at, ArchivedEntry.objects.get(
+            title='Old memory 1'
+        ).created_at)
+
+    def test_api_lists_archived_entries(self):
+        """Test the API list pages and counts archived entries"""
+        url = reverse('journal:api_entries')
+        etag = self.client.get(url)['ETag']
+        self.archive()
+
+        response = self.client.get(url, {'limit': 2})
+        self.assertNotEqual(response['ETag'], etag)
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(
+            [entry['title'] for entry in data['results']],
+            ['Fresh start', 'Old memory 1']
+        )
+        data = self.client.get(url, {'after': data['next']}).json()
+        self.assertEqual(
+            [entry['content'] for entry in data['results']],
+            ['The first snow of that winter, day 0.']
+        )
+
+        data = self.client.get(url, {'tag': 'winter'}).json()
+        self.assertEqual(data['count'], 2)
+        data = self.client.get(url, {'mood': 'okay'}).json()
+        self.assertEqual(data['count'], 2)
+
+    def test_bulk_actions_on_archived_entries(self):
+        """Test bulk actions restore and act on selected archived entries"""
+        self.archive()
+        ids = list(ArchivedEntry.objects.values_list('id', flat=True))
+
+        def rearchive():
+            # Restored entries are stamped as updated now
+            GratitudeEntry.objects.filter(id__in=ids).update(
+                updated_at=timezone.now() - timedelta(days=400)
+            )
+            self.archive()
+            self.assertEqual(ArchivedEntry.objects.count(), 2)
+
+        def bulk_action(action, **data):
+            response = self.client.post(reverse('journal:bulk_entries'), {
+                'bulk_action': action, 'entries': ids, **data
+            }, follow=True)
+            return [str(message) for message in response.context['messages']]
+
+        self.assertEqual(
+            bulk_action('make_public'), ['Made 2 entries public.']
+        )
+        self.assertFalse(ArchivedEntry.objects.exists())
+        self.assertFalse(
+            GratitudeEntry.objects.filter(id__in=ids, is_private=True).exists()
+        )
+        self.assertEqual(
+            EntryTag.objects.filter(entry_id__in=ids).count(), 4
+        )
+        stats = UserJournalStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_entries, stats.archived_count), (3, 0))
+
+        rearchive()
+        self.assertEqual(
+            bulk_action('remove_tag', tag='winter'),
+            ['Removed "winter" from 2 entries.']
+        )
+        self.assertEqual(sorted(EntryTag.objects.filter(
+            entry_id__in=ids
+        ).values_list('tag__name', flat=True)), ['family', 'family'])
+
+        rearchive()
+        self.assertEqual(bulk_action('delete'), ['Deleted 2 entries.'])
+        self.assertFalse(GratitudeEntry.objects.filter(id__in=ids).exists())
+        self.assertFalse(ArchivedEntry.objects.exists())
+        stats = UserJournalStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_entries, stats.archived_count), (1, 0))
+
+
+class WorkerWarmupTestCase(TestCase):
+    """Test cases for worker warm-up and startup profiling"""
+
+    def test_warm_up_loads_urls_and_templates(self):
+        """Test every journal URL resolves and the templates compile"""
+        warmed = warm_up(open_connections=False)
+        self.assertEqual(warmed['urls'], len(journal_urls.urlpatterns))
+        self.assertGreaterEqual(warmed['templates'], 10)
+        self.assertNotIn('connections', warmed)
+
+    def test_only_persistent_connections_opened(self):
+        """Test connections closed after each request are left alone"""
+        self.assertEqual(warm_connections(), 0)
+        connection.settings_dict['CONN_MAX_AGE'] = 60
+        self.addCleanup(connection.settings_dict.update, CONN_MAX_AGE=0)
+        self.assertEqual(warm_connections(), 1)
+
+    def test_profile_startup_reports_project_modules(self):
+        """Test import times are listed for settings and journal modules"""
+        out = StringIO()
+        call_command('profile_startup', stdout=out)
+        modules = [
+            line.split()[-1] for line in out.getvalue().splitlines()[1:-1]
+        ]
+        self.assertIn('gratitude_journal.settings', modules)
+        self.assertIn('journal.models', modules)
+        self.assertTrue(all(
+            module.split('.')[0] in ('gratitude_journal', 'journal')
+            for module in modules
+        ))
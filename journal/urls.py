@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'journal'
 
@@ -7,6 +7,7 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('register/', views.register_view, name='register'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('analytics/', views.analytics, name='analytics'),
     path('profile/', views.profile_view, name='profile'),
     path('profile/change-password/', views.change_password_view,
          name='change_password'),
@@ -15,9 +16,31 @@ urlpatterns = [
 
     # Journal Entry URLs
     path('entries/', views.entry_list, name='entry_list'),
+    path('entries/search/', views.search, name='search'),
+    path('entries/export/', views.export_entries, name='export_entries'),
+    path('entries/bulk/', views.bulk_entries, name='bulk_entries'),
     path('entries/create/', views.create_entry, name='create_entry'),
     path('entries/<int:entry_id>/', views.entry_detail, name='entry_detail'),
     path('entries/<int:entry_id>/edit/', views.edit_entry, name='edit_entry'),
     path('entries/<int:entry_id>/delete/', views.delete_entry,
          name='delete_entry'),
+
+    # JSON API
+    path('api/v1/entries/', api.entry_collection, name='api_entries'),
+    path('api/v1/entries/<int:entry_id>/', api.entry_resource,
+         name='api_entry'),
+    path('api/v1/entries/changes/', api.entry_changes,
+         name='api_entry_changes'),
+
+    # Offline replica kept by the service worker, scoped to the site root
+    path('sw.js', views.service_worker, name='service_worker'),
+
+    # Real-user performance beacons
+    path('rum/beacon/', views.rum_beacon, name='rum_beacon'),
+
+    # Staff diagnostics
+    path('staff/fragment-cache/', views.fragment_cache_stats,
+         name='fragment_cache_stats'),
+    path('staff/performance/', views.performance_report,
+         name='performance_report'),
 ]
@@ -1,13 +1,76 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+import json
+from collections import Counter
+from functools import partial, wraps
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib import messages
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
-from django.core.paginator import Paginator
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+)
+from django.contrib.staticfiles import finders
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.template.defaultfilters import pluralize
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.timesince import timesince
+from .archive import (
+    aget_archived_entry, archived_entries, entry_matches, get_archived_entry,
+    restore_entry,
+)
+from .conditional import aconditional_page, page_etag
+from . import bulk, rum
+from .export import EXPORT_FORMATS, aexport_stream, export_stream
 from .forms import CustomUserCreationForm, GratitudeEntryForm
-from .models import GratitudeEntry
+from .fragments import get_cache_stats, render_entry_cards, template_engine
+from .activity import (
+    entries_in_last_days, get_monthly_activity, get_streaks
+)
+from .models import ArchivedEntryTag, EntryTag, GratitudeEntry
+from .pagination import CursorPaginator
+from .routers import pin_to_primary, replica_reads
+from .sharding import shard_for_user
+from .search import search_entries
+from .stats import get_journal_stats, get_user_stats
+
+# Largest beacon body accepted from performance-monitor.js, in bytes
+RUM_MAX_BODY = 16 * 1024
+
+
+async def alist(queryset):
+    """Evaluate a queryset with the async ORM"""
+    return [obj async for obj in queryset]
+
+
+def async_login_required(view):
+    """
+    login_required for async views
+
+    Django 4.2's decorator only wraps sync views. The lazy request.user is
+    resolved in a worker thread, as its session and user queries are sync.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(
+            lambda: request.user.is_authenticated
+        )()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
 
 
 def home(request):
@@ -36,26 +99,64 @@ def register_view(request):
     return render(request, 'journal/register.html', {'form': form})
 
 
-@login_required
-def dashboard(request):
+@async_login_required
+@replica_reads
+async def dashboard(request):
     """User dashboard - requires login"""
-    # Get user's entries for statistics
-    user_entries = GratitudeEntry.objects.filter(user=request.user)
-    total_entries = user_entries.count()
-    recent_entries = user_entries.order_by('-created_at')[:3]
-
-    # Calculate mood distribution
-    mood_stats = {}
-    for mood_value, mood_label in GratitudeEntry.MOOD_CHOICES:
-        count = user_entries.filter(mood=mood_value).count()
-        mood_stats[mood_value] = {'label': mood_label, 'count': count}
+    # Total and mood distribution come from the user's counters row; the
+    # recent entries are fetched alongside it
+    (total_entries, mood_stats), recent_entries = await asyncio.gather(
+        sync_to_async(get_user_stats)(request.user),
+        alist(GratitudeEntry.objects.for_user(
+            request.user
+        ).order_by('-created_at')[:3]),
+    )
 
     context = {
         'total_entries': total_entries,
         'recent_entries': recent_entries,
         'mood_stats': mood_stats,
     }
-    return render(request, 'journal/dashboard.html', context)
+    return await sync_to_async(render)(
+        request, 'journal/dashboard.html', context, using=template_engine()
+    )
+
+
+@login_required
+@replica_reads
+def analytics(request):
+    """Writing analytics - counts, streaks, moods and tags"""
+    total_entries, moods = get_user_stats(request.user)
+    current_streak, longest_streak = get_streaks(request.user)
+
+    mood_stats = [
+        {'mood': mood_value, 'count': mood_data['count']}
+        for mood_value, mood_data in moods.items()
+        if mood_data['count']
+    ]
+    # Archived entries keep their tag links in a table of their own
+    tag_counts = Counter()
+    for links in (EntryTag.objects, ArchivedEntryTag.objects):
+        tag_counts.update(dict(links.for_user(request.user).values_list(
+            'tag__name'
+        ).annotate(count=Count('id')).order_by()))
+    tag_stats = sorted(
+        tag_counts.items(), key=lambda item: (-item[1], item[0])
+    )[:10]
+
+    context = {
+        'total_entries': total_entries,
+        'entries_last_7_days': entries_in_last_days(request.user, 7),
+        'entries_last_30_days': entries_in_last_days(request.user, 30),
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'mood_stats': mood_stats,
+        'tag_stats': [
+            {'tag': name, 'count': count} for name, count in tag_stats
+        ],
+        'monthly_stats': get_monthly_activity(request.user),
+    }
+    return render(request, 'journal/analytics.html', context)
 
 
 @login_required
@@ -90,9 +191,12 @@ def create_entry(request):
         form = GratitudeEntryForm(request.POST)
         if form.is_valid():
             try:
-                entry = form.save(commit=False)
-                entry.user = request.user
-                entry.save()
+                with transaction.atomic(using=shard_for_user(request.user.pk)):
+                    entry = form.save(commit=False)
+                    entry.user = request.user
+                    entry.save()
+                    form.save_m2m()
+                pin_to_primary(request)
                 messages.success(
                     request,
                     'Your gratitude entry has been created successfully!'
@@ -115,40 +219,182 @@ def create_entry(request):
     return render(request, 'journal/create_entry.html', {'form': form})
 
 
-@login_required
-def entry_list(request):
-    """List all user's entries"""
-    entries = GratitudeEntry.objects.filter(user=request.user).order_by('-created_at')
+@async_login_required
+@replica_reads
+async def entry_list(request):
+    """List all user's entries with optional search and mood filters"""
+    entries = GratitudeEntry.objects.for_user(request.user)
 
-    # Pagination
-    paginator = Paginator(entries, 10)  # Show 10 entries per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    search = request.GET.get('search', '').strip()
+    if search:
+        entries = entries.filter(
+            Q(title__icontains=search) |
+            Q(content__icontains=search) |
+            Q(tags__icontains=search)
+        )
 
-    context = {
-        'page_obj': page_obj,
-    }
+    mood = request.GET.get('mood', '')
+    if mood:
+        entries = entries.filter(mood=mood)
+
+    # Served by the Tag.name and EntryTag (tag, entry) indexes
+    tag = request.GET.get('tag', '').strip()
+    if tag:
+        entries = entries.filter(tag_objects__name=tag)
+
+    # The counters row and the newest updated_at version every view of
+    # the list: any write moves updated_at and any delete the total. A
+    # delete or archive leaves updated_at behind, so the list is only
+    # revalidated by ETag and sent without Last-Modified.
+    stats, latest = await asyncio.gather(
+        sync_to_async(get_journal_stats)(request.user),
+        GratitudeEntry.objects.for_user(request.user).aaggregate(
+            modified=Max('updated_at')
+        ),
+    )
+    modified = latest['modified']
+    etag = page_etag(
+        request, stats.total_entries, stats.archived_count, modified
+    )
+
+    # Archived entries follow the same filters, searched as they are
+    # decompressed since their content cannot be matched by the database
+    archived, archive_filter = None, None
+    if stats.archived_count:
+        archived = archived_entries(request.user, mood, tag)
+        if search:
+            archive_filter = partial(entry_matches, terms=[search])
+
+    async def render_page():
+        # Keyset pagination - 10 entries per page, no OFFSET scans
+        paginator = CursorPaginator(entries, 10, archived, archive_filter)
+        get_page = sync_to_async(paginator.get_page)(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+
+        # Unfiltered totals come from the counters row instead of COUNT(*)
+        if search or mood or tag:
+            page_obj, total_results = await asyncio.gather(
+                get_page, entries.acount()
+            )
+            if archived is not None:
+                total_results += await sync_to_async(count_archived)(
+                    archived, archive_filter
+                )
+        else:
+            page_obj, total_results = await get_page, stats.total_entries
+
+        # Preserve the active filters in the next/previous links
+        filter_query = request.GET.copy()
+        filter_query.pop('after', None)
+        filter_query.pop('before', None)
+
+        context = {
+            'page_obj': page_obj,
+            'entry_cards': await sync_to_async(render_entry_cards)(
+                page_obj.object_list
+            ),
+            'total_results': total_results,
+            'archived_count': stats.archived_count,
+            'search': search,
+            'mood': mood,
+            'tag': tag,
+            'mood_choices': GratitudeEntry.MOOD_CHOICES,
+            'filter_query': filter_query.urlencode(),
+        }
+        return await sync_to_async(render)(
+            request, 'journal/entry_list.html', context,
+            using=template_engine()
+        )
 
-    return render(request, 'journal/entry_list.html', context)
+    return await aconditional_page(request, etag, None, render_page)
+
+
+def count_archived(archived, archive_filter=None):
+    """Count the archived entries an entry list filter matches"""
+    if archive_filter is None:
+        return archived.count()
+    return sum(
+        1 for row in archived.iterator() if archive_filter(row.to_entry())
+    )
 
 
 @login_required
-def entry_detail(request, entry_id):
+def search(request):
+    """Full-text search across the user's entries"""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    results, has_next = [], False
+    if query:
+        # The counters row says whether there is an archive to search
+        results, has_next = search_entries(
+            request.user, query, page,
+            archived=bool(get_journal_stats(request.user).archived_count),
+        )
+
+    context = {
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_next': has_next,
+        'has_previous': page > 1,
+    }
+    return render(request, 'journal/search.html', context)
+
+
+@async_login_required
+@replica_reads
+async def entry_detail(request, entry_id):
     """View a specific entry"""
-    entry = get_object_or_404(GratitudeEntry, id=entry_id, user=request.user)
-    return render(request, 'journal/entry_detail.html', {'entry': entry})
+    entry = await GratitudeEntry.objects.for_user(request.user).filter(
+        id=entry_id
+    ).afirst() or await aget_archived_entry(request.user, entry_id)
+    if entry is None:
+        raise Http404('No GratitudeEntry matches the given query.')
+    # The page shows how long ago the entry was written
+    etag = page_etag(request, entry.id, entry.updated_at.timestamp(),
+                     timesince(entry.created_at))
+
+    async def render_page():
+        return await sync_to_async(render)(
+            request, 'journal/entry_detail.html', {'entry': entry},
+            using=template_engine()
+        )
+
+    return await aconditional_page(
+        request, etag, entry.updated_at, render_page
+    )
+
+
+def get_entry_or_404(user, entry_id):
+    """Return the user's entry, reading it from the archive if moved there"""
+    entry = GratitudeEntry.objects.for_user(user).filter(
+        id=entry_id
+    ).first() or get_archived_entry(user, entry_id)
+    if entry is None:
+        raise Http404('No GratitudeEntry matches the given query.')
+    return entry
 
 
 @login_required
 def edit_entry(request, entry_id):
     """Edit an existing entry with enhanced error handling"""
-    entry = get_object_or_404(GratitudeEntry, id=entry_id, user=request.user)
+    entry = get_entry_or_404(request.user, entry_id)
 
     if request.method == 'POST':
         form = GratitudeEntryForm(request.POST, instance=entry)
         if form.is_valid():
             try:
-                form.save()
+                with transaction.atomic(using=shard_for_user(request.user.pk)):
+                    if entry.archived:
+                        restore_entry(entry)
+                    form.save()
+                pin_to_primary(request)
                 messages.success(
                     request,
                     'Your gratitude entry has been updated successfully!'
@@ -177,16 +423,150 @@ def edit_entry(request, entry_id):
 @login_required
 def delete_entry(request, entry_id):
     """Delete an entry"""
-    entry = get_object_or_404(GratitudeEntry, id=entry_id, user=request.user)
+    entry = get_entry_or_404(request.user, entry_id)
 
     if request.method == 'POST':
-        entry.delete()
+        with transaction.atomic(using=shard_for_user(request.user.pk)):
+            if entry.archived:
+                restore_entry(entry)
+            entry.delete()
+        pin_to_primary(request)
         messages.success(request, 'Your entry has been deleted.')
         return redirect('journal:entry_list')
 
     return render(request, 'journal/delete_entry.html', {'entry': entry})
 
 
+BULK_ACTIONS = {
+    'delete': 'Deleted {count} entr{plural}.',
+    'make_private': 'Made {count} entr{plural} private.',
+    'make_public': 'Made {count} entr{plural} public.',
+    'add_tag': 'Tagged {count} entr{plural} with "{tag}".',
+    'remove_tag': 'Removed "{tag}" from {count} entr{plural}.',
+}
+
+
+@login_required
+@require_POST
+def bulk_entries(request):
+    """Apply one action to the entries selected in the entry list"""
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()},
+        require_https=request.is_secure()
+    ):
+        next_url = reverse('journal:entry_list')
+
+    action = request.POST.get('bulk_action', '')
+    tag = request.POST.get('tag', '')
+    entry_ids = [
+        int(entry_id) for entry_id in request.POST.getlist('entries')
+        if entry_id.isdigit()
+    ]
+    if action not in BULK_ACTIONS:
+        messages.error(request, 'Choose an action to apply.')
+    elif not entry_ids:
+        messages.error(request, 'Select at least one entry.')
+    elif len(entry_ids) > bulk.MAX_BULK_ENTRIES:
+        messages.error(
+            request,
+            f'Select at most {bulk.MAX_BULK_ENTRIES} entries at a time.'
+        )
+    else:
+        try:
+            if action == 'delete':
+                count = bulk.bulk_delete(request.user, entry_ids)
+            elif action in ('make_private', 'make_public'):
+                count = bulk.bulk_set_privacy(
+                    request.user, entry_ids, action == 'make_private'
+                )
+            elif action == 'add_tag':
+                count = bulk.bulk_add_tag(request.user, entry_ids, tag)
+            else:
+                count = bulk.bulk_remove_tag(request.user, entry_ids, tag)
+        except ValidationError as error:
+            messages.error(request, ' '.join(error.messages))
+        else:
+            pin_to_primary(request)
+            messages.success(request, BULK_ACTIONS[action].format(
+                count=count, plural=pluralize(count, 'y,ies'),
+                tag=tag.strip()
+            ))
+    return redirect(next_url)
+
+
+@login_required
+def export_entries(request):
+    """Stream a download of all the user's entries"""
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in EXPORT_FORMATS:
+        raise Http404('Unknown export format')
+    compress = request.GET.get('gzip') == '1'
+
+    content_type, extension = EXPORT_FORMATS[export_format]
+    filename = f'gratitude-journal.{extension}'
+    if compress:
+        content_type, filename = 'application/gzip', filename + '.gz'
+
+    # ASGI servers need an async iterator to stream without buffering
+    stream = (
+        aexport_stream if isinstance(request, ASGIRequest) else export_stream
+    )
+    response = StreamingHttpResponse(
+        stream(request.user, export_format, compress),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@staff_member_required
+def fragment_cache_stats(request):
+    """Hit and miss counters of the entry card fragment cache"""
+    return JsonResponse(get_cache_stats())
+
+
+@csrf_exempt
+@require_POST
+def rum_beacon(request):
+    """Accept a batch of page timings sent by performance-monitor.js"""
+    if len(request.body) > RUM_MAX_BODY:
+        return HttpResponse(status=413)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+    rum.buffer.add(rum.parse_samples(payload))
+    return HttpResponse(status=204)
+
+
+@cache_control(no_cache=True)
+def service_worker(request):
+    """
+    Serve sw.js from the site root
+
+    A service worker only controls pages under the path it is served
+    from, so it cannot be served from /static/ and render /entries/.
+    """
+    with open(finders.find('journal/js/sw.js'), 'rb') as script:
+        return HttpResponse(script.read(), content_type='text/javascript')
+
+
+@staff_member_required
+def performance_report(request):
+    """Real-user p50/p95/p99 timings by route"""
+    try:
+        days = min(max(int(request.GET.get('days', 7)), 1), 90)
+    except ValueError:
+        days = 7
+    # Include what this worker has not written yet
+    rum.buffer.flush()
+    return render(request, 'journal/performance_report.html', {
+        'rollups': rum.get_rollups(days),
+        'days': days,
+    })
+
+
 # Custom Authentication Views with Notifications
 class CustomLoginView(LoginView):
     """Custom login view with welcome message"""
@@ -0,0 +1,70 @@
+"""
+Worker warm-up
+
+Loads what a worker otherwise builds on its first requests: the URL
+resolver, the compiled journal templates and the database connections.
+Called from the gunicorn hooks in ``gunicorn.conf.py``.
+"""
+import os
+from django.db import connections
+from django.template import engines
+from django.urls import resolve, reverse
+from . import urls as journal_urls
+
+TEMPLATE_PREFIX = 'journal'
+
+
+def warm_urls():
+    """Reverse and resolve every journal URL pattern"""
+    count = 0
+    for pattern in journal_urls.urlpatterns:
+        kwargs = {name: '1' for name in pattern.pattern.converters}
+        resolve(reverse(
+            f'{journal_urls.app_name}:{pattern.name}', kwargs=kwargs
+        ))
+        count += 1
+    return count
+
+
+def journal_template_names(engine):
+    """Return the names of the journal templates an engine can load"""
+    names = set()
+    for directory in engine.template_dirs:
+        root = os.path.join(directory, TEMPLATE_PREFIX)
+        for path, dirs, files in os.walk(root):
+            for filename in files:
+                if filename.endswith('.html'):
+                    names.add(os.path.relpath(
+                        os.path.join(path, filename), directory
+                    ).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm_templates():
+    """Compile the journal templates into each engine's template cache"""
+    count = 0
+    for engine in engines.all():
+        for name in journal_template_names(engine):
+            engine.get_template(name)
+            count += 1
+    return count
+
+
+def warm_connections():
+    """Open the persistent database connections"""
+    count = 0
+    for connection in connections.all():
+        # Connections without CONN_MAX_AGE are closed after each request
+        if connection.settings_dict['CONN_MAX_AGE'] == 0:
+            continue
+        connection.ensure_connection()
+        count += 1
+    return count
+
+
+def warm_up(open_connections=True):
+    """Warm the worker up, returning how many of each thing were loaded"""
+    warmed = {'urls': warm_urls(), 'templates': warm_templates()}
+    if open_connections:
+        warmed['connections'] = warm_connections()
+    return warmed